@@ -0,0 +1,185 @@
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
+
+from bouncer.dynamodb import Table
+
+PRIORITIES = ('contest', 'exam', 'practice')                    # The first one goes first
+SHARES = {'contest': 1.0, 'exam': 0.8, 'practice': 0.6}         # Part of the budget of a coderunner a class can use
+DEADLINES = {'contest': 60, 'exam': 60, 'practice': 30}         # Seconds to wait for a slot before giving up
+
+DEFAULT_BUDGET = 100        # Concurrent invocations of a coderunner across all the bouncers
+BUDGETS: dict[str, int] = json.loads(os.getenv('CODERUNNER_BUDGETS') or '{}')     # {"CodeRunnerRust": 50, ...}
+LEASE_SECONDS = 7 * 60      # Longer than a coderunner can run => the slots of crashed bouncers expire
+MIN_DELAY, MAX_DELAY = 0.1, 2.
+
+
+class AdmissionTimeout(Exception):
+    pass
+
+
+class SlotStore(ABC):
+    """ The running invocations (leases) of each coderunner, shared by all the bouncers """
+
+    @abstractmethod
+    def acquire(self, name: str, lease: str, limit: int, expires_at: float) -> bool:
+        """ Adds the lease if the coderunner has less than `limit` unexpired leases """
+        ...
+
+    @abstractmethod
+    def release(self, name: str, lease: str) -> None:
+        ...
+
+
+class DynamoDBSlotStore(SlotStore):
+    """ An item per coderunner with a map of leases => conditional updates on the size of the map """
+    TABLE_NAME = os.getenv('ADMISSION_TABLE_NAME', 'judge-admission')
+
+    def __init__(self, client):
+        self.table = Table(client, self.TABLE_NAME)
+        self.created: set[str] = set()
+        self.created_lock = threading.Lock()    # Shared by all the threads waiting for slots
+        print(f'Initialized DynamoDBSlotStore: {self.TABLE_NAME}')
+
+    def create(self, name: str) -> None:
+        with self.created_lock:
+            if name in self.created:
+                return
+        try:
+            self.table.put_item(Item={'id': name, 'leases': {}}, ConditionExpression='attribute_not_exists(id)')
+        except self.table.exceptions.ConditionalCheckFailedException:
+            pass
+        with self.created_lock:
+            self.created.add(name)
+
+    def acquire(self, name: str, lease: str, limit: int, expires_at: float) -> bool:
+        self.create(name)
+        try:
+            self.table.update_item(
+                Key={'id': name},
+                UpdateExpression='SET leases.#lease = :expires_at',
+                ConditionExpression='size(leases) < :limit',
+                ExpressionAttributeNames={'#lease': lease},
+                ExpressionAttributeValues={':expires_at': int(expires_at), ':limit': limit},
+            )
+            return True
+        except self.table.exceptions.ConditionalCheckFailedException:
+            self.expire(name)
+            return False
+
+    def expire(self, name: str) -> None:
+        """ Removes the leases of the bouncers that were stopped before releasing them """
+        item = self.table.get_item(Key={'id': name}, ConsistentRead=True).get('Item') or {}
+        expired = [lease for lease, expires_at in item.get('leases', {}).items() if expires_at < time.time()]
+        if expired:
+            print(f'Removing {len(expired)} expired leases of {name}')
+            names = {f'#l{i}': lease for i, lease in enumerate(expired)}
+            self.table.update_item(Key={'id': name}, UpdateExpression='REMOVE ' + ', '.join(
+                f'leases.{placeholder}' for placeholder in names
+            ), ExpressionAttributeNames=names)
+
+    def release(self, name: str, lease: str) -> None:
+        self.table.update_item(
+            Key={'id': name}, UpdateExpression='REMOVE leases.#lease', ExpressionAttributeNames={'#lease': lease},
+        )
+
+
+class InMemorySlotStore(SlotStore):
+    """ A stand-in for local runs and tests (the slots of a single process) """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.leases: dict[str, dict[str, float]] = defaultdict(dict)
+
+    def acquire(self, name: str, lease: str, limit: int, expires_at: float) -> bool:
+        with self.lock:
+            leases = self.leases[name]
+            for expired in [lease for lease, expires in leases.items() if expires < time.time()]:
+                del leases[expired]
+            if len(leases) >= limit:
+                return False
+            leases[lease] = expires_at
+            return True
+
+    def release(self, name: str, lease: str) -> None:
+        with self.lock:
+            self.leases[name].pop(lease, None)
+
+
+class Admission:
+    """
+    Admits the invocations of the coderunners within their budgets: a priority class can only use its share of the
+    budget (=> contests always have room left by the practice submissions), and the requests waiting in a bouncer
+    are admitted in the order of their priority (then arrival) until their deadline
+    """
+
+    def __init__(self, slots: SlotStore, budgets: dict[str, int] | None = None):
+        self.slots = slots
+        self.budgets = BUDGETS if budgets is None else budgets
+        self.condition = threading.Condition()
+        self.waiting: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self.releases: dict[str, int] = defaultdict(int)   # Local releases of each coderunner (wakes up its head)
+        self.tickets = itertools.count()
+
+    def limit(self, name: str, priority: str) -> int:
+        return max(int(self.budgets.get(name, DEFAULT_BUDGET) * SHARES[priority]), 1)
+
+    @contextmanager
+    def slot(self, name: str, priority: str = 'practice', deadline: float | None = None):
+        """
+        Waits for a slot of the coderunner until the `deadline` (unix seconds, DEADLINES of the priority by default).
+        The shards of a submission share its deadline, the submissions of a batch wait while their lambda can judge them
+        """
+        start = time.time()
+        deadline = start + DEADLINES[priority] if deadline is None else deadline
+        lease = str(uuid.uuid4())
+        ticket = (PRIORITIES.index(priority), next(self.tickets))
+
+        def busy() -> AdmissionTimeout:
+            return AdmissionTimeout(f'{name} is busy (waited {time.time() - start:.0f}s for a {priority} slot)')
+
+        with self.condition:
+            queue = self.waiting[name]
+            heapq.heappush(queue, ticket)
+        try:
+            delay = MIN_DELAY
+            while True:
+                with self.condition:
+                    while queue[0] != ticket:   # Only the first waiting request of the coderunner asks the store
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            raise busy()
+                        self.condition.wait(timeout=remaining)
+                    releases = self.releases[name]
+
+                # The store is shared by the bouncers (network calls) => asked without holding the lock
+                if self.slots.acquire(name, lease, limit=self.limit(name, priority),
+                                      expires_at=time.time() + LEASE_SECONDS):
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise busy()
+                # Woken up by the local releases, the slots released by the other bouncers are polled
+                with self.condition:
+                    self.condition.wait_for(lambda: self.releases[name] != releases, timeout=min(delay, remaining))
+                delay = min(delay * 2, MAX_DELAY)
+        finally:
+            with self.condition:
+                queue.remove(ticket)
+                heapq.heapify(queue)
+                self.condition.notify_all()
+
+        try:
+            yield
+        finally:
+            self.slots.release(name, lease)
+            with self.condition:
+                self.releases[name] += 1
+                self.condition.notify_all()
@@ -1,19 +1,107 @@
-from bouncer.services import check_equality
-from models import SubmissionRequest
+import os
+import time
+from functools import lru_cache
+
+from bouncer.cache import DynamoDBResultCache, ResultCache, SQLiteResultCache
+from bouncer.callbacks import DynamoDBOutbox, Outbox, SQLiteOutbox, drain
+from bouncer.jobs import DynamoDBResultStore, ResultStore, SQLiteResultStore
+from bouncer.responses import query, request_body, respond, shape_result
+from bouncer.services import (CODERUNNER_SECONDS, check_batch, check_equality, dynamodb_client, submit_batch,
+                              submit_job)
+from models import BatchRequest, SubmissionRequest
+
+
+# DynamoDB in the cloud, SQLite for local runs.
+# All the handlers share this module => each one only creates the stores it uses (on its first invocation)
+@lru_cache(maxsize=None)
+def jobs() -> ResultStore:
+    return DynamoDBResultStore(dynamodb_client()) if os.getenv('JOBS_TABLE_NAME') \
+        else SQLiteResultStore(os.getenv('JOBS_DB_PATH', ':memory:'))
+
+
+@lru_cache(maxsize=None)
+def outbox() -> Outbox:
+    return DynamoDBOutbox(dynamodb_client()) if os.getenv('CALLBACKS_TABLE_NAME') \
+        else SQLiteOutbox(os.getenv('CALLBACKS_DB_PATH', ':memory:'))
+
+
+@lru_cache(maxsize=None)
+def cache() -> ResultCache:
+    return DynamoDBResultCache(dynamodb_client()) if os.getenv('RESULTS_CACHE_TABLE_NAME') \
+        else SQLiteResultCache(os.getenv('RESULTS_CACHE_DB_PATH', ':memory:'))
 
 
 def bouncer_lambda_handler(event, context):
     """
     Judge lambda that takes a request (as an API request) and returns the results
-    after running the code on the code runner lambda
+    after running the code on the code runner lambda.
+    `?fields=overall,testResults.status&outputs=failed` shapes the result (see bouncer/responses.py)
+    """
+    print('Event:', type(event), event)
+    print('Context:', context)
+    request = SubmissionRequest.from_json(request_body(event))
+    print('ALl the params:', request)
+
+    result = check_equality(request, outbox=outbox(), cache=cache())
+    return respond(event, 200, shape_result(result.to_dict(encode_json=True), query(event)))
+
+
+def batch_lambda_handler(event, context):
+    """
+    Asynchronous judge of a list of submissions (e.g. regrading a whole class): returns a job for each submission
+    right away, in the order of the submissions. Their results are polled with GET /jobs/{jobId}
+    """
+    print('Context:', context)
+    batch = BatchRequest.from_json(request_body(event))
+    print('Batch of', len(batch.submissions), 'submissions:', [(r.id, r.language) for r in batch.submissions])
+
+    try:
+        submitted = submit_batch(batch.submissions, store=jobs())
+    except ValueError as e:
+        return respond(event, 400, {'error': str(e)})
+    return respond(event, 202, {'jobs': [job.to_dict(encode_json=True) for job in submitted]})
+
+
+def batch_worker_lambda_handler(event, context):
+    """ Judges a part of a batch concurrently (invoked by the batch lambda) and stores the result of each job """
+    batch = BatchRequest.from_dict(event)
+    print('Judging', len(batch.submissions), 'submissions of a batch:', [r.job_id for r in batch.submissions])
+    # The submissions queue for the coderunners as long as the worker can still wait for their results
+    deadline = time.time() + context.get_remaining_time_in_millis() / 1000 - CODERUNNER_SECONDS if context else None
+    results = check_batch(batch.submissions, outbox=outbox(), cache=cache(), store=jobs(), deadline=deadline)
+    return {'judged': len(results)}
+
+
+def submit_lambda_handler(event, context):
+    """
+    Asynchronous judge: returns a job id right away, the result is polled with GET /jobs/{jobId}
+    (or sent to the `callback_url` of the request)
     """
     print('Event:', type(event), event)
     print('Context:', context)
-    request = SubmissionRequest.from_json(event['body'])
+    request = SubmissionRequest.from_json(request_body(event))
     print('ALl the params:', request)
 
-    result = check_equality(request)
-    return {
-        'statusCode': 200,
-        'body': result.to_json(),
-    }
+    try:
+        job = submit_job(request, store=jobs())
+    except ValueError as e:
+        return respond(event, 400, {'error': str(e)})
+    return respond(event, 202, job.to_dict(encode_json=True))
+
+
+def job_status_lambda_handler(event, context):
+    """ Returns the job with its status (pending | done) and the result once it is done """
+    print('Event:', type(event), event)
+    job_id = (event.get('pathParameters') or {}).get('jobId')
+    job = jobs().get(job_id) if job_id else None
+    if job is None:
+        return respond(event, 404, {'error': f'Job {job_id} does not exist (or has expired)'})
+    body = job.to_dict(encode_json=True)
+    body['result'] = shape_result(body['result'], query(event))
+    return respond(event, 200, body)
+
+
+def outbox_drainer_lambda_handler(event, context):
+    """ Scheduled lambda that retries the failed callbacks (so that judging never waits for the callback endpoints) """
+    delivered = drain(outbox())
+    return {'delivered': delivered}
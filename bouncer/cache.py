@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from bouncer.dynamodb import Table
+from models import Status, SubmissionRequest, SubmissionResult
+
+
+class ResultCache(ABC):
+    """
+    Results of the judged submissions keyed by everything that determines them: the code, the language, the limits,
+    the checker settings, the inline tests, the version (digest) of the tests of the problem and the version of the
+    judge (the compilers and the runtimes of the coderunners).
+    Identical submissions get the stored result without invoking a coderunner
+    """
+    TTL = 7 * 24 * 60 * 60      # seconds
+    JUDGE_VERSION = os.getenv('JUDGE_VERSION', '1')     # Changed on each deployment (JudgeVersion in template.yaml)
+    MAX_RESULT_BYTES = 350_000  # DynamoDB items are limited to 400KB (larger results are not cached)
+    # Fields that do not change the result of a submission
+    IGNORED_FIELDS = (
+        'id', 'callbackUrl', 'jobId', 'encryptionKey', 'shardCount', 'shardIndex', 'bypassCache', 'priority',
+    )
+
+    @abstractmethod
+    def get(self, key: str) -> SubmissionResult | None:
+        ...
+
+    @abstractmethod
+    def put(self, key: str, result: SubmissionResult) -> None:
+        ...
+
+    @abstractmethod
+    def problem_digest(self, problem: str) -> str | None:
+        """ The version of the tests of the problem (None if unknown or while they are being synced) """
+        ...
+
+    def key(self, request: SubmissionRequest) -> str | None:
+        """ A canonical hash of the request (None => the result cannot be cached) """
+        digest = None
+        if request.problem:
+            digest = self.problem_digest(request.problem)
+            if digest is None:
+                return None
+
+        data = {name: value for name, value in request.to_dict(encode_json=True).items()
+                if name not in self.IGNORED_FIELDS}
+        data['problemDigest'] = digest
+        data['judgeVersion'] = self.JUDGE_VERSION
+        return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def cacheable(result: SubmissionResult) -> bool:
+        # Failures of the judge (SKIPPED) and time limits (depend on the load of the machine) are judged again
+        return result.overall.status not in (Status.SKIPPED, Status.TLE)
+
+    @classmethod
+    def encode_result(cls, result: SubmissionResult) -> bytes | None:
+        data = gzip.compress(result.to_json().encode('utf-8'))
+        return data if len(data) <= cls.MAX_RESULT_BYTES else None
+
+    @staticmethod
+    def decode_result(data: bytes) -> SubmissionResult:
+        return SubmissionResult.from_json(gzip.decompress(data).decode('utf-8'))
+
+
+class DynamoDBResultCache(ResultCache):
+    TABLE_NAME = os.getenv('RESULTS_CACHE_TABLE_NAME', 'judge-results-cache')
+    PROBLEMS_TABLE_NAME = os.getenv('DYNAMODB_TABLE_NAME', 'private-tests')    # Written by the sync (SummaryTable)
+
+    def __init__(self, client):
+        self.table = Table(client, self.TABLE_NAME)
+        self.problems = Table(client, self.PROBLEMS_TABLE_NAME)
+        print(f'Initialized DynamoDBResultCache: {self.TABLE_NAME} (problems: {self.PROBLEMS_TABLE_NAME})')
+
+    def get(self, key: str) -> SubmissionResult | None:
+        item = self.table.get_item(Key={'id': key}).get('Item')
+        if item is None or int(item['expires_at']) < time.time():    # TTL deletions can be late
+            return None
+        return self.decode_result(item['result'].value)
+
+    def put(self, key: str, result: SubmissionResult) -> None:
+        data = self.encode_result(result)
+        if data is not None:
+            self.table.put_item(Item={'id': key, 'result': data, 'expires_at': int(time.time()) + self.TTL})
+
+    def problem_digest(self, problem: str) -> str | None:
+        item = self.problems.get_item(Key={'id': problem}, ProjectionExpression='#s, digest',
+                                      ExpressionAttributeNames={'#s': 'status'}).get('Item')
+        if item is None or item.get('status') != 'completed':
+            return None
+        return item.get('digest')
+
+
+class SQLiteResultCache(ResultCache):
+    """ A stand-in for local runs and tests (`:memory:` by default), the digests of the problems are given """
+
+    def __init__(self, path: str = ':memory:', problem_digests: dict[str, str] | None = None):
+        self.problem_digests = problem_digests or {}
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS results (id TEXT PRIMARY KEY, result BLOB NOT NULL, expires_at INTEGER)'
+        )
+
+    def get(self, key: str) -> SubmissionResult | None:
+        with self.lock:
+            row = self.db.execute('SELECT result FROM results WHERE id = ? AND expires_at >= ?',
+                                  (key, int(time.time()))).fetchone()
+        return self.decode_result(row[0]) if row else None
+
+    def put(self, key: str, result: SubmissionResult) -> None:
+        data = self.encode_result(result)
+        if data is None:
+            return
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM results WHERE expires_at < ?', (int(time.time()),))
+            self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?)', (key, data, int(time.time()) + self.TTL))
+
+    def problem_digest(self, problem: str) -> str | None:
+        return self.problem_digests.get(problem)
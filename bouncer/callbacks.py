@@ -0,0 +1,197 @@
+import gzip
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from bouncer.dynamodb import Table
+from bouncer.jobs import ResultStore
+from models import SubmissionResult
+
+# One pooled session per container: keep-alive connections to the callback endpoints across invocations.
+# Created on the first callback => the handlers that never call back do not import `requests` (~100ms cold start)
+session = None
+session_lock = threading.Lock()
+requests = None     # The module, imported with the session
+
+TIMEOUT = (3.05, 5)     # (connect, read) seconds => a slow endpoint never blocks judging for long
+MAX_ATTEMPTS = 8
+MAX_DELAY = 30 * 60     # seconds between the attempts of the outbox drainer
+TRUNCATED_HEADER = 'X-Judge-Result-Truncated'   # Sent with the retries of a result too large to keep in the outbox
+
+
+@dataclass
+class Delivery:
+    id: str
+    url: str
+    result: SubmissionResult
+    attempts: int = 0
+    next_attempt_at: float = 0
+    truncated: bool = False     # The outbox only kept the trimmed result (see encode_result())
+
+
+def backoff(attempts: int) -> float:
+    """ Exponential backoff with jitter """
+    return min(2 * 60 * 2 ** (attempts - 1) + random.randint(0, 1000) / 1000, MAX_DELAY)
+
+
+def encode_result(result: SubmissionResult) -> tuple[bytes, bool]:
+    """
+    The whole result as long as it fits in an item => the retries send the same payload as the first attempt.
+    Otherwise, the trimmed result of the job store, sent with the TRUNCATED_HEADER
+    """
+    data = gzip.compress(result.to_json().encode('utf-8'))
+    if len(data) <= ResultStore.MAX_RESULT_BYTES:
+        return data, False
+    return ResultStore.encode_result(result), True
+
+
+def get_session():
+    global session, requests
+    with session_lock:
+        if requests is None:
+            import requests
+        if session is None:
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=0))
+            session.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=0))
+        return session
+
+
+def deliver(url: str, result: SubmissionResult, truncated: bool = False) -> bool:
+    try:
+        headers = {TRUNCATED_HEADER: 'true'} if truncated else None
+        r = get_session().post(url, json=result.to_dict(encode_json=True), headers=headers, timeout=TIMEOUT)
+        print('Callback response:', r.status_code, r.reason)
+        return r.status_code == 200
+    except requests.RequestException as e:     # Imported by get_session()
+        print('Failed callback attempt:', e)
+        return False
+
+
+class Outbox(ABC):
+    """ The callbacks that failed, retried later by the drainer (drain()) instead of the judging lambda """
+
+    @abstractmethod
+    def add(self, delivery: Delivery) -> None:
+        ...
+
+    @abstractmethod
+    def due(self, now: float, limit: int) -> list[Delivery]:
+        ...
+
+    @abstractmethod
+    def remove(self, delivery_id: str) -> None:
+        ...
+
+
+def dispatch(url: str, result: SubmissionResult, outbox: Outbox) -> bool:
+    """ One attempt right away, the retries are left to the outbox => returns whether the callback was delivered """
+    print('Sending results to the callback url:', url)
+    if deliver(url, result):
+        return True
+
+    delivery = Delivery(id=str(uuid.uuid4()), url=url, result=result,
+                        attempts=1, next_attempt_at=time.time() + backoff(1))
+    print('Callback failed => retrying later from the outbox:', delivery.id)
+    outbox.add(delivery)
+    return False
+
+
+def drain(outbox: Outbox, limit: int = 100) -> int:
+    """ Retries the due callbacks and returns the number of the delivered ones """
+    delivered = 0
+    for delivery in outbox.due(now=time.time(), limit=limit):
+        delivery.attempts += 1
+        if deliver(delivery.url, delivery.result, truncated=delivery.truncated):
+            outbox.remove(delivery.id)
+            delivered += 1
+        elif delivery.attempts >= MAX_ATTEMPTS:
+            print(f'Giving up on the callback {delivery.id} to {delivery.url} after {delivery.attempts} attempts')
+            outbox.remove(delivery.id)
+        else:
+            delivery.next_attempt_at = time.time() + backoff(delivery.attempts)
+            outbox.add(delivery)
+    return delivered
+
+
+class DynamoDBOutbox(Outbox):
+    TABLE_NAME = os.getenv('CALLBACKS_TABLE_NAME', 'judge-callbacks')
+    TTL = 24 * 60 * 60
+
+    def __init__(self, client):
+        self.table = Table(client, self.TABLE_NAME)
+        print(f'Initialized DynamoDBOutbox: {self.TABLE_NAME}')
+
+    def add(self, delivery: Delivery) -> None:
+        result, truncated = encode_result(delivery.result)
+        self.table.put_item(Item={
+            'id': delivery.id,
+            'url': delivery.url,
+            'result': result,
+            'truncated': truncated or delivery.truncated,
+            'attempts': delivery.attempts,
+            'next_attempt_at': int(delivery.next_attempt_at),
+            'expires_at': int(time.time()) + self.TTL,
+        })
+
+    def due(self, now: float, limit: int) -> list[Delivery]:
+        # The outbox only holds the failed callbacks => a small table to scan.
+        # A page of a scan is at most 1MB before filtering (a few large results) => go through the pages
+        items, params = [], {
+            'FilterExpression': 'next_attempt_at <= :now', 'ExpressionAttributeValues': {':now': int(now)},
+        }
+        while len(items) < limit:
+            page = self.table.scan(**params)
+            items += page['Items']
+            if 'LastEvaluatedKey' not in page:
+                break
+            params['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+        return [Delivery(
+            id=item['id'], url=item['url'], result=ResultStore.decode_result(item['result'].value),
+            attempts=int(item['attempts']), next_attempt_at=float(item['next_attempt_at']),
+            truncated=bool(item.get('truncated', False)),
+        ) for item in items[:limit]]
+
+    def remove(self, delivery_id: str) -> None:
+        self.table.delete_item(Key={'id': delivery_id})
+
+
+class SQLiteOutbox(Outbox):
+    """ A stand-in for local runs and tests (`:memory:` or a file) """
+
+    def __init__(self, path: str = ':memory:'):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS outbox '
+            '(id TEXT PRIMARY KEY, url TEXT NOT NULL, result BLOB NOT NULL, attempts INTEGER, next_attempt_at REAL, '
+            'truncated INTEGER)'
+        )
+
+    def add(self, delivery: Delivery) -> None:
+        result, truncated = encode_result(delivery.result)
+        with self.lock, self.db:
+            self.db.execute('INSERT OR REPLACE INTO outbox VALUES (?, ?, ?, ?, ?, ?)', (
+                delivery.id, delivery.url, result, delivery.attempts, delivery.next_attempt_at,
+                truncated or delivery.truncated,
+            ))
+
+    def due(self, now: float, limit: int) -> list[Delivery]:
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT id, url, result, attempts, next_attempt_at, truncated FROM outbox WHERE next_attempt_at <= ? '
+                'ORDER BY next_attempt_at LIMIT ?', (now, limit),
+            ).fetchall()
+        return [Delivery(id=row[0], url=row[1], result=ResultStore.decode_result(row[2]),
+                         attempts=row[3], next_attempt_at=row[4], truncated=bool(row[5])) for row in rows]
+
+    def remove(self, delivery_id: str) -> None:
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM outbox WHERE id = ?', (delivery_id,))
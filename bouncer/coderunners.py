@@ -1,8 +1,15 @@
 import json
+import os
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 
-from models import SubmissionRequest, SubmissionResult
+from models import SubmissionRequest, SubmissionResult, decode_envelope, encode_envelope, preferred_envelope_codec
+
+# Envelope of the synchronous invocations: `json` => plain JSON (the format of the asynchronous ones), `auto` => plain
+# JSON unless the request gets close to the 6MB payload limit of Lambda (the envelopes cost more CPU than plain JSON),
+# or a codec of models.ENVELOPE_CODECS for all the requests
+ENVELOPE_CODEC = os.getenv('ENVELOPE_CODEC', 'auto')
+ENVELOPE_MIN_BYTES = 4 * 1024 * 1024
 
 
 class CodeRunner(ABC):
@@ -66,11 +73,25 @@ class CodeRunner(ABC):
             return SQLiteRunner()
         raise ValueError(f'{language} does not have a compiler yet')
 
+    @staticmethod
+    def encode_request(request: SubmissionRequest) -> str:
+        payload = request.to_json()
+        codec = ENVELOPE_CODEC
+        if codec == 'auto':
+            codec = preferred_envelope_codec() if len(payload) >= ENVELOPE_MIN_BYTES else 'json'
+        if codec == 'json':
+            return payload
+        print(f'Request of {len(payload)} bytes => {codec} envelope')
+        return json.dumps(encode_envelope(request.to_dict(encode_json=True), codec))
+
     def invoke(self, aws_lambda_client, request: SubmissionRequest) -> SubmissionResult:
-        res = aws_lambda_client.invoke(FunctionName=self.name, Payload=request.to_json())['Payload']
+        payload = self.encode_request(request)
+        res = aws_lambda_client.invoke(FunctionName=self.name, Payload=payload)['Payload']
         res = res.read().decode('utf-8')
         res = json.loads(res)
         print('invocation result:', res)
+        if isinstance(res, dict) and 'envelope' in res:     # The coderunner replied in the codec of the request
+            return SubmissionResult.from_dict(decode_envelope(res))
         return SubmissionResult.from_json(res)
 
 
@@ -0,0 +1,55 @@
+from typing import Any
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+serializer, deserializer = TypeSerializer(), TypeDeserializer()
+
+
+def serialize(item: dict[str, Any]) -> dict[str, dict]:
+    return {name: serializer.serialize(value) for name, value in item.items()}
+
+
+def deserialize(item: dict[str, dict]) -> dict[str, Any]:
+    return {name: deserializer.deserialize(value) for name, value in item.items()}
+
+
+class Table:
+    """
+    The calls of a boto3 `Table` resource (the same arguments and items) on top of a low-level DynamoDB client.
+    boto3 resources are not thread-safe, the clients are => a single client is shared by all the threads of a bouncer
+    (e.g., the submissions of a batch judged concurrently store their jobs and cache their results)
+    """
+    ITEM_ARGUMENTS = ('Item', 'Key', 'ExclusiveStartKey', 'ExpressionAttributeValues')
+
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+        self.exceptions = client.exceptions
+
+    def call(self, operation: str, **kwargs) -> dict:
+        for argument in self.ITEM_ARGUMENTS:
+            if argument in kwargs:
+                kwargs[argument] = serialize(kwargs[argument])
+        response = getattr(self.client, operation)(TableName=self.name, **kwargs)
+        if 'Item' in response:
+            response['Item'] = deserialize(response['Item'])
+        if 'Items' in response:
+            response['Items'] = [deserialize(item) for item in response['Items']]
+        if 'LastEvaluatedKey' in response:
+            response['LastEvaluatedKey'] = deserialize(response['LastEvaluatedKey'])
+        return response
+
+    def get_item(self, **kwargs) -> dict:
+        return self.call('get_item', **kwargs)
+
+    def put_item(self, **kwargs) -> dict:
+        return self.call('put_item', **kwargs)
+
+    def update_item(self, **kwargs) -> dict:
+        return self.call('update_item', **kwargs)
+
+    def delete_item(self, **kwargs) -> dict:
+        return self.call('delete_item', **kwargs)
+
+    def scan(self, **kwargs) -> dict:
+        return self.call('scan', **kwargs)
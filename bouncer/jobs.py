@@ -0,0 +1,118 @@
+import copy
+import gzip
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from typing import Literal
+
+from bouncer.dynamodb import Table
+from models import DataClassJsonCamelMixIn, RunResult, SubmissionResult
+
+
+@dataclass
+class Job(DataClassJsonCamelMixIn):
+    id: str
+    status: Literal['pending', 'done']
+    created_at: int                         # unix seconds
+    result: SubmissionResult | None = None
+
+
+class ResultStore(ABC):
+    """
+    Keeps the jobs of the asynchronous judges: `pending` when submitted, `done` with the result once the coderunner
+    finishes (written by the BatchWorker), until the client polls them
+    """
+    TTL = 24 * 60 * 60          # seconds
+    MAX_RESULT_BYTES = 350_000  # DynamoDB items are limited to 400KB
+
+    @abstractmethod
+    def put(self, job: Job) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Job | None:
+        ...
+
+    @classmethod
+    def encode_result(cls, result: SubmissionResult) -> bytes:
+        """ Trims a copy of the result to fit in an item (the caller still returns or sends the whole result) """
+        data = gzip.compress(result.to_json().encode('utf-8'))
+        if len(data) <= cls.MAX_RESULT_BYTES:
+            return data
+
+        # Same as the coderunners do above 1MB: keep the verdicts and drop the outputs
+        result = copy.deepcopy(result)
+        result.omit_outputs('Omitted outputs as the size of results exceeds the limit of the result store')
+        data = gzip.compress(result.to_json().encode('utf-8'))
+        if len(data) <= cls.MAX_RESULT_BYTES:
+            return data
+
+        # Still too large (e.g., a huge compilation log or linting report) => only the overall verdict
+        message = 'Omitted the details of the result as its size exceeds the limit of the result store'
+
+        def verdict(r: RunResult) -> RunResult:
+            return replace(r, message=message, outputs=None, errors=None, output_files=None, output_assets=None)
+        result = SubmissionResult(overall=verdict(result.overall), compile_result=verdict(result.compile_result))
+        return gzip.compress(result.to_json().encode('utf-8'))
+
+    @staticmethod
+    def decode_result(data: bytes | None) -> SubmissionResult | None:
+        return SubmissionResult.from_json(gzip.decompress(data).decode('utf-8')) if data else None
+
+
+class DynamoDBResultStore(ResultStore):
+    TABLE_NAME = os.getenv('JOBS_TABLE_NAME', 'judge-jobs')
+
+    def __init__(self, client):
+        self.table = Table(client, self.TABLE_NAME)
+        print(f'Initialized DynamoDBResultStore: {self.TABLE_NAME}')
+
+    def put(self, job: Job) -> None:
+        item = {
+            'id': job.id,
+            'status': job.status,
+            'created_at': job.created_at,
+            'expires_at': job.created_at + self.TTL,    # DynamoDB TTL attribute
+        }
+        if job.result is not None:
+            item['result'] = self.encode_result(job.result)
+        self.table.put_item(Item=item)
+
+    def get(self, job_id: str) -> Job | None:
+        item = self.table.get_item(Key={'id': job_id}).get('Item')
+        if item is None:
+            return None
+        result = item.get('result')
+        return Job(
+            id=item['id'], status=item['status'], created_at=int(item['created_at']),
+            result=self.decode_result(result.value if result is not None else None),
+        )
+
+
+class SQLiteResultStore(ResultStore):
+    """ A stand-in for local runs and tests (`:memory:` by default) """
+
+    def __init__(self, path: str = ':memory:'):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS jobs '
+            '(id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at INTEGER NOT NULL, result BLOB)'
+        )
+
+    def put(self, job: Job) -> None:
+        result = self.encode_result(job.result) if job.result is not None else None
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM jobs WHERE created_at < ?', (int(time.time()) - self.TTL,))
+            self.db.execute('INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?)',
+                            (job.id, job.status, job.created_at, result))
+
+    def get(self, job_id: str) -> Job | None:
+        with self.lock:
+            row = self.db.execute('SELECT id, status, created_at, result FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        return Job(id=row[0], status=row[1], created_at=row[2], result=self.decode_result(row[3]))
@@ -0,0 +1,117 @@
+import base64
+import gzip
+import json
+
+from models import Status
+
+MIN_COMPRESSION_BYTES = 1024    # Smaller bodies are sent as they are (same as the API Gateway default)
+OUTPUT_FIELDS = ('outputs', 'errors', 'outputFiles', 'outputAssets')
+
+
+def compressors() -> dict:
+    """ Content encodings the bouncer can produce, most compact first """
+    encodings = {}
+    try:
+        import brotli
+        encodings['br'] = lambda data: brotli.compress(data, quality=5)
+    except ImportError:
+        pass
+    encodings['gzip'] = lambda data: gzip.compress(data, compresslevel=6, mtime=0)
+    return encodings
+
+
+def headers(event: dict) -> dict[str, str]:
+    return {name.lower(): value for name, value in (event.get('headers') or {}).items()}
+
+
+def query(event: dict) -> dict[str, str]:
+    return event.get('queryStringParameters') or {}
+
+
+def request_body(event: dict) -> str:
+    """ The API has binary media types (for the compressed responses) => API Gateway base64-encodes the bodies """
+    body = event.get('body') or ''
+    return base64.b64decode(body).decode('utf-8') if event.get('isBase64Encoded') else body
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """ The most compact encoding accepted by the client (`Accept-Encoding: br;q=1.0, gzip;q=0.8, *;q=0.1`) """
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        weight = 1.
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.
+        if name:
+            accepted[name.strip().lower()] = weight
+
+    candidates = [
+        (accepted.get(encoding, accepted.get('*', 0)), -rank, encoding)
+        for rank, encoding in enumerate(compressors())
+    ]
+    weight, _, encoding = max(candidates)
+    return encoding if weight > 0 else None
+
+
+def project(data, paths: list[str]):
+    """
+    Keeps only the requested fields: `overall,testResults.status,testResults.time` (camelCase, as in the responses).
+    A path through a list applies to each of its items
+    """
+    tree = {}
+    for path in paths:
+        node = tree
+        for key in path.strip().split('.'):
+            if key:
+                node = node.setdefault(key, {})
+
+    def select(value, node: dict):
+        if not node:
+            return value
+        if isinstance(value, list):
+            return [select(item, node) for item in value]
+        if isinstance(value, dict):
+            return {key: select(value[key], child) for key, child in node.items() if key in value}
+        return value
+    return select(data, tree)
+
+
+def shape_result(result: dict | None, params: dict[str, str]) -> dict | None:
+    """
+    Applies the query parameters of the client to a SubmissionResult (as a dict):
+    `outputs=failed` keeps the outputs of the failed tests only, `fields=...` projects the result (see project())
+    """
+    if result is None:
+        return None
+    if params.get('outputs') == 'failed':
+        for test in result.get('testResults') or []:
+            if test.get('status') == Status.OK.value:
+                for field in OUTPUT_FIELDS:
+                    test.pop(field, None)
+    if params.get('fields'):
+        result = project(result, params['fields'].split(','))
+    return result
+
+
+def respond(event: dict, status_code: int, body: dict | list) -> dict:
+    """ A JSON response compressed with the encoding negotiated from `Accept-Encoding` """
+    data = json.dumps(body, separators=(',', ':')).encode('utf-8')
+    response_headers = {'Content-Type': 'application/json', 'Vary': 'Accept-Encoding'}
+
+    encoding = negotiate_encoding(headers(event).get('accept-encoding')) if len(data) >= MIN_COMPRESSION_BYTES else None
+    if encoding is None:
+        return {'statusCode': status_code, 'headers': response_headers, 'body': data.decode('utf-8')}
+
+    compressed = compressors()[encoding](data)
+    print(f'Response: {len(data)} bytes => {encoding} {len(compressed)} bytes')
+    return {
+        'statusCode': status_code,
+        'headers': {**response_headers, 'Content-Encoding': encoding},
+        'body': base64.b64encode(compressed).decode('ascii'),
+        'isBase64Encoded': True,
+    }
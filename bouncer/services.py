@@ -1,51 +1,295 @@
 import copy
 import os
 import random
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
-import requests
 from botocore.config import Config
+from botocore.exceptions import ClientError
 
+from bouncer.admission import DEADLINES, Admission, AdmissionTimeout, DynamoDBSlotStore, InMemorySlotStore
+from bouncer.cache import ResultCache
+from bouncer.callbacks import Outbox, dispatch
 from bouncer.coderunners import CodeRunner
-from models import RunResult, Status, SubmissionRequest, SubmissionResult
+from bouncer.jobs import Job, ResultStore
+from coderunners.scoring import score_results
+from models import BatchRequest, RunResult, Status, SubmissionRequest, SubmissionResult
 
-aws_lambda = boto3.client('lambda', config=Config(retries={'max_attempts': 0}, read_timeout=360, connect_timeout=360))
+BATCH_WORKERS = 256          # Invocations are I/O bound => a batch takes about as long as its slowest submission
+MAX_PER_CODERUNNER = 128     # Concurrent invocations of a single coderunner (its share of the account concurrency)
+MAX_BATCH_SIZE = 1000
+MAX_EVENT_BYTES = 250_000    # Asynchronous invocations are limited to 256KB => the batch is split into parts
+BATCH_WORKER = os.getenv('BATCH_WORKER_NAME', 'BatchWorker')
+CODERUNNER_SECONDS = 6 * 60  # Timeout of the coderunners => the batch worker admits a submission only if it can wait
+MAX_OUTPUT_BYTES = 1 * 1024 * 1024  # Outputs of the tests returned by a coderunner (see coderunners/services.py)
+THROTTLING_ERRORS = {'TooManyRequestsException', 'ThrottlingException'}
 
 
-def check_equality(request: SubmissionRequest) -> SubmissionResult:
-    callback_url = copy.copy(request.callback_url)
-    print(f'callback_url: {callback_url}')
-    request.callback_url = None
+# Created on first use => the handlers that never invoke a coderunner (job status, outbox drainer) skip them at init
+aws_lambda = None
+dynamodb = None
+admission: Admission | None = None
+clients_lock = threading.RLock()    # The threads of a batch ask for them at the same time
+
+
+def lambda_client():
+    global aws_lambda
+    with clients_lock:
+        if aws_lambda is None:
+            aws_lambda = boto3.client('lambda', config=Config(
+                retries={'max_attempts': 0}, read_timeout=360, connect_timeout=360,
+                max_pool_connections=BATCH_WORKERS,     # One connection per thread of a batch (10 by default)
+            ))
+        return aws_lambda
+
+
+def dynamodb_client():
+    """ Shared by the stores of the bouncer: unlike the boto3 resources, the clients are thread-safe """
+    global dynamodb
+    with clients_lock:
+        if dynamodb is None:
+            dynamodb = boto3.client('dynamodb', config=Config(max_pool_connections=BATCH_WORKERS))
+        return dynamodb
 
+
+def admission_control() -> Admission:
+    """ Concurrency budgets of the coderunners shared by all the bouncers (a single process for local runs) """
+    global admission
+    with clients_lock:
+        if admission is None:
+            admission = Admission(DynamoDBSlotStore(dynamodb_client()) if os.getenv('ADMISSION_TABLE_NAME')
+                                  else InMemorySlotStore())
+        return admission
+
+
+def prepare(request: SubmissionRequest) -> None:
     if request.problem:
         # If problem is provided => we'll need an encryption key to decrypt the problem on EFS
         request.encryption_key = os.getenv('EFS_PROBLEMS_ENCRYPTION_KEY')
 
-    coderunner = CodeRunner.from_language(language=request.language)
-    print('coderunner:', coderunner)
+
+def failed_run() -> SubmissionResult:
+    failed = RunResult(status=Status.SKIPPED, time=0, memory=0, return_code=1, message='Failed to run the code')
+    return SubmissionResult(overall=failed, compile_result=failed)
+
+
+def invoke(
+    coderunner: CodeRunner, request: SubmissionRequest, deadline: float | None = None, max_attempts: int = 6,
+) -> SubmissionResult:
+    """
+    Invokes the coderunner once admitted within its budget before the `deadline` (see bouncer/admission.py),
+    and retries the invocations throttled by Lambda (account concurrency) with exponential backoff and jitter
+    """
+    with admission_control().slot(coderunner.name, priority=request.priority, deadline=deadline):
+        for attempt in range(max_attempts):
+            try:
+                return coderunner.invoke(lambda_client(), request=request)
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') not in THROTTLING_ERRORS or attempt == max_attempts - 1:
+                    raise
+                delay = min(0.5 * 2 ** attempt + random.random(), 10)
+                print(f'Throttled ({e}) => retrying in {delay:.2f} seconds...')
+                time.sleep(delay)
+
+
+def merge_shards(request: SubmissionRequest, shards: list[SubmissionResult]) -> SubmissionResult:
+    """ Merges the results of the shards (in order) into the result of a single run over all the tests """
+    failed = next((shard for shard in shards if shard.test_results is None), None)
+    if failed is not None:      # Compilation, linting or checker failure
+        return failed
+
+    test_results = [r for shard in shards for r in shard.test_results]
+    first_failed = next((i for i, r in enumerate(test_results) if r.status != Status.OK), None)
+    if not request.test_groups and request.stop_on_first_fail and first_failed is not None:
+        # A single run would have stopped at the first failed test => the later shards are skipped
+        test_results[first_failed + 1:] = [
+            RunResult(status=Status.SKIPPED, memory=0, time=0, return_code=0)
+        ] * (len(test_results) - first_failed - 1)
+
+    total_size = 0
+    for r in test_results:
+        total_size += len(r.to_json())
+        if total_size >= MAX_OUTPUT_BYTES and (r.outputs or r.errors or r.output_files or r.output_assets):
+            r.outputs, r.errors, r.output_files, r.output_assets = None, None, None, None
+            r.message = 'Omitted outputs as the size of results exceeds 1MB'
+
+    overall = score_results(test_results, request.test_groups)
+    return SubmissionResult(
+        overall=overall, compile_result=shards[0].compile_result, linting_result=shards[0].linting_result,
+        test_results=test_results,
+    )
+
+
+def check_sharded(
+    coderunner: CodeRunner, request: SubmissionRequest, deadline: float | None = None,
+) -> SubmissionResult:
+    """
+    Judges the ranges of the tests (see coderunners/scoring.py: shard_range) in parallel coderunners.
+    At most as many shards as the class of the submission can run at once => all of them wait for the same deadline
+    """
+    request = copy.copy(request)
+    request.shard_count = min(request.shard_count, admission_control().limit(coderunner.name, request.priority))
+    deadline = time.time() + DEADLINES[request.priority] if deadline is None else deadline
+
+    def shard(index: int) -> SubmissionRequest:
+        shard_request = copy.copy(request)
+        shard_request.shard_index = index
+        shard_request.lint = request.lint and index == 0     # The same code => linted once
+        return shard_request
+
+    with ThreadPoolExecutor(max_workers=request.shard_count) as pool:
+        shards = list(pool.map(lambda i: invoke(coderunner, request=shard(i), deadline=deadline),
+                               range(request.shard_count)))
+    return merge_shards(request, shards)
+
+
+def cached_result(request: SubmissionRequest, cache: ResultCache | None) -> tuple[str | None, SubmissionResult | None]:
+    """ Returns (cache key | None if not cacheable, cached result | None) """
+    if cache is None:
+        return None, None
     try:
-        res = coderunner.invoke(aws_lambda, request=request)
+        key = cache.key(request)
+        return key, cache.get(key) if key and not request.bypass_cache else None
     except Exception as e:
-        print('Failed to run the code:', e)
-        failed_run = RunResult(status=Status.SKIPPED, time=0, memory=0, return_code=1, message='Failed to run the code')
-        res = SubmissionResult(overall=failed_run, compile_result=failed_run)
+        print('Failed to read the result cache:', e)
+        return None, None
+
+
+def cache_result(request: SubmissionRequest, key: str | None, res: SubmissionResult, cache: ResultCache | None) -> None:
+    if cache is None or key is None or not cache.cacheable(res):
+        return
+    try:
+        # The tests of the problem could have been synced while judging => the result belongs to neither version
+        if cache.key(request) == key:
+            cache.put(key, res)
+    except Exception as e:
+        print('Failed to write the result cache:', e)
+
+
+def check_equality(
+    request: SubmissionRequest, outbox: Outbox, cache: ResultCache | None = None, deadline: float | None = None,
+) -> SubmissionResult:
+    """ Judges the submission (waits for a coderunner until the `deadline`, DEADLINES of its priority by default) """
+    callback_url = copy.copy(request.callback_url)
+    print(f'callback_url: {callback_url}')
+    request.callback_url = None
+    prepare(request)
+
+    coderunner = CodeRunner.from_language(language=request.language)
+    print('coderunner:', coderunner)
+    key, res = cached_result(request, cache)
+    if res is not None:
+        print('Identical submission judged before => the cached result:', key)
+    else:
+        try:
+            if request.shard_count > 1:
+                res = check_sharded(coderunner, request=request, deadline=deadline)
+            else:
+                res = invoke(coderunner, request=request, deadline=deadline)
+            cache_result(request, key, res, cache)
+        except AdmissionTimeout as e:
+            print('Not admitted:', e)
+            res = failed_run()
+            res.overall.message = f'The judge is busy, please try again later ({e})'
+        except Exception as e:
+            print('Failed to run the code:', e)
+            res = failed_run()
 
     if callback_url is not None:
-        print('Sending results to the callback url:\n', res.to_dict(encode_json=True))
-        for attempt in range(8):
+        dispatch(callback_url, res, outbox=outbox)
+    return res
+
+
+def check_batch(
+    requests: list[SubmissionRequest], outbox: Outbox, cache: ResultCache | None = None,
+    store: ResultStore | None = None, deadline: float | None = None,
+) -> list[SubmissionResult]:
+    """
+    Judges all the submissions concurrently (at most MAX_PER_CODERUNNER at a time for each coderunner)
+    and returns the results in the order of the requests.
+    The submissions queue for the coderunners until the `deadline` (the batch worker can still judge them then),
+    not the deadline of an interactive submission of their priority.
+    The result of each submission with a job (see submit_batch()) is stored as soon as it is judged
+    """
+    if len(requests) > MAX_BATCH_SIZE:
+        raise ValueError(f'At most {MAX_BATCH_SIZE} submissions can be judged in a batch, got {len(requests)}')
+
+    def coderunner_name(request: SubmissionRequest) -> str | None:
+        try:
+            return CodeRunner.from_language(language=request.language).name
+        except ValueError:
+            return None
+    names = [coderunner_name(request) for request in requests]
+    limits = {name: threading.Semaphore(MAX_PER_CODERUNNER) for name in set(names)}
+
+    def check(request: SubmissionRequest, name: str | None) -> SubmissionResult:
+        with limits[name]:
             try:
-                r = requests.post(callback_url, json=res.to_dict(encode_json=True))
-                print('Callback response:', r.status_code, r.reason)
-                if r.status_code == 200:
-                    break
-            except requests.RequestException as e:
-                print('Failed callback attempt:', attempt, e)
-
-            # Calculate the delay using exponential backoff with jitter.
-            base_delay = 2
-            delay = min(base_delay * (2 ** attempt) + (random.randint(0, 1000) / 1000), 20)
-            print(f'Waiting for {delay:.2f} seconds before retrying...')
-            time.sleep(delay)
+                res = check_equality(request, outbox=outbox, cache=cache, deadline=deadline)
+            except Exception as e:
+                print('Failed to judge a submission of the batch:', request.id, e)
+                res = failed_run()
+        if store is not None and request.job_id:
+            store.put(Job(id=request.job_id, status='done', created_at=int(time.time()), result=res))
+        return res
 
-    return res
+    with ThreadPoolExecutor(max_workers=max(min(BATCH_WORKERS, len(requests)), 1)) as pool:
+        return list(pool.map(check, requests, names))
+
+
+def submit_batch(requests: list[SubmissionRequest], store: ResultStore) -> list[Job]:
+    """
+    Creates a pending job for each submission and hands them to the batch worker (asynchronous invocations of
+    at most MAX_EVENT_BYTES each, judged with check_batch()) => returns right away even for a whole class,
+    while API Gateway cuts the requests at 29 seconds.
+    The results are polled with GET /jobs/{jobId} (or sent to the `callback_url` of each submission)
+    """
+    if len(requests) > MAX_BATCH_SIZE:
+        raise ValueError(f'At most {MAX_BATCH_SIZE} submissions can be judged in a batch, got {len(requests)}')
+    too_large = [i for i, request in enumerate(requests) if len(request.to_json()) > MAX_EVENT_BYTES]
+    if too_large:
+        raise ValueError(f'The submissions {too_large} of the batch are larger than {MAX_EVENT_BYTES} bytes '
+                         f'(the limit of asynchronous invocations) => judge them with POST /check')
+
+    jobs = [Job(id=str(uuid.uuid4()), status='pending', created_at=int(time.time())) for _ in requests]
+    with ThreadPoolExecutor(max_workers=32) as pool:    # Before the invocations => the worker never races with them
+        list(pool.map(store.put, jobs))
+
+    parts, size = [], 0
+    for request, job in zip(requests, jobs):
+        request.job_id = job.id
+        request_size = len(request.to_json())
+        if not parts or size + request_size > MAX_EVENT_BYTES:
+            parts.append([])
+            size = 0
+        parts[-1].append(request)
+        size += request_size
+
+    for part in parts:
+        try:
+            print(f'Dispatching {len(part)} submissions to {BATCH_WORKER}')
+            lambda_client().invoke(
+                FunctionName=BATCH_WORKER, InvocationType='Event', Payload=BatchRequest(submissions=part).to_json(),
+            )
+        except Exception as e:
+            print('Failed to dispatch a part of the batch:', e)
+            for request in part:
+                store.put(Job(id=request.job_id, status='done', created_at=int(time.time()), result=failed_run()))
+    return jobs
+
+
+def submit_job(request: SubmissionRequest, store: ResultStore) -> Job:
+    """
+    A batch of a single submission => returns the pending job right away, the BatchWorker judges it within the
+    admission budgets of the coderunners (see check_batch()) and stores its result (or sends it to the `callback_url`)
+    """
+    size = len(request.to_json())
+    if size > MAX_EVENT_BYTES:
+        raise ValueError(f'The submission has {size} bytes, asynchronous invocations are limited to '
+                         f'{MAX_EVENT_BYTES} bytes => judge it with POST /check')
+    job, = submit_batch([request], store=store)
+    print('job:', job.id)
+    return job
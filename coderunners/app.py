@@ -1,5 +1,6 @@
+from coderunners.daemons import restart_daemons
 from coderunners.services import EqualityChecker
-from models import SubmissionResult
+from models import SubmissionResult, decode_envelope, encode_envelope
 
 
 def run_code_lambda(event, context):
@@ -8,10 +9,20 @@ def run_code_lambda(event, context):
     This lambda has no internet access and no permissions to access resources
     It is run on an isolated container after which the results are returned to the "caller" function
     """
-    print('Event:', type(event), event)
     print('Context:', context)
+    # The bouncer can send a compact envelope (see models.py) => the results are returned in the same codec
+    codec = event.get('envelope')
+    if codec:
+        print('Envelope:', codec, len(event['data']), 'bytes')
+        event = decode_envelope(event)
+    print('Event:', type(event), event)
     checker = EqualityChecker.from_dict(event)
     print('Checker:', checker)
 
-    results: SubmissionResult = checker.check()
+    try:
+        results: SubmissionResult = checker.check()
+    finally:
+        restart_daemons()   # Stopped while the submission ran (see coderunners/daemons.py)
+    if codec:
+        return encode_envelope(results.to_dict(encode_json=True), codec)
     return results.to_json()
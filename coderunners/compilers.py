@@ -1,14 +1,20 @@
 import os
 import shlex
 import shutil
+import sys
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from pathlib import Path
 from typing import ClassVar
 
-from coderunners.executors import Executor, ProcessExecutor, SQLiteExecutor
+from coderunners.daemons import CompileDaemon, java_daemon, kotlin_daemon
+from coderunners.executors import Executor, JvmExecutor, ProcessExecutor, SQLiteExecutor
 from coderunners.process import Process
-from models import RunResult, Status
+from coderunners.util import jar_main_class, overlay_tree
+from models import RunResult, Status, TestCase
+
+BUILD_PROFILES = ('fast', 'optimized')
 
 
 class Compiler(ABC):
@@ -23,16 +29,26 @@ class Compiler(ABC):
                 return path
         return submission_paths[0]
 
+    @staticmethod
+    def has_build_profiles(language: str) -> bool:
+        """ Whether the optimization level of the compiler for `language` depends on the build profile """
+        return hasattr(Compiler.from_language(language=language), 'OPTIMIZATION_FLAGS')
+
     # flake8: noqa: C901
     @staticmethod
-    def from_language(language: str) -> Compiler:
+    def from_language(
+        language: str, sanitizer: str = 'always', type_check: bool = True, jit: bool = False,
+        build_profile: str = 'optimized',
+    ) -> Compiler:
         language = language.lower().strip()
+        if build_profile not in BUILD_PROFILES:
+            raise ValueError(f'{build_profile} build profile is not supported')
         if language in TxtCompiler.supported_standards:
             return TxtCompiler()
         if language in CCompiler.supported_standards:
-            return CCompiler(language_standard=language)
+            return CCompiler(language_standard=language, build_profile=build_profile)
         if language in CppCompiler.supported_standards:
-            return CppCompiler(language_standard=language)
+            return CppCompiler(language_standard=language, sanitizer=sanitizer, build_profile=build_profile)
         if language in PythonCompiler.supported_standards:
             return PythonCompiler(language_standard=language)
         if language in PythonMLCompiler.supported_standards:
@@ -42,7 +58,7 @@ class Compiler(ABC):
         if language in JsCompiler.supported_standards:
             return JsCompiler(language_standard=language)
         if language in TsCompiler.supported_standards:
-            return TsCompiler(language_standard=language)
+            return TsCompiler(language_standard=language, type_check=type_check)
         if language in RCompiler.supported_standards:
             return RCompiler()
         if language in JuliaCompiler.supported_standards:
@@ -52,15 +68,15 @@ class Compiler(ABC):
         if language in DartCompiler.supported_standards:
             return DartCompiler()
         if language in SwiftCompiler.supported_standards:
-            return SwiftCompiler()
+            return SwiftCompiler(build_profile=build_profile)
         if language in PhpCompiler.supported_standards:
-            return PhpCompiler()
+            return PhpCompiler(jit=jit)
         if language in RubyCompiler.supported_standards:
-            return RubyCompiler()
+            return RubyCompiler(jit=jit)
         if language in LuaCompiler.supported_standards:
             return LuaCompiler()
         if language in RustCompiler.supported_standards:
-            return RustCompiler()
+            return RustCompiler(build_profile=build_profile)
         if language in ZigCompiler.supported_standards:
             return ZigCompiler()
         if language in KotlinCompiler.supported_standards:
@@ -68,9 +84,9 @@ class Compiler(ABC):
         if language in ScalaCompiler.supported_standards:
             return ScalaCompiler()
         if language in HaskellCompiler.supported_standards:
-            return HaskellCompiler()
+            return HaskellCompiler(build_profile=build_profile)
         if language in OcamlCompiler.supported_standards:
-            return OcamlCompiler()
+            return OcamlCompiler(build_profile=build_profile)
         if language in JavaCompiler.supported_standards:
             return JavaCompiler()
         if language in SQLiteCompiler.supported_standards:
@@ -78,6 +94,20 @@ class Compiler(ABC):
         raise ValueError(f'{language} does not have a compiler yet')
 
 
+def predict_build_profile(test_cases: list[TestCase], time_limit: float) -> str:
+    """
+    The optimizer costs seconds of compile time for Rust, Haskell or Swift, and it pays off only if the tests run long
+    enough => a fast build for a few small tests, an optimized one for many tests, large inputs or a generous time limit
+    """
+    input_mb = sum(
+        len(test.input or '') + sum(len(content) for content in (test.input_files or {}).values())
+        for test in test_cases
+    ) / 1024 / 1024
+    if input_mb >= 1 or len(test_cases) * time_limit >= 30:
+        return 'optimized'
+    return 'fast'
+
+
 @dataclass
 class TxtCompiler(Compiler):
     MAIN_FILE_NAME: ClassVar[str] = 'main.txt'
@@ -95,7 +125,9 @@ class TxtCompiler(Compiler):
 @dataclass
 class CCompiler(Compiler):
     MAIN_FILE_NAME: ClassVar[str] = 'main.c'
+    OPTIMIZATION_FLAGS: ClassVar[dict[str, str]] = {'fast': '-O1', 'optimized': '-O3'}
     language_standard: str
+    build_profile: str = 'optimized'
     supported_standards = {'c', 'c11', 'c17', 'c23'}
 
     def __post_init__(self):
@@ -110,7 +142,7 @@ class CCompiler(Compiler):
         executable_path = main_file_path.with_suffix('.o')
 
         print('Creating executable at:', executable_path)
-        compile_res = Process(f'gcc -O3 '
+        compile_res = Process(f'gcc {self.OPTIMIZATION_FLAGS[self.build_profile]} '
                               f'-std={self.language_standard} {submission_paths_str} '
                               f'-o {executable_path}',
                               timeout=15, memory_limit_mb=512).run()
@@ -121,28 +153,73 @@ class CCompiler(Compiler):
 @dataclass
 class CppCompiler(Compiler):
     MAIN_FILE_NAME: ClassVar[str] = 'main.cpp'
+    SANITIZER_ENV: ClassVar[str] = 'ASAN_OPTIONS=detect_leaks=1 LSAN_OPTIONS=detect_leaks=0'
+    OPTIMIZATION_FLAGS: ClassVar[dict[str, str]] = {'fast': '-O1', 'optimized': '-O3'}     # Both match the PCH
     language_standard: str
+    sanitizer: str = 'always'   # always => judge the ASAN build | diagnostics => use ASAN only to explain failures
+    build_profile: str = 'optimized'
+    static_runtime: bool = False    # Link libstdc++ and libgcc statically => runs in the images without them
     supported_standards = {'c++', 'c++11', 'c++14', 'c++17', 'c++20', 'c++23'}
+    pch_dir = Path('/var/task/cpp_runner/pch')     # precompiled <bits/stdc++.h> (used when the flags match)
 
     def __post_init__(self):
         if self.language_standard == 'c++':
             self.language_standard = 'c++20'
         if self.language_standard == 'c++23':   # TODO: Remove this when upgrading to gcc 14 and above
             self.language_standard = 'c++2b'
+        if self.sanitizer not in {'always', 'diagnostics'}:
+            raise ValueError(f'{self.sanitizer} sanitizer mode is not supported')
 
-    def compile(self, submission_paths: list[Path]):
+    def build(self, submission_paths: list[Path], executable_path: Path, sanitize: bool) -> Process:
         submission_paths_str = ' '.join([str(path) for path in submission_paths])
+        pch_include = f'-I {self.pch_dir} ' if self.pch_dir.exists() else ''
+        return Process(f'g++ {self.OPTIMIZATION_FLAGS[self.build_profile]} -Wno-write-strings '
+                       f'{"-fsanitize=address " if sanitize else ""}{pch_include}'
+                       f'{"-static-libstdc++ -static-libgcc " if self.static_runtime else ""}'
+                       f'-std={self.language_standard} {submission_paths_str} '
+                       f'-o {executable_path}',
+                       timeout=15, memory_limit_mb=512)
+
+    def compile(self, submission_paths: list[Path]):
         main_file_path = self.find_main_file_path(submission_paths, self.MAIN_FILE_NAME)
         executable_path = main_file_path.with_suffix('.o')
+        sanitized_path = main_file_path.with_suffix('.asan.o')
 
         print('Creating executable at:', executable_path)
-        compile_res = Process(f'g++ -O3 -Wno-write-strings -fsanitize=address '
-                              f'-std={self.language_standard} {submission_paths_str} '
-                              f'-o {executable_path}',
-                              timeout=15, memory_limit_mb=512).run()
+        if self.sanitizer == 'always':
+            compile_res = self.build(submission_paths, executable_path, sanitize=True).run()
+            print('Compile res', compile_res)
+            return ProcessExecutor(command=f'{self.SANITIZER_ENV} {executable_path}'), compile_res
+
+        # Judge with a plain optimized build (ASAN makes programs 2-3x slower and multiplies their memory usage)
+        # The sanitized build is compiled lazily, only if some test fails, to attach its report to the verdict
+        compile_res = self.build(submission_paths, executable_path, sanitize=False).run()
         print('Compile res', compile_res)
-        command = f'ASAN_OPTIONS=detect_leaks=1 LSAN_OPTIONS=detect_leaks=0 {executable_path}'
-        return ProcessExecutor(command=command), compile_res
+        return ProcessExecutor(
+            command=str(executable_path),
+            diagnostics_command=f'{self.SANITIZER_ENV} {sanitized_path}',
+            diagnostics_build=self.build(submission_paths, sanitized_path, sanitize=True),
+        ), compile_res
+
+
+PYCACHE_PREFIX = Path('/tmp/pycache')
+
+
+def python_interpreter(python: str) -> str:
+    """
+    The bytecode of the submission is written once at compile time and reused by every test run.
+    -E -s: ignore the PYTHON* environment variables and the user site-packages.
+    -S and -I are not safe: they drop site-packages, the exit() builtin, and the submission directory from sys.path.
+    """
+    return f'{python} -E -s -X pycache_prefix={PYCACHE_PREFIX}'
+
+
+def python_command(interpreter: str, main_file_path: Path, root: Path = Path('/tmp/')) -> str:
+    """ Runs the main file as a module when possible, so that its bytecode is also loaded from the cache """
+    name = main_file_path.stem
+    if main_file_path.parent == root and name.isidentifier() and name not in sys.stdlib_module_names:
+        return f'{interpreter} -m {name}'
+    return f'{interpreter} {main_file_path}'
 
 
 @dataclass
@@ -152,19 +229,14 @@ class PythonCompiler(Compiler):
     supported_standards = {'python', 'python3'}
 
     def compile(self, submission_paths: list[Path]):
-        binary_paths = [path.with_suffix('.pyc') for path in submission_paths]
         submission_paths_str = ' '.join([str(path) for path in submission_paths])
         main_file_path = self.find_main_file_path(submission_paths, self.MAIN_FILE_NAME)
-        command = f'{self.language_standard} {main_file_path}'
+        interpreter = python_interpreter(self.language_standard)
 
-        print('Creating python binary at:', binary_paths)
-        compile_res = Process(f'{self.language_standard} -m py_compile {submission_paths_str}',
-                              timeout=10, memory_limit_mb=512).run()
+        print('Creating python bytecode at:', PYCACHE_PREFIX)
+        compile_res = Process(f'{interpreter} -m py_compile {submission_paths_str}', timeout=10, memory_limit_mb=512).run()
         print('Compile res', compile_res)
-
-        for path in binary_paths:
-            path.unlink(missing_ok=True)
-        return ProcessExecutor(command=command), compile_res
+        return ProcessExecutor(command=python_command(interpreter, main_file_path)), compile_res
 
 
 @dataclass
@@ -173,17 +245,14 @@ class PythonMLCompiler(Compiler):
     supported_standards = {'pythonml'}
 
     def compile(self, submission_paths: list[Path]):
-        binary_paths = [path.with_suffix('.pyc') for path in submission_paths]
         submission_paths_str = ' '.join([str(path) for path in submission_paths])
         main_file_path = self.find_main_file_path(submission_paths, self.MAIN_FILE_NAME)
+        interpreter = python_interpreter('python')
 
-        print('Creating python binary at:', binary_paths)
-        compile_res = Process(f'python -m py_compile {submission_paths_str}', timeout=10, memory_limit_mb=512).run()
+        print('Creating python bytecode at:', PYCACHE_PREFIX)
+        compile_res = Process(f'{interpreter} -m py_compile {submission_paths_str}', timeout=10, memory_limit_mb=512).run()
         print('Compile res', compile_res)
-
-        for path in binary_paths:
-            path.unlink(missing_ok=True)
-        command = f'MPLCONFIGDIR=/tmp/matplotlib python {main_file_path}'
+        command = f'MPLCONFIGDIR=/tmp/matplotlib {python_command(interpreter, main_file_path)}'
         return ProcessExecutor(command=command), compile_res
 
 
@@ -199,7 +268,30 @@ class CSharpCompiler(Compiler):
     project_file_path = project_dir / 'program.csproj'
     submission_dir = project_dir / 'Submission'
 
+    # Fast path baked into the image: csc.dll with the arguments MSBuild uses for the template project
+    csc = Path('/var/task/csharp_runner/csc')
+    csc_response_file = Path('/var/task/csharp_runner/csc.rsp')
+    global_usings = Path('/var/task/csharp_runner/GlobalUsings.g.cs')
+    runtime_config = Path('/var/task/csharp_runner/program.runtimeconfig.json')
+
     def compile(self, submission_paths: list[Path]):
+        if self.csc.exists():
+            return self.compile_with_csc(submission_paths)
+        return self.compile_with_msbuild(submission_paths)
+
+    def compile_with_csc(self, submission_paths: list[Path]):
+        """ Skips the MSBuild evaluation and node startup, which take seconds even for a single file """
+        self.dll_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(self.runtime_config, self.dll_path.with_suffix('.runtimeconfig.json'))
+
+        source_files = ' '.join(shlex.quote(str(path)) for path in submission_paths if path.suffix == '.cs')
+        compile_cmd = f'{self.csc} -nologo @{self.csc_response_file} -out:{self.dll_path} ' \
+                      f'{self.global_usings} {source_files}'
+        compile_res = Process(compile_cmd, timeout=30, memory_limit_mb=1024).run()
+        print('Compile res', compile_res)
+        return ProcessExecutor(command=f'{self.dotnet} {self.dll_path}'), compile_res
+
+    def compile_with_msbuild(self, submission_paths: list[Path]):
         shutil.copytree(self.template_dir, self.project_dir, dirs_exist_ok=True)
         shutil.rmtree(self.submission_dir, ignore_errors=True)
         self.submission_dir.mkdir(parents=True, exist_ok=True)
@@ -218,6 +310,10 @@ class CSharpCompiler(Compiler):
         return ProcessExecutor(command=command), compile_res
 
 
+# V8 code cache of the submission: written by the first test run and reused by all the later ones
+NODE_COMPILE_CACHE = Path('/tmp/node_compile_cache')
+
+
 @dataclass
 class JsCompiler(Compiler):
     MAIN_FILE_NAME: ClassVar[str] = 'index.js'
@@ -230,7 +326,7 @@ class JsCompiler(Compiler):
 
         compile_res = Process(f'node --check {project}', timeout=10, memory_limit_mb=512).run()
         print('Compile res', compile_res)
-        command = f'node {project}'
+        command = f'NODE_COMPILE_CACHE={NODE_COMPILE_CACHE} node {project}'
         return ProcessExecutor(command=command), compile_res
 
 
@@ -242,6 +338,7 @@ class TsCompiler(Compiler):
     build_dir = Path('/tmp/ts_build')
     tsc = Path('/var/task/typescript_runner/node_modules/.bin/tsc')
     node_type_roots = Path('/var/task/typescript_runner/node_modules/@types')
+    type_check: bool = True     # False => only strip the types (faster compilation, type errors are not reported)
 
     def compile(self, submission_paths: list[Path]):
         source_files = [path for path in submission_paths if path.suffix == '.ts']
@@ -262,11 +359,12 @@ class TsCompiler(Compiler):
             '--types node',
             f'--typeRoots {self.node_type_roots}',
             '--noEmitOnError',
+            *([] if self.type_check else ['--noCheck']),
         )
         compile_cmd = ' '.join([str(self.tsc), *(str(path) for path in source_files), *compiler_options])
         compile_res = Process(compile_cmd, timeout=15, memory_limit_mb=512).run()
         print('Compile res', compile_res)
-        command = f'node {emitted_main_path}'
+        command = f'NODE_COMPILE_CACHE={NODE_COMPILE_CACHE} node {emitted_main_path}'
         return ProcessExecutor(command=command), compile_res
 
 
@@ -275,6 +373,7 @@ class RCompiler(Compiler):
     MAIN_FILE_NAME: ClassVar[str] = 'main.R'
     supported_standards = {'r'}
     rscript = Path('/usr/bin/Rscript')
+    build_dir = Path('/tmp/r_build')
 
     def compile(self, submission_paths: list[Path]):
         source_files = [path for path in submission_paths if path.suffix in {'.R', '.r'}]
@@ -282,12 +381,22 @@ class RCompiler(Compiler):
         if main_file_path is None:
             main_file_path = next((path for path in source_files if path.name == 'main.r'), source_files[0])
 
-        compile_cmd = ' && '.join(
-            f'{self.rscript} --vanilla -e \'invisible(parse(file="{path}"))\'' for path in source_files
-        )
+        shutil.rmtree(self.build_dir, ignore_errors=True)
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+        compiled_path = self.build_dir / 'main.Rc'
+        compile_cmd = ' && '.join([
+            *(f'{self.rscript} --vanilla -e \'invisible(parse(file="{path}"))\'' for path in source_files),
+            f'{self.rscript} --vanilla -e \'invisible(compiler::cmpfile("{main_file_path}", "{compiled_path}"))\'',
+        ])
         compile_res = Process(compile_cmd, timeout=10, memory_limit_mb=512).run()
         print('Compile res', compile_res)
-        command = f'{self.rscript} --vanilla {main_file_path}'
+
+        # Same as compiler::loadcmp, but auto-prints the visible top-level values like Rscript does for a source file
+        run_compiled = (
+            f'local(for (expr in .Internal(load.from.file("{compiled_path}")))'
+            ' { res <- withVisible(eval(expr, globalenv())); if (res$visible) print(res$value) })'
+        )
+        command = f'{self.rscript} --vanilla -e {shlex.quote(run_compiled)}'
         return ProcessExecutor(command=command), compile_res
 
 
@@ -296,9 +405,15 @@ class JuliaCompiler(Compiler):
     MAIN_FILE_NAME: ClassVar[str] = 'main.jl'
     supported_standards = {'julia', 'jl'}
     julia = Path('/var/julia/bin/julia')
-    env = 'JULIA_DEPOT_PATH=/tmp/julia_depot HOME=/tmp'
+    sysimage = Path('/var/task/julia_runner/sys.so')
+    # Writable depot first, then the read-only template from the image (the trailing `:` keeps the bundled stdlibs)
+    env = 'JULIA_DEPOT_PATH=/tmp/julia_depot:/var/task/julia_runner/depot: HOME=/tmp'
     options = '--startup-file=no --history-file=no'
 
+    def __post_init__(self):
+        if self.sysimage.exists():
+            self.options = f'{self.options} --sysimage={self.sysimage}'
+
     def compile(self, submission_paths: list[Path]):
         source_files = [path for path in submission_paths if path.suffix == '.jl']
         main_file_path = self.find_main_file_path(source_files, self.MAIN_FILE_NAME)
@@ -329,6 +444,7 @@ class GoCompiler(Compiler):
     supported_standards = {'go', 'golang'}
     build_dir = Path('/tmp/go_build')
     cache_dir = Path('/tmp/go_cache')
+    cache_template_dir = Path('/var/task/go_runner/cache')
     executable_path = build_dir / 'main'
 
     def compile(self, submission_paths: list[Path]):
@@ -341,6 +457,12 @@ class GoCompiler(Compiler):
         self.build_dir.mkdir(parents=True, exist_ok=True)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
 
+        # The standard library packages are prebuilt in the image => only the submission itself is compiled.
+        # Cache entries are content-addressed and never rewritten, so they can be symlinked from the template.
+        overlay_tree(self.cache_template_dir, self.cache_dir, copy_file=lambda path: len(path.parts) == 1)
+        # Go trims entries older than 5 days once a day => mark the cache as freshly trimmed
+        (self.cache_dir / 'trim.txt').write_text(f'{int(time.time())}\n')
+
         compile_cmd = (
             f'cd {root_dir} && '
             f'GOCACHE={self.cache_dir} GOTMPDIR=/tmp CGO_ENABLED=0 GO111MODULE=off '
@@ -375,7 +497,9 @@ class DartCompiler(Compiler):
 @dataclass
 class SwiftCompiler(Compiler):
     MAIN_FILE_NAME: ClassVar[str] = 'main.swift'
+    OPTIMIZATION_FLAGS: ClassVar[dict[str, str]] = {'fast': '-Onone', 'optimized': '-O'}
     supported_standards = {'swift'}
+    build_profile: str = 'optimized'
     build_dir = Path('/tmp/swift_build')
     executable_path = build_dir / 'main'
 
@@ -387,7 +511,8 @@ class SwiftCompiler(Compiler):
         self.build_dir.mkdir(parents=True, exist_ok=True)
 
         source_files_str = ' '.join(str(path) for path in source_files)
-        compile_cmd = f'swiftc -O {source_files_str} -o {self.executable_path}'
+        compile_cmd = f'swiftc {self.OPTIMIZATION_FLAGS[self.build_profile]} {source_files_str} ' \
+                      f'-o {self.executable_path}'
         compile_res = Process(compile_cmd, timeout=15, memory_limit_mb=1024).run()
         print('Compile res', compile_res)
         return ProcessExecutor(command=str(self.executable_path)), compile_res
@@ -397,15 +522,33 @@ class SwiftCompiler(Compiler):
 class PhpCompiler(Compiler):
     MAIN_FILE_NAME: ClassVar[str] = 'main.php'
     supported_standards = {'php'}
+    opcache_dir = Path('/tmp/php_opcache')
+    jit: bool = False
+
+    @property
+    def options(self) -> str:
+        """ CLI opcache backed by a file cache => the scripts are compiled once and the opcodes are reused by every run """
+        options = ['-d opcache.enable_cli=1', f'-d opcache.file_cache={self.opcache_dir}']
+        if self.jit:    # The JIT needs the shared memory cache, the file cache only fills it on startup
+            options += ['-d opcache.jit=tracing', '-d opcache.jit_buffer_size=64M']
+        else:
+            options += ['-d opcache.file_cache_only=1']
+        return ' '.join(options)
 
     def compile(self, submission_paths: list[Path]):
         source_files = [path for path in submission_paths if path.suffix == '.php']
         main_file_path = self.find_main_file_path(source_files, self.MAIN_FILE_NAME)
 
-        compile_cmd = ' && '.join(f'php -l {path}' for path in source_files)
+        shutil.rmtree(self.opcache_dir, ignore_errors=True)
+        self.opcache_dir.mkdir(parents=True, exist_ok=True)
+        warm_cache = 'foreach (array_slice($argv, 1) as $path) opcache_compile_file($path) || exit(1);'
+        compile_cmd = ' && '.join([
+            *(f'php -l {path}' for path in source_files),
+            f'php {self.options} -r {shlex.quote(warm_cache)} -- ' + ' '.join(str(path) for path in source_files),
+        ])
         compile_res = Process(compile_cmd, timeout=10, memory_limit_mb=512).run()
         print('Compile res', compile_res)
-        command = f'php {main_file_path}'
+        command = f'php {self.options} {main_file_path}'
         return ProcessExecutor(command=command), compile_res
 
 
@@ -414,15 +557,41 @@ class RubyCompiler(Compiler):
     MAIN_FILE_NAME: ClassVar[str] = 'main.rb'
     supported_standards = {'ruby'}
     ruby = Path('/usr/bin/ruby3.4')
+    build_dir = Path('/tmp/ruby_build')
+    loader_path = build_dir / 'loader.rb'
+    jit: bool = False   # Enables YJIT
 
     def compile(self, submission_paths: list[Path]):
         source_files = [path for path in submission_paths if path.suffix == '.rb']
         main_file_path = self.find_main_file_path(source_files, self.MAIN_FILE_NAME)
 
-        compile_cmd = ' && '.join(f'{self.ruby} -c {path}' for path in source_files)
+        shutil.rmtree(self.build_dir, ignore_errors=True)
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+
+        for path in source_files:
+            Path(f'{self.build_dir}{path.parent}').mkdir(parents=True, exist_ok=True)
+
+        # Compiling also checks the syntax: an error is raised for an invalid file
+        compile_iseq = (
+            'ARGV.each { |path| File.binwrite('
+            f'"{self.build_dir}#{{path}}.yarb", RubyVM::InstructionSequence.compile_file(path).to_binary'
+            ') }'
+        )
+        compile_cmd = f'{self.ruby} -e {shlex.quote(compile_iseq)} ' + ' '.join(str(path) for path in source_files)
         compile_res = Process(compile_cmd, timeout=10, memory_limit_mb=512).run()
         print('Compile res', compile_res)
-        command = f'{self.ruby} {main_file_path}'
+
+        # `load` and `require` go through the `load_iseq` hook => the main file is loaded the same way as the others
+        self.loader_path.write_text(
+            'class RubyVM::InstructionSequence\n'
+            '  def self.load_iseq(path)\n'
+            f'    binary = "{self.build_dir}#{{path}}.yarb"\n'
+            '    load_from_binary(File.binread(binary)) if File.exist?(binary)\n'
+            '  end\n'
+            'end\n'
+        )
+        run_main = shlex.quote('load($0 = ARGV.shift)')
+        command = f'{self.ruby} {"--yjit " if self.jit else ""}-r{self.loader_path} -e {run_main} {main_file_path}'
         return ProcessExecutor(command=command), compile_res
 
 
@@ -430,22 +599,34 @@ class RubyCompiler(Compiler):
 class LuaCompiler(Compiler):
     MAIN_FILE_NAME: ClassVar[str] = 'main.lua'
     supported_standards = {'lua', 'lua5.4'}
+    root = Path('/tmp/')    # Working directory of the runs => `require` resolves the modules relative to it
+    build_dir = Path('/tmp/lua_build')
 
     def compile(self, submission_paths: list[Path]):
         source_files = [path for path in submission_paths if path.suffix == '.lua']
         main_file_path = self.find_main_file_path(source_files, self.MAIN_FILE_NAME)
 
-        compile_cmd = ' && '.join(f'luac -p {path}' for path in source_files)
+        shutil.rmtree(self.build_dir, ignore_errors=True)
+        binary_paths = {path: self.build_dir / path.relative_to(self.root).with_suffix('.luac') for path in source_files}
+        for binary_path in binary_paths.values():
+            binary_path.parent.mkdir(parents=True, exist_ok=True)
+
+        compile_cmd = ' && '.join(f'luac -o {binary} {path}' for path, binary in binary_paths.items())
         compile_res = Process(compile_cmd, timeout=10, memory_limit_mb=512).run()
         print('Compile res', compile_res)
-        command = f'lua {main_file_path}'
+        # Precompiled chunks are found first, `;;` keeps the default search path for everything else
+        lua_path = shlex.quote(f'{self.build_dir}/?.luac;;')
+        command = f'LUA_PATH={lua_path} lua {binary_paths[main_file_path]}'
         return ProcessExecutor(command=command), compile_res
 
 
 @dataclass
 class RustCompiler(Compiler):
     MAIN_FILE_NAME: ClassVar[str] = 'main.rs'
+    # The judge has always built Rust with opt-level=1 (most of the speed of 3 for a fraction of the compile time)
+    OPTIMIZATION_FLAGS: ClassVar[dict[str, str]] = {'fast': '-C opt-level=0', 'optimized': '-C opt-level=1'}
     supported_standards = {'rust'}
+    build_profile: str = 'optimized'
     build_dir = Path('/tmp/rust_build')
     executable_path = build_dir / 'main'
 
@@ -456,7 +637,8 @@ class RustCompiler(Compiler):
         shutil.rmtree(self.build_dir, ignore_errors=True)
         self.build_dir.mkdir(parents=True, exist_ok=True)
 
-        compile_cmd = f'rustc -C opt-level=1 -C embed-bitcode=no --edition=2024 {main_file_path} -o {self.executable_path}'
+        compile_cmd = f'rustc {self.OPTIMIZATION_FLAGS[self.build_profile]} -C embed-bitcode=no --edition=2024 ' \
+                      f'{main_file_path} -o {self.executable_path}'
         compile_res = Process(compile_cmd, timeout=60, memory_limit_mb=1024).run()
         print('Compile res', compile_res)
         return ProcessExecutor(command=str(self.executable_path)), compile_res
@@ -469,8 +651,10 @@ class ZigCompiler(Compiler):
     build_dir = Path('/tmp/zig_build')
     cache_dir = Path('/tmp/zig_cache')
     global_cache_dir = Path('/tmp/zig_global_cache')
+    global_cache_template_dir = Path('/var/task/zig_runner/global_cache')
     executable_path = build_dir / 'main'
     zig = Path('/var/zig/zig')
+    cpu = 'x86_64_v3'   # Fixed (instead of native) => the global cache built in the image matches the Lambda CPU
 
     def compile(self, submission_paths: list[Path]):
         source_files = [path for path in submission_paths if path.suffix == '.zig']
@@ -483,10 +667,15 @@ class ZigCompiler(Compiler):
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.global_cache_dir.mkdir(parents=True, exist_ok=True)
 
+        # compiler_rt is prebuilt in the image. Manifests are opened for writing (and locked) => copy them,
+        # the build artifacts in `o/` are only read => symlink them
+        overlay_tree(self.global_cache_template_dir, self.global_cache_dir, copy_file=lambda path: path.parts[0] != 'o')
+
         compiler_options = (
             'build-exe',
             str(main_file_path),
             '-O ReleaseSafe',
+            f'-mcpu={self.cpu}',
             f'-femit-bin={self.executable_path}',
             f'--cache-dir {self.cache_dir}',
             f'--global-cache-dir {self.global_cache_dir}',
@@ -497,6 +686,28 @@ class ZigCompiler(Compiler):
         return ProcessExecutor(command=str(self.executable_path)), compile_res
 
 
+def run_jvm_tool(
+    daemon: CompileDaemon, tool: str, args: list[str],
+    timeout: float, memory_limit_mb: int = 512, executable: str | Path | None = None,
+) -> RunResult:
+    """ Runs a JVM compiler tool in the resident compile daemon if the image has one, otherwise as a new process """
+    if daemon.available:
+        return daemon.run(tool, *args, timeout=timeout)
+    command = ' '.join([str(executable or tool), *(shlex.quote(arg) for arg in args)])
+    return Process(command, timeout=timeout, memory_limit_mb=memory_limit_mb).run()
+
+
+def jvm_executor(jar_path: Path, runtime_jars: list[Path], base_archive: Path) -> JvmExecutor:
+    """
+    Puts the language runtime jars in front of the fat jar, so that the runtime classes are loaded from the same
+    jars the image-level CDS archive was dumped from (the archive is only used if its classpath is a prefix).
+    """
+    main_class = jar_main_class(jar_path)
+    if main_class is None or not runtime_jars:
+        return JvmExecutor(classpath=[jar_path])
+    return JvmExecutor(classpath=[*runtime_jars, jar_path], main_class=main_class, base_archive=base_archive)
+
+
 @dataclass
 class KotlinCompiler(Compiler):
     MAIN_FILE_NAME: ClassVar[str] = 'main.kt'
@@ -504,6 +715,8 @@ class KotlinCompiler(Compiler):
     build_dir = Path('/tmp/kotlin_build')
     jar_path = build_dir / 'main.jar'
     kotlinc = Path('/var/kotlin/kotlinc/bin/kotlinc')
+    runtime_jars = [Path('/var/kotlin/kotlinc/lib/kotlin-stdlib.jar')]
+    base_archive = Path('/var/task/jvm_runner/kotlin.jsa')
 
     def compile(self, submission_paths: list[Path]):
         source_files = [path for path in submission_paths if path.suffix == '.kt']
@@ -511,11 +724,16 @@ class KotlinCompiler(Compiler):
         shutil.rmtree(self.build_dir, ignore_errors=True)
         self.build_dir.mkdir(parents=True, exist_ok=True)
 
-        source_files_str = ' '.join(str(path) for path in source_files)
-        compile_cmd = f'{self.kotlinc} {source_files_str} -include-runtime -d {self.jar_path}'
-        compile_res = Process(compile_cmd, timeout=30, memory_limit_mb=1024).run()
+        compile_args = [*(str(path) for path in source_files), '-include-runtime', '-d', str(self.jar_path)]
+        compile_res = run_jvm_tool(kotlin_daemon, 'kotlinc', compile_args,
+                                   timeout=30, memory_limit_mb=1024, executable=self.kotlinc)
         print('Compile res', compile_res)
-        return ProcessExecutor(command=f'java -jar {self.jar_path}'), compile_res
+        if compile_res.status != Status.OK:
+            return JvmExecutor(classpath=[self.jar_path]), compile_res
+
+        executor = jvm_executor(self.jar_path, self.runtime_jars, self.base_archive)
+        executor.training_archive = self.build_dir / 'main.jsa'
+        return executor, compile_res
 
 
 @dataclass
@@ -526,6 +744,8 @@ class ScalaCompiler(Compiler):
     cache_template_dir = Path('/var/task/scala_runner/coursier-cache')
     cache_dir = Path('/tmp/scala_coursier_cache')
     scala_cli = Path('/usr/local/bin/scala-cli')
+    runtime_jars_dir = Path('/var/task/jvm_runner/scala')
+    base_archive = Path('/var/task/jvm_runner/scala.jsa')
 
     def compile(self, submission_paths: list[Path]):
         source_files = [path for path in submission_paths if path.suffix == '.scala']
@@ -553,12 +773,20 @@ class ScalaCompiler(Compiler):
         if compile_res.status == Status.OK and self.jar_path.exists():
             compile_res.errors = None
         print('Compile res', compile_res)
-        return ProcessExecutor(command=f'java -jar {self.jar_path}'), compile_res
+        if compile_res.status != Status.OK:
+            return JvmExecutor(classpath=[self.jar_path]), compile_res
+
+        runtime_jars = sorted(self.runtime_jars_dir.glob('*.jar'))
+        executor = jvm_executor(self.jar_path, runtime_jars, self.base_archive)
+        executor.training_archive = self.build_dir / 'main.jsa'
+        return executor, compile_res
 
 
 @dataclass
 class HaskellCompiler(Compiler):
+    OPTIMIZATION_FLAGS: ClassVar[dict[str, str]] = {'fast': '-O1', 'optimized': '-O2'}
     supported_standards = {'haskell', 'hs'}
+    build_profile: str = 'optimized'
     build_dir = Path('/tmp/haskell_build')
     executable_path = build_dir / 'main'
 
@@ -574,7 +802,8 @@ class HaskellCompiler(Compiler):
 
         compiler_options = (
             '+RTS -V0 -RTS',
-            '-O2',
+            self.OPTIMIZATION_FLAGS[self.build_profile],
+            '-rtsopts',     # Accept the heap flags of the runtime profile (see coderunners/runtimes.py)
             '-optl-fuse-ld=bfd',
             f'-i{root_dir}',
             f'-outputdir {self.build_dir}',
@@ -592,7 +821,9 @@ class HaskellCompiler(Compiler):
 @dataclass
 class OcamlCompiler(Compiler):
     MAIN_FILE_NAME: ClassVar[str] = 'main.ml'
+    OPTIMIZATION_FLAGS: ClassVar[dict[str, str]] = {'fast': '-Oclassic', 'optimized': '-O3'}
     supported_standards = {'ocaml', 'ml'}
+    build_profile: str = 'optimized'
     build_dir = Path('/tmp/ocaml_build')
     executable_path = build_dir / 'main'
 
@@ -609,7 +840,7 @@ class OcamlCompiler(Compiler):
         sort_cmd = f'ocamldep -sort {include_options} {source_files_str}'
         compile_cmd = (
             f'cd {root_dir} && '
-            f'ocamlopt -O3 {include_options} -I {self.build_dir} '
+            f'ocamlopt {self.OPTIMIZATION_FLAGS[self.build_profile]} {include_options} -I {self.build_dir} '
             f'-o {self.executable_path} '
             f'$({sort_cmd})'
         )
@@ -626,24 +857,30 @@ class JavaCompiler(Compiler):
     build_dir = Path('/tmp/build')
 
     def compile(self, submission_paths: list[Path]):
-        self.build_dir.mkdir(parents=True, exist_ok=True)
-        source_files = ' '.join(str(p) for p in submission_paths if p.suffix == '.java')
-        build_res = Process(f'javac -d {self.build_dir} {source_files}', timeout=15, memory_limit_mb=512).run()
+        classes_dir = self.build_dir / 'classes'
+        classes_dir.mkdir(parents=True, exist_ok=True)
+        source_files = [str(p) for p in submission_paths if p.suffix == '.java']
+        build_res = run_jvm_tool(java_daemon, 'javac', ['-d', str(classes_dir), *source_files], timeout=15)
         print('Build res:', build_res)
 
-        command = f'java -cp {self.build_dir / "Main.jar"} Main'
+        jar_path = self.build_dir / 'Main.jar'
+        executor = JvmExecutor(classpath=[jar_path], main_class='Main')
         if build_res.status != Status.OK:
-            return ProcessExecutor(command=command), build_res
+            return executor, build_res
 
-        compile_res = Process(f'cd {self.build_dir} && jar cvf Main.jar *', timeout=15, memory_limit_mb=512).run()
+        jar_args = ['--create', f'--file={jar_path}', '-C', str(classes_dir), '.']
+        compile_res = run_jvm_tool(java_daemon, 'jar', jar_args, timeout=15)
         print('Compile res:', compile_res)
-        return ProcessExecutor(command=command), compile_res
+        if compile_res.status == Status.OK:
+            executor.training_archive = self.build_dir / 'Main.jsa'
+        return executor, compile_res
 
 
 @dataclass
 class SQLiteCompiler(Compiler):
     supported_standards = {'sql', 'sqlite'}
     db_name: str = 'main.db'
+    in_memory: bool = True
 
     def compile(self, submission_paths: list[Path]):
         if len(submission_paths) != 1:
@@ -653,5 +890,5 @@ class SQLiteCompiler(Compiler):
             )
 
         script = submission_paths[0].read_text()
-        executor = SQLiteExecutor(script=script, db_name=self.db_name)
+        executor = SQLiteExecutor(script=script, db_name=self.db_name, in_memory=self.in_memory)
         return executor, RunResult(status=Status.OK, memory=0, time=0, return_code=0, outputs=None, errors=None)
@@ -0,0 +1,150 @@
+import os
+import select
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from coderunners.process import active_sessions, limit_resources, sessions_lock
+from models import RunResult, Status
+
+
+@dataclass
+class CompileDaemon:
+    """
+    A resident JVM that runs the compilers in-process (javax.tools / the Kotlin compiler API).
+    It is started lazily on the first compilation, so that the compiler is not loaded from scratch for every tool.
+    The submissions run under the same user => a running daemon could be reached by them (its stdin through
+    /proc/<pid>/fd/0, signals, its heap). The judge stops the daemons before running any submitted code
+    (stop_daemons()) and starts fresh ones once it is done (restart_daemons()) for the next invocation.
+    The protocol is implemented in coderunners/jvm/CompileServer.java
+    """
+    classpath: list[Path]
+    jvm_options: list[str] = field(default_factory=list)
+    memory_limit_mb: int = 512
+    main_class: str = 'CompileServer'
+    p: subprocess.Popen | None = None
+    buffer: bytearray = field(default_factory=bytearray)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    restart: bool = False       # Stopped while the submission runs => started again afterwards
+
+    @property
+    def available(self) -> bool:
+        return all(path.exists() for path in self.classpath)
+
+    def start(self) -> None:
+        self.stop()
+        print('Starting the compile daemon:', self.classpath)
+        with sessions_lock:     # A registered session => not killed when a concurrent Process is closed
+            self.p = subprocess.Popen(
+                [
+                    'java', '-XX:+UseSerialGC', '-XX:-UsePerfData', '-XX:+DisableAttachMechanism',
+                    # The heap stays under the memory limit of the former compile processes (the rest is off-heap)
+                    f'-Xmx{self.memory_limit_mb * 3 // 4}m', '-XX:+ExitOnOutOfMemoryError', *self.jvm_options,
+                    '-cp', ':'.join(str(path) for path in self.classpath), self.main_class,
+                ],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                preexec_fn=lambda: limit_resources(max_bytes=self.memory_limit_mb * 1024 * 1024),
+                cwd='/', start_new_session=True,
+            )
+            active_sessions.add(self.p.pid)
+
+    def stop(self) -> None:
+        if self.p is not None and self.p.poll() is None:
+            self.p.kill()
+            self.p.wait()
+        if self.p is not None:
+            with sessions_lock:
+                active_sessions.discard(self.p.pid)
+        self.p = None
+        self.buffer.clear()
+
+    def run(self, tool: str, *args: str, timeout: float) -> RunResult:
+        if any('\n' in arg or '\0' in arg for arg in (tool, *args)):
+            return RunResult(status=Status.RUNTIME_ERROR, memory=0, time=0, return_code=-1, outputs=None,
+                             errors='Compiler arguments (file names) cannot contain newlines or NUL characters')
+
+        with self.lock:
+            if self.p is None or self.p.poll() is not None:
+                self.start()
+
+            start_time = time.time()
+            deadline = start_time + timeout
+            try:
+                self.p.stdin.write('\0'.join([tool, *args]).encode('utf-8') + b'\n')
+                self.p.stdin.flush()
+                return_code, length = map(int, self.read(b'\n', deadline).split())
+                output = self.read(length, deadline).decode('utf-8', errors='replace')
+            except TimeoutError:
+                self.stop()     # The daemon is busy with the abandoned request => start a fresh one next time
+                return RunResult(status=Status.TLE, memory=0, time=timeout, return_code=0,
+                                 outputs=None, errors=f'{tool} did not finish in {timeout} seconds')
+            except (OSError, EOFError, ValueError) as e:
+                self.stop()
+                return RunResult(status=Status.RUNTIME_ERROR, memory=0, time=time.time() - start_time,
+                                 return_code=-1, outputs=None, errors=f'The compile daemon failed: {e}')
+
+            return RunResult(
+                status=Status.OK if return_code == 0 else Status.RUNTIME_ERROR,
+                memory=0, time=time.time() - start_time, return_code=return_code,
+                outputs=output, errors=output if return_code != 0 else None,
+            )
+
+    def read(self, until: bytes | int, deadline: float) -> bytes:
+        """ Reads up to the `until` separator (excluded) or exactly `until` bytes """
+        while True:
+            if isinstance(until, int) and len(self.buffer) >= until:
+                end, skip = until, 0
+                break
+            if isinstance(until, bytes) and until in self.buffer:
+                end, skip = self.buffer.index(until), len(until)
+                break
+
+            remaining = deadline - time.time()
+            if remaining <= 0 or not select.select([self.p.stdout], [], [], remaining)[0]:
+                raise TimeoutError
+            chunk = os.read(self.p.stdout.fileno(), 2 ** 16)
+            if not chunk:
+                raise EOFError(f'the daemon exited with code {self.p.wait()}')
+            self.buffer += chunk
+
+        data = bytes(self.buffer[:end])
+        del self.buffer[:end + skip]
+        return data
+
+
+SERVER_CLASSPATH = Path('/var/task/jvm_runner/compile_server')
+KOTLIN_HOME = Path('/var/kotlin/kotlinc')
+
+# One daemon per language, started again for every invocation of the container
+java_daemon = CompileDaemon(classpath=[SERVER_CLASSPATH])
+kotlin_daemon = CompileDaemon(
+    classpath=[SERVER_CLASSPATH, KOTLIN_HOME / 'lib' / 'kotlin-compiler.jar'],
+    memory_limit_mb=1024,
+    jvm_options=[
+        '-Xss4m',
+        f'-Dkotlin.home={KOTLIN_HOME}',
+        '-Dkotlin.environment.keepalive=true',      # Reuse the compiler environment between compilations
+    ],
+)
+
+DAEMONS = [java_daemon, kotlin_daemon]
+
+
+def stop_daemons() -> None:
+    """ Called before running the submitted code: nothing it does can reach the compilers of the next submissions """
+    for daemon in DAEMONS:
+        with daemon.lock:
+            if daemon.p is not None:
+                daemon.stop()
+                daemon.restart = True
+
+
+def restart_daemons() -> None:
+    """ Starts fresh daemons once the submission is done => they load the compiler before the next invocation """
+    for daemon in DAEMONS:
+        with daemon.lock:
+            if daemon.restart:
+                daemon.restart = False
+                daemon.start()
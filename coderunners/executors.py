@@ -1,10 +1,12 @@
 import sqlite3
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from io import StringIO
 from pathlib import Path
 
 from coderunners.process import Process
+from coderunners.runtimes import RuntimeProfile
+from coderunners.util import extract_sanitizer_report
 from models import RunResult, Status, TestCase
 
 
@@ -20,13 +22,38 @@ class Executor(ABC):
     def cleanup(self, test: TestCase) -> None:
         ...
 
+    def diagnose(self, test: TestCase, **kwargs) -> str | None:
+        """ Re-runs a failed test with extra instrumentation and returns a report explaining the failure (if any) """
+        return None
+
 
 @dataclass
 class ProcessExecutor(Executor):
     command: str
     ROOT: Path = Path('/tmp/')
+    diagnostics_command: str | None = None      # Instrumented (slower) program used only to explain failures
+    diagnostics_build: Process | None = None    # Builds the `diagnostics_command` program the first time it's needed
+    runtime: RuntimeProfile | None = None       # Tunes the managed runtime (heap, GC) to the limits of each run
 
     def run(self, test: TestCase, time_limit: float, memory_limit_mb: int, output_limit_mb: float) -> RunResult:
+        if self.runtime is None:
+            return self.run_command(
+                self.command, test,
+                time_limit=time_limit, memory_limit_mb=memory_limit_mb, output_limit_mb=output_limit_mb,
+            )
+
+        r = self.run_command(
+            self.runtime.launch_command(self.command, memory_limit_mb), test,
+            time_limit=time_limit, memory_limit_mb=memory_limit_mb, output_limit_mb=output_limit_mb,
+        )
+        if r.status == Status.RUNTIME_ERROR and r.return_code in self.runtime.mle_return_codes:
+            r.status = Status.MLE
+        return r
+
+    def run_command(
+        self, command: str, test: TestCase,
+        time_limit: float, memory_limit_mb: int, output_limit_mb: float,
+    ) -> RunResult:
 
         # Crete input files and input assets
         for filename, content in (test.input_files or {}).items():
@@ -41,7 +68,7 @@ class ProcessExecutor(Executor):
             file.write_bytes(content)
 
         r = Process(
-            self.command,
+            command,
             timeout=time_limit, memory_limit_mb=memory_limit_mb, output_limit_mb=output_limit_mb,
         ).run(test.input)
 
@@ -56,6 +83,27 @@ class ProcessExecutor(Executor):
         }
         return r
 
+    def diagnose(self, test: TestCase, time_limit: float, memory_limit_mb: int, output_limit_mb: float) -> str | None:
+        if self.diagnostics_command is None:
+            return None
+
+        if self.diagnostics_build is not None:
+            print('Building the diagnostics program...')
+            build_res = self.diagnostics_build.run()
+            self.diagnostics_build = None
+            print('Diagnostics build res:', build_res)
+            if build_res.status != Status.OK:
+                self.diagnostics_command = None
+                return None
+
+        # Instrumented programs are several times slower and use more memory => give them more room
+        r = self.run_command(
+            self.diagnostics_command, test,
+            time_limit=3 * time_limit, memory_limit_mb=3 * memory_limit_mb, output_limit_mb=output_limit_mb,
+        )
+        print('Diagnostics run:', r.status, r.return_code)
+        return extract_sanitizer_report(r.errors)
+
     def cleanup(self, test: TestCase) -> None:
         cleanup_files = (test.input_files or {}).keys() | (test.target_files or {}).keys() | \
                         (test.input_assets or {}).keys() | (test.target_assets or {}).keys()
@@ -64,14 +112,79 @@ class ProcessExecutor(Executor):
             (self.ROOT / filename).unlink(missing_ok=True)
 
 
+@dataclass
+class JvmExecutor(ProcessExecutor):
+    """
+    Launches a JVM program, building the `java` command line from the classpath, the main class and the JVM options.
+    Class-data sharing (CDS) is used to skip most of the class loading on startup:
+      * `base_archive` is a static archive of the language runtime baked into the image (JDK default if None)
+      * `create_app_archive` dumps the classes loaded by a training run into `training_archive` (per submission).
+        The training runs the submission => it is done by the judge, within the limits and the time budget of a test
+    """
+    command: str = ''
+    classpath: list[Path] = field(default_factory=list)
+    main_class: str | None = None           # None => run the first classpath entry with `java -jar`
+    options: list[str] = field(default_factory=list)
+    base_archive: Path | None = None
+    app_archive: Path | None = None
+    training_archive: Path | None = None    # Where the compiler wants the dynamic archive of the submission
+    java: str = 'java'
+
+    def __post_init__(self):
+        self.command = self.launch_command()
+
+    def launch_command(self, *extra_options: str) -> str:
+        archives = [str(archive) for archive in (self.base_archive, self.app_archive)
+                    if archive is not None and archive.exists()]
+        options = [
+            '-Xshare:auto',     # Fall back to regular class loading if an archive does not match
+            '-Xlog:disable',    # Otherwise, CDS warnings are printed to stdout (mixed with the program output)
+            *([f'-XX:SharedArchiveFile={":".join(archives)}'] if archives else []),
+            *self.options,
+            *extra_options,
+        ]
+        target = (f'-cp {":".join(str(path) for path in self.classpath)} {self.main_class}'
+                  if self.main_class else f'-jar {self.classpath[0]}')
+        return ' '.join([self.java, *options, target])
+
+    def create_app_archive(self, time_limit: float, memory_limit_mb: int) -> None:
+        """ Runs the program once with an empty input and archives the classes it loaded for all the later runs """
+        archive_path = self.training_archive
+        archive_path.unlink(missing_ok=True)
+        training_dir = archive_path.parent / 'cds_training'     # Keep the files created by the program away from tests
+        training_dir.mkdir(parents=True, exist_ok=True)
+
+        command = self.launch_command(f'-XX:ArchiveClassesAtExit={archive_path}')
+        if self.runtime is not None:    # The same heap and GC as the tests (the archive is dropped on a GC mismatch)
+            command = self.runtime.launch_command(command, memory_limit_mb)
+        training = Process(command, timeout=time_limit, memory_limit_mb=memory_limit_mb, cwd=training_dir).run()
+        print('CDS training run:', training.status, 'archive exists:', archive_path.exists())
+        if archive_path.exists():
+            self.app_archive = archive_path
+            self.command = self.launch_command()
+
+
 @dataclass
 class SQLiteExecutor(Executor):
     script: str
     ROOT: Path = Path('/tmp/')
     db_name: str = 'main.db'
+    in_memory: bool = False     # Keep the database in RAM and start every test from a fresh one
 
     def __post_init__(self):
-        self.db = sqlite3.connect(self.ROOT / self.db_name)
+        self.db = self.connect()
+
+    def connect(self) -> sqlite3.Connection:
+        if not self.in_memory:
+            return sqlite3.connect(self.ROOT / self.db_name)
+
+        # In-memory databases never touch the disk => no fsync-ed writes and nothing to clean up between tests
+        # The journal stays in memory (instead of OFF) so that ROLLBACK in the submitted scripts keeps working
+        db = sqlite3.connect(':memory:')
+        db.execute('PRAGMA journal_mode = MEMORY')
+        db.execute('PRAGMA synchronous = OFF')
+        db.execute('PRAGMA temp_store = MEMORY')
+        return db
 
     def __del__(self):
         self.db.close()
@@ -151,6 +264,13 @@ class SQLiteExecutor(Executor):
 
     def cleanup(self, test: TestCase) -> None:
         """ Drops all the tables in the database """
+        if self.in_memory:
+            # Discarding the whole in-memory database is cheaper than dropping its tables one by one
+            print('Resetting the in-memory database')
+            self.db.close()
+            self.db = self.connect()
+            return
+
         cursor = self.db.cursor()
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
         tables = cursor.fetchall()
@@ -0,0 +1,44 @@
+# Workload traced into the custom sysimage of the julia image (see coderunners/Dockerfile).
+# Mimics typical submissions: parsing the input, containers, and formatted output,
+# reading and writing through pipes like the tests do (so that the same methods get specialized).
+using Printf
+using Statistics
+
+input = Pipe()
+output = Pipe()
+Base.link_pipe!(input)
+Base.link_pipe!(output)
+write(input.in, "3 4\n5 1 4 2\n2.5 hello world\nabc\n7\n8\n")
+close(input.in)
+
+n, m = parse.(Int, split(readline(input.out)))
+values = map(x -> parse(Int, x), split(readline(input.out)))
+tokens = split(readline(input.out))
+x = parse(Float64, tokens[1])
+word = strip(readline(input.out))
+rest = [parse(Int64, line) for line in eachline(input.out)]
+
+sorted = sort(values; rev=true)
+sort!(values, by=v -> (v % 2, v))
+prefix = cumsum(values)
+grid = zeros(Int, n, m)
+grid[1, :] .= values
+matrix = [collect(1:m) for _ in 1:n]
+push!(matrix, fill(0, m))
+counts = Dict{String, Int}()
+for token in tokens
+    counts[token] = get(counts, token, 0) + 1
+end
+seen = Set{Int}(values)
+push!(seen, n * m)
+chars = collect(word)
+reversed = String(reverse(chars))
+
+println(output.in, n + m, " ", sum(values), " ", maximum(values), " ", minimum(values))
+println(output.in, join(sorted, " "))
+println(output.in, prefix[end], " ", sum(grid), " ", length(matrix), " ", length(seen))
+@printf(output.in, "%.6f %d %s\n", x * mean(values), length(counts), reversed)
+print(output.in, string(sum(rest)), '\n', uppercase(word) * lowercase(word), '\n')
+write(output.in, "$(div(n, 2)) $(mod(m, 3)) $(abs(-x)) $(floor(Int, x)) $(round(x; digits=2))\n")
+close(output.in)
+read(output.out, String)
@@ -0,0 +1,66 @@
+import java.io.BufferedOutputStream;
+import java.io.BufferedReader;
+import java.io.ByteArrayOutputStream;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.nio.charset.StandardCharsets;
+import java.util.Arrays;
+import java.util.Set;
+import java.util.spi.ToolProvider;
+
+/**
+ * Resident compile server used by coderunners/daemons.py: runs javac, jar and kotlinc inside one long-lived JVM.
+ * Request (stdin):   the tool name and its arguments separated by NUL bytes, terminated with a newline.
+ * Response (stdout): "<exit code> <output length>\n" followed by the UTF-8 output of the tool.
+ */
+public final class CompileServer {
+    private static final Set<String> TOOLS = Set.of("javac", "jar", "kotlinc");
+
+    public static void main(String[] args) throws Exception {
+        BufferedReader requests = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        OutputStream responses = new BufferedOutputStream(new FileOutputStream(FileDescriptor.out));
+        // Stray prints of the compilers must not break the protocol
+        System.setOut(new PrintStream(OutputStream.nullOutputStream()));
+
+        String line;
+        while ((line = requests.readLine()) != null) {
+            String[] request = line.split("\0", -1);
+            ByteArrayOutputStream output = new ByteArrayOutputStream();
+            int code;
+            try (PrintStream stream = new PrintStream(output, true, StandardCharsets.UTF_8)) {
+                try {
+                    code = run(request[0], Arrays.copyOfRange(request, 1, request.length), stream);
+                } catch (Throwable e) {
+                    Throwable cause = e instanceof InvocationTargetException ? e.getCause() : e;
+                    cause.printStackTrace(stream);
+                    code = 3;
+                }
+            }
+
+            byte[] bytes = output.toByteArray();
+            responses.write((code + " " + bytes.length + "\n").getBytes(StandardCharsets.US_ASCII));
+            responses.write(bytes);
+            responses.flush();
+        }
+    }
+
+    private static int run(String tool, String[] args, PrintStream output) throws Exception {
+        if (!TOOLS.contains(tool)) {
+            throw new IllegalArgumentException("Unsupported tool: " + tool);
+        }
+        if (tool.equals("kotlinc")) {
+            // The Kotlin compiler is only on the classpath of the Kotlin image => load it reflectively
+            Class<?> compiler = Class.forName("org.jetbrains.kotlin.cli.jvm.K2JVMCompiler");
+            Object instance = compiler.getConstructor().newInstance();
+            Object exitCode = compiler.getMethod("exec", PrintStream.class, String[].class)
+                    .invoke(instance, output, args);
+            return (int) exitCode.getClass().getMethod("getCode").invoke(exitCode);
+        }
+        ToolProvider provider = ToolProvider.findFirst(tool).orElseThrow();
+        return provider.run(output, output, args);
+    }
+}
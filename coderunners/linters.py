@@ -1,10 +1,162 @@
+import hashlib
+import json
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
 from dataclasses import dataclass
 from pathlib import Path
+from typing import ClassVar
 
 from coderunners.process import Process
 from models import RunResult, Status
 
+# Clang Tidy checks
+CLANG_TIDY_CHECKS = [
+    'bugprone-argument-comment',
+    'bugprone-assert-side-effect',
+    'bugprone-bad-signal-to-kill-thread',
+    'bugprone-branch-clone',
+    'bugprone-copy-constructor-init',
+    'bugprone-dangling-handle',
+    'bugprone-dynamic-static-initializers',
+    'bugprone-fold-init-type',
+    'bugprone-forward-declaration-namespace',
+    'bugprone-forwarding-reference-overload',
+    'bugprone-inaccurate-erase',
+    'bugprone-incorrect-roundings',
+    'bugprone-integer-division',
+    'bugprone-lambda-function-name',
+    'bugprone-macro-parentheses',
+    'bugprone-macro-repeated-side-effects',
+    'bugprone-misplaced-operator-in-strlen-in-alloc',
+    'bugprone-misplaced-pointer-arithmetic-in-alloc',
+    'bugprone-misplaced-widening-cast',
+    'bugprone-move-forwarding-reference',
+    'bugprone-multiple-statement-macro',
+    'bugprone-no-escape',
+    'bugprone-not-null-terminated-result',
+    'bugprone-parent-virtual-call',
+    'bugprone-posix-return',
+    'bugprone-reserved-identifier',
+    'bugprone-sizeof-container',
+    'bugprone-sizeof-expression',
+    'bugprone-spuriously-wake-up-functions',
+    'bugprone-string-constructor',
+    'bugprone-string-integer-assignment',
+    'bugprone-string-literal-with-embedded-nul',
+    'bugprone-suspicious-enum-usage',
+    'bugprone-suspicious-include',
+    'bugprone-suspicious-memset-usage',
+    'bugprone-suspicious-missing-comma',
+    'bugprone-suspicious-semicolon',
+    'bugprone-suspicious-string-compare',
+    'bugprone-swapped-arguments',
+    'bugprone-terminating-continue',
+    'bugprone-throw-keyword-missing',
+    'bugprone-too-small-loop-variable',
+    'bugprone-undefined-memory-manipulation',
+    'bugprone-undelegated-constructor',
+    'bugprone-unhandled-self-assignment',
+    'bugprone-unused-raii',
+    'bugprone-unused-return-value',
+    'bugprone-use-after-move',
+    'bugprone-virtual-near-miss',
+    'cert-dcl21-cpp',
+    'cert-dcl58-cpp',
+    'cert-err34-c',
+    'cert-err52-cpp',
+    'cert-err58-cpp',
+    'cert-err60-cpp',
+    'cert-flp30-c',
+    'cert-msc50-cpp',
+    'cert-msc51-cpp',
+    'cert-str34-c',
+    'cppcoreguidelines-interfaces-global-init',
+    'cppcoreguidelines-pro-type-static-cast-downcast',
+    'cppcoreguidelines-slicing',
+    'google-default-arguments',
+    'google-explicit-constructor',
+    'google-runtime-operator',
+    'hicpp-exception-baseclass',
+    'hicpp-multiway-paths-covered',
+    'misc-misplaced-const',
+    'misc-new-delete-overloads',
+    'misc-no-recursion',
+    'misc-non-copyable-objects',
+    'misc-throw-by-value-catch-by-reference',
+    'misc-unconventional-assign-operator',
+    'misc-uniqueptr-reset-release',
+    'modernize-avoid-bind',
+    'modernize-concat-nested-namespaces',
+    'modernize-deprecated-headers',
+    'modernize-deprecated-ios-base-aliases',
+    'modernize-make-shared',
+    'modernize-make-unique',
+    'modernize-pass-by-value',
+    'modernize-raw-string-literal',
+    'modernize-redundant-void-arg',
+    'modernize-replace-auto-ptr',
+    'modernize-replace-disallow-copy-and-assign-macro',
+    'modernize-replace-random-shuffle',
+    'modernize-return-braced-init-list',
+    'modernize-shrink-to-fit',
+    'modernize-unary-static-assert',
+    'modernize-use-auto',
+    'modernize-use-bool-literals',
+    'modernize-use-emplace',
+    'modernize-use-equals-default',
+    'modernize-use-equals-delete',
+    'modernize-use-nodiscard',
+    'modernize-use-noexcept',
+    'modernize-use-nullptr',
+    'modernize-use-override',
+    'modernize-use-transparent-functors',
+    'modernize-use-uncaught-exceptions',
+    'mpi-buffer-deref',
+    'mpi-type-mismatch',
+    'openmp-use-default-none',
+    'performance-faster-string-find',
+    'performance-for-range-copy',
+    'performance-implicit-conversion-in-loop',
+    'performance-inefficient-algorithm',
+    'performance-inefficient-string-concatenation',
+    'performance-inefficient-vector-operation',
+    'performance-move-const-arg',
+    'performance-move-constructor-init',
+    'performance-no-automatic-move',
+    'performance-noexcept-move-constructor',
+    'performance-trivially-destructible',
+    'performance-type-promotion-in-math-fn',
+    'performance-unnecessary-copy-initialization',
+    'performance-unnecessary-value-param',
+    'portability-simd-intrinsics',
+    'readability-avoid-const-params-in-decls',
+    'readability-const-return-type',
+    'readability-container-size-empty',
+    'readability-convert-member-functions-to-static',
+    'readability-delete-null-pointer',
+    'readability-deleted-default',
+    'readability-inconsistent-declaration-parameter-name',
+    'readability-make-member-function-const',
+    'readability-misleading-indentation',
+    'readability-misplaced-array-index',
+    'readability-non-const-parameter',
+    'readability-redundant-control-flow',
+    'readability-redundant-declaration',
+    'readability-redundant-function-ptr-dereference',
+    'readability-redundant-smartptr-get',
+    'readability-redundant-string-cstr',
+    'readability-redundant-string-init',
+    'readability-simplify-subscript-expr',
+    'readability-static-accessed-through-instance',
+    'readability-static-definition-in-anonymous-namespace',
+    'readability-string-compare',
+    'readability-uniqueptr-delete-release',
+    'readability-use-anyofallof',
+]
+CLANG_FORMAT_STYLE = '{BasedOnStyle: llvm, IndentWidth: 4, SortIncludes: false}'
+
 
 class Linter(ABC):
     @abstractmethod
@@ -22,167 +174,64 @@ class Linter(ABC):
 @dataclass
 class CppLinter(Linter):
     language_standard: str
+    build_dir: Path = Path('/tmp/lint_build')      # compile_commands.json for clang-tidy
     supported_standards = {'c++', 'c++11', 'c++14', 'c++17', 'c++20', 'c++23'}
 
+    # Both tools are deterministic given the sources and the flags => the results are reused across the invocations
+    # of a warm container (resubmissions, the same template code in a course)
+    cache: ClassVar[OrderedDict[str, RunResult]] = OrderedDict()    # content hash -> lint result (LRU)
+    cache_size: ClassVar[int] = 256
+
     def __post_init__(self):
         if self.language_standard == 'c++':
             self.language_standard = 'c++20'
         if self.language_standard == 'c++23':   # TODO: Remove this when upgrading to gcc 14 and above
             self.language_standard = 'c++2b'
 
-    def lint(self, submission_paths: list[Path]) -> RunResult:
-        submission_paths_str = ' '.join([str(path) for path in submission_paths])
+    def cache_key(self, submission_paths: list[Path]) -> str:
+        key = hashlib.sha256()
+        for part in (self.language_standard, *CLANG_TIDY_CHECKS, CLANG_FORMAT_STYLE):
+            key.update(part.encode('utf-8') + b'\0')
+        for path in sorted(submission_paths):
+            key.update(str(path).encode('utf-8') + b'\0' + path.read_bytes() + b'\0')
+        return key.hexdigest()
 
-        # Clang Tidy checks
-        check_flags = [
-            'bugprone-argument-comment',
-            'bugprone-assert-side-effect',
-            'bugprone-bad-signal-to-kill-thread',
-            'bugprone-branch-clone',
-            'bugprone-copy-constructor-init',
-            'bugprone-dangling-handle',
-            'bugprone-dynamic-static-initializers',
-            'bugprone-fold-init-type',
-            'bugprone-forward-declaration-namespace',
-            'bugprone-forwarding-reference-overload',
-            'bugprone-inaccurate-erase',
-            'bugprone-incorrect-roundings',
-            'bugprone-integer-division',
-            'bugprone-lambda-function-name',
-            'bugprone-macro-parentheses',
-            'bugprone-macro-repeated-side-effects',
-            'bugprone-misplaced-operator-in-strlen-in-alloc',
-            'bugprone-misplaced-pointer-arithmetic-in-alloc',
-            'bugprone-misplaced-widening-cast',
-            'bugprone-move-forwarding-reference',
-            'bugprone-multiple-statement-macro',
-            'bugprone-no-escape',
-            'bugprone-not-null-terminated-result',
-            'bugprone-parent-virtual-call',
-            'bugprone-posix-return',
-            'bugprone-reserved-identifier',
-            'bugprone-sizeof-container',
-            'bugprone-sizeof-expression',
-            'bugprone-spuriously-wake-up-functions',
-            'bugprone-string-constructor',
-            'bugprone-string-integer-assignment',
-            'bugprone-string-literal-with-embedded-nul',
-            'bugprone-suspicious-enum-usage',
-            'bugprone-suspicious-include',
-            'bugprone-suspicious-memset-usage',
-            'bugprone-suspicious-missing-comma',
-            'bugprone-suspicious-semicolon',
-            'bugprone-suspicious-string-compare',
-            'bugprone-swapped-arguments',
-            'bugprone-terminating-continue',
-            'bugprone-throw-keyword-missing',
-            'bugprone-too-small-loop-variable',
-            'bugprone-undefined-memory-manipulation',
-            'bugprone-undelegated-constructor',
-            'bugprone-unhandled-self-assignment',
-            'bugprone-unused-raii',
-            'bugprone-unused-return-value',
-            'bugprone-use-after-move',
-            'bugprone-virtual-near-miss',
-            'cert-dcl21-cpp',
-            'cert-dcl58-cpp',
-            'cert-err34-c',
-            'cert-err52-cpp',
-            'cert-err58-cpp',
-            'cert-err60-cpp',
-            'cert-flp30-c',
-            'cert-msc50-cpp',
-            'cert-msc51-cpp',
-            'cert-str34-c',
-            'cppcoreguidelines-interfaces-global-init',
-            'cppcoreguidelines-pro-type-static-cast-downcast',
-            'cppcoreguidelines-slicing',
-            'google-default-arguments',
-            'google-explicit-constructor',
-            'google-runtime-operator',
-            'hicpp-exception-baseclass',
-            'hicpp-multiway-paths-covered',
-            'misc-misplaced-const',
-            'misc-new-delete-overloads',
-            'misc-no-recursion',
-            'misc-non-copyable-objects',
-            'misc-throw-by-value-catch-by-reference',
-            'misc-unconventional-assign-operator',
-            'misc-uniqueptr-reset-release',
-            'modernize-avoid-bind',
-            'modernize-concat-nested-namespaces',
-            'modernize-deprecated-headers',
-            'modernize-deprecated-ios-base-aliases',
-            'modernize-make-shared',
-            'modernize-make-unique',
-            'modernize-pass-by-value',
-            'modernize-raw-string-literal',
-            'modernize-redundant-void-arg',
-            'modernize-replace-auto-ptr',
-            'modernize-replace-disallow-copy-and-assign-macro',
-            'modernize-replace-random-shuffle',
-            'modernize-return-braced-init-list',
-            'modernize-shrink-to-fit',
-            'modernize-unary-static-assert',
-            'modernize-use-auto',
-            'modernize-use-bool-literals',
-            'modernize-use-emplace',
-            'modernize-use-equals-default',
-            'modernize-use-equals-delete',
-            'modernize-use-nodiscard',
-            'modernize-use-noexcept',
-            'modernize-use-nullptr',
-            'modernize-use-override',
-            'modernize-use-transparent-functors',
-            'modernize-use-uncaught-exceptions',
-            'mpi-buffer-deref',
-            'mpi-type-mismatch',
-            'openmp-use-default-none',
-            'performance-faster-string-find',
-            'performance-for-range-copy',
-            'performance-implicit-conversion-in-loop',
-            'performance-inefficient-algorithm',
-            'performance-inefficient-string-concatenation',
-            'performance-inefficient-vector-operation',
-            'performance-move-const-arg',
-            'performance-move-constructor-init',
-            'performance-no-automatic-move',
-            'performance-noexcept-move-constructor',
-            'performance-trivially-destructible',
-            'performance-type-promotion-in-math-fn',
-            'performance-unnecessary-copy-initialization',
-            'performance-unnecessary-value-param',
-            'portability-simd-intrinsics',
-            'readability-avoid-const-params-in-decls',
-            'readability-const-return-type',
-            'readability-container-size-empty',
-            'readability-convert-member-functions-to-static',
-            'readability-delete-null-pointer',
-            'readability-deleted-default',
-            'readability-inconsistent-declaration-parameter-name',
-            'readability-make-member-function-const',
-            'readability-misleading-indentation',
-            'readability-misplaced-array-index',
-            'readability-non-const-parameter',
-            'readability-redundant-control-flow',
-            'readability-redundant-declaration',
-            'readability-redundant-function-ptr-dereference',
-            'readability-redundant-smartptr-get',
-            'readability-redundant-string-cstr',
-            'readability-redundant-string-init',
-            'readability-simplify-subscript-expr',
-            'readability-static-accessed-through-instance',
-            'readability-static-definition-in-anonymous-namespace',
-            'readability-string-compare',
-            'readability-uniqueptr-delete-release',
-            'readability-use-anyofallof',
-        ]
-        check_flags = ','.join(check_flags)
+    def lint(self, submission_paths: list[Path]) -> RunResult:
+        key = self.cache_key(submission_paths)
+        if key in self.cache:
+            print('Lint result from the cache:', key)
+            self.cache.move_to_end(key)
+            return copy(self.cache[key])
 
         print(f'Linting {len(submission_paths)} files...')
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            tidy = pool.submit(self.clang_tidy, submission_paths)
+            formatting = pool.submit(self.clang_format, submission_paths)
+            lint_res = tidy.result() if tidy.result().status != Status.OK else formatting.result()
+
+        if lint_res.status not in {Status.TLE, Status.MLE}:     # Limits depend on the load => not deterministic
+            self.cache[key] = copy(lint_res)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return lint_res
+
+    def write_compile_database(self, submission_paths: list[Path]) -> None:
+        """ Only the flags of the compilation => clang-tidy does not probe the driver for them """
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+        commands = [{
+            'directory': str(path.parent),
+            'file': str(path),
+            'arguments': ['clang++', f'-std={self.language_standard}', '-fsyntax-only', str(path)],
+        } for path in submission_paths]
+        (self.build_dir / 'compile_commands.json').write_text(json.dumps(commands))
+
+    def clang_tidy(self, submission_paths: list[Path]) -> RunResult:
+        submission_paths_str = ' '.join([str(path) for path in submission_paths])
+        self.write_compile_database(submission_paths)
+
         lint_res = Process(
-            f'clang-tidy -warnings-as-errors=* -checks=-*,{check_flags} '
-            f'{submission_paths_str} -- -std={self.language_standard}',
+            f'clang-tidy -p {self.build_dir} -warnings-as-errors=* '
+            f'-checks=-*,{",".join(CLANG_TIDY_CHECKS)} {submission_paths_str}',
             timeout=100, memory_limit_mb=512
         ).run()
 
@@ -194,13 +243,12 @@ class CppLinter(Linter):
         if lint_res.errors:
             lint_res.status = Status.LINTING_ERROR
         print('Clang tidy res:', lint_res)
-        if lint_res.status != Status.OK:
-            return lint_res
+        return lint_res
 
-        # Clang Format checks
-        style = '{BasedOnStyle: llvm, IndentWidth: 4, SortIncludes: false}'
+    def clang_format(self, submission_paths: list[Path]) -> RunResult:
+        submission_paths_str = ' '.join([str(path) for path in submission_paths])
         lint_res = Process(
-            f'clang-format --style="{style}" --dry-run --Werror {submission_paths_str}',
+            f'clang-format --style="{CLANG_FORMAT_STYLE}" --dry-run --Werror {submission_paths_str}',
             timeout=100, memory_limit_mb=512
         ).run()
         if lint_res.errors:
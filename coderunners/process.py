@@ -1,17 +1,29 @@
 import errno
+import os
 import resource
 import subprocess
 import sys
 import time
 from dataclasses import dataclass, field
 from pathlib import Path
-from threading import Thread
+from threading import Event, Lock, Thread
 
 import psutil
 
 from models import RunResult, Status
 
 
+# Every Process runs in its own session. Several processes can run concurrently (e.g., the submission and the checker
+# compilers) => close() kills the new processes of all sessions except the ones that are still running.
+# Both starting a session and killing the leftovers happen under the lock, so that no session is half-registered.
+active_sessions: set[int] = set()
+sessions_lock = Lock()
+
+# Set by the judge to abandon the stages that still run (e.g., the linter after a compile error) => their processes
+# are killed right away instead of running into the next invocation of a warm container
+cancelled = Event()
+
+
 @dataclass
 class Outputs:
     stdout: str = ''
@@ -86,11 +98,14 @@ class Process:
 
         try:
             self.initial_pids = set(psutil.pids())
-            self.p = subprocess.Popen(
-                self.command, shell=True,
-                pipesize=1024 * 1024, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                preexec_fn=lambda: limit_resources(max_bytes=self.memory_limit), cwd=self.cwd,
-            )
+            with sessions_lock:
+                self.p = subprocess.Popen(
+                    self.command, shell=True,
+                    pipesize=1024 * 1024, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                    text=True, preexec_fn=lambda: limit_resources(max_bytes=self.memory_limit), cwd=self.cwd,
+                    start_new_session=True,
+                )
+                active_sessions.add(self.p.pid)
             self.execution_state = True
 
             # Read/write to stdin/stdout/stderr in a separate thread to avoid locking the main program
@@ -103,7 +118,7 @@ class Process:
 
             # poll as often as possible; otherwise the subprocess might
             # "sneak" in some extra memory usage while you aren't looking
-            while self.finish_time - self.start_time < self.timeout and self.poll():
+            while self.finish_time - self.start_time < self.timeout and self.poll() and not cancelled.is_set():
                 time.sleep(self.timeout / 500)
                 if self.max_rss_memory > self.memory_limit:
                     status = Status.MLE
@@ -197,11 +212,14 @@ class Process:
         if self.p is None:
             return
 
-        for pid in set(psutil.pids()) - self.initial_pids:
-            try:
-                psutil.Process(pid).kill()
-            except psutil.NoSuchProcess:
-                ...
+        with sessions_lock:
+            active_sessions.discard(self.p.pid)
+            for pid in set(psutil.pids()) - self.initial_pids:
+                try:
+                    if os.getsid(pid) not in active_sessions:
+                        psutil.Process(pid).kill()
+                except (psutil.NoSuchProcess, ProcessLookupError):
+                    ...
 
         try:
             self.p.wait(timeout=0.01)
@@ -0,0 +1,118 @@
+import re
+import shlex
+from dataclasses import dataclass, field
+
+ENV_NAME = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')     # The overrides are put in front of a shell command line
+ENV_ASSIGNMENT = re.compile(r'[A-Za-z_][A-Za-z0-9_]*=\S*')
+
+
+@dataclass
+class RuntimeProfile:
+    """
+    Maps the limits of a submission onto the launch flags and environment variables of a managed runtime,
+    so that the runtime neither reserves more than the memory limit (=> MLE) nor GC-thrashes far below it.
+    `overrides` (per problem) replace the computed environment variables, the `options` key replaces the launch flags.
+    """
+    overrides: dict[str, str] = field(default_factory=dict)
+    mle_return_codes: frozenset[int] = frozenset()     # Exit codes of the runtime giving up on its heap limit
+
+    def __post_init__(self):
+        invalid = [name for name in self.overrides if name != 'options' and not ENV_NAME.fullmatch(name)]
+        if invalid:
+            raise ValueError(f'Invalid names of environment variables in the runtime overrides: {invalid}')
+
+    @staticmethod
+    def from_language(language: str, overrides: dict[str, str] | None = None) -> RuntimeProfile | None:
+        language = language.lower()
+        overrides = overrides or {}
+        for profile in (JvmRuntime, GoRuntime, DotnetRuntime, NodeRuntime, GhcRuntime):
+            if language in profile.supported_languages:
+                return profile(overrides=overrides)
+        if overrides:
+            print(f'Ignoring the runtime overrides {list(overrides)}: {language} has no runtime profile')
+        return None
+
+    def env(self, memory_limit_mb: int) -> dict[str, str]:
+        return {}
+
+    def options(self, memory_limit_mb: int) -> list[str]:
+        return []
+
+    def launch_command(self, command: str, memory_limit_mb: int) -> str:
+        """ Adds the launch flags right after the executable and the environment variables in front of the command """
+        options = self.options(memory_limit_mb)
+        if 'options' in self.overrides:
+            options = shlex.split(self.overrides['options'])
+        if options:
+            tokens = command.split(' ')
+            executable = next(i for i, token in enumerate(tokens) if not ENV_ASSIGNMENT.fullmatch(token))
+            tokens[executable + 1:executable + 1] = [shlex.quote(option) for option in options]
+            command = ' '.join(tokens)
+
+        env = {**self.env(memory_limit_mb), **self.overrides}
+        env.pop('options', None)
+        return ' '.join([*(f'{name}={shlex.quote(value)}' for name, value in env.items()), command])
+
+
+@dataclass
+class JvmRuntime(RuntimeProfile):
+    supported_languages = {'java', 'kotlin', 'kt', 'scala', 'scala3'}
+
+    def options(self, memory_limit_mb: int) -> list[str]:
+        # Leave room for the metaspace, the code cache and the thread stacks outside the heap
+        max_heap_mb = max(memory_limit_mb * 3 // 4, memory_limit_mb - 128)
+        return [
+            f'-Xmx{max_heap_mb}m',
+            '-XX:+UseSerialGC',         # A single vCPU => no parallel/concurrent GC threads
+            '-Xss64m',                  # Deep recursion is common in submissions
+            '-XX:OnOutOfMemoryError=kill -9 %p',    # Killed with SIGKILL => reported as MLE instead of a crash
+        ]
+
+
+@dataclass
+class GoRuntime(RuntimeProfile):
+    supported_languages = {'go', 'golang'}
+
+    def env(self, memory_limit_mb: int) -> dict[str, str]:
+        # Collect rarely while far from the limit, and as often as needed when getting close to it
+        return {'GOMEMLIMIT': f'{memory_limit_mb * 9 // 10}MiB', 'GOGC': '200'}
+
+
+@dataclass
+class DotnetRuntime(RuntimeProfile):
+    supported_languages = {'c#'}
+
+    def env(self, memory_limit_mb: int) -> dict[str, str]:
+        return {
+            'DOTNET_GCHeapHardLimit': f'{memory_limit_mb * 9 // 10 * 1024 * 1024:X}',   # Hexadecimal bytes
+            'DOTNET_gcServer': '0',
+            'DOTNET_gcConcurrent': '0',
+            # Precompiled (ReadyToRun) framework code for a fast startup. The instrumented tier of dynamic PGO costs
+            # more than it gains in runs of a few seconds on one vCPU. Both can be switched per problem (overrides).
+            'DOTNET_ReadyToRun': '1',
+            'DOTNET_TieredPGO': '0',
+        }
+
+
+@dataclass
+class NodeRuntime(RuntimeProfile):
+    supported_languages = {'js', 'ts', 'typescript'}
+
+    def env(self, memory_limit_mb: int) -> dict[str, str]:
+        # V8 collects the old generation more aggressively when getting close to its limit.
+        # Leave room for the young generation, the code space and the native memory outside the old space
+        max_old_space_mb = max(memory_limit_mb * 3 // 4, memory_limit_mb - 128)
+        options = f'--max-old-space-size={max_old_space_mb}'
+        if memory_limit_mb < 256:   # The default young generation takes a large part of a small limit
+            options += f' --max-semi-space-size={max(memory_limit_mb // 16, 1)}'
+        return {'NODE_OPTIONS': options}
+
+
+@dataclass
+class GhcRuntime(RuntimeProfile):
+    supported_languages = {'haskell', 'hs'}
+    mle_return_codes: frozenset[int] = frozenset({251})     # "Heap exhausted"
+
+    def options(self, memory_limit_mb: int) -> list[str]:
+        allocation_area_mb = min(64, max(memory_limit_mb // 32, 1))
+        return ['+RTS', f'-M{memory_limit_mb}m', f'-H{memory_limit_mb // 4}m', f'-A{allocation_area_mb}m', '-RTS']
@@ -1,3 +1,5 @@
+import bisect
+import itertools
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from decimal import Decimal, getcontext
@@ -42,3 +44,42 @@ class SubtaskScorer(Scorer):
             scores += [float(points_per_test * ok) for ok in oks]
             del results[:test_group.count]
         return float(sum(scores)), scores
+
+
+def aggregate(test_results: list[RunResult], score: float) -> RunResult:
+    """ The overall result of a submission: the verdict of its first failed test and the peak time/memory """
+    first_failed = next((i for i, x in enumerate(test_results) if x.status != Status.OK), None)
+    return RunResult(
+        status=Status.OK if first_failed is None else test_results[first_failed].status,
+        memory=max((t.memory for t in test_results), default=0),
+        time=max((t.time for t in test_results), default=0),
+        return_code=0 if first_failed is None else test_results[first_failed].return_code,
+        score=score,
+    )
+
+
+def score_results(test_results: list[RunResult], test_groups: list[TestGroup] | None = None) -> RunResult:
+    """ Replaces the scores of the checker with the scores of the tests and returns the overall result """
+    scorer = Scorer.from_request(test_groups)
+    total, per_test = scorer.score(test_results)
+    print('Total score:', total, 'Score per test:', per_test)
+    for r, score in zip(test_results, per_test):
+        r.score = score
+    return aggregate(test_results, score=total)
+
+
+def shard_range(
+    test_count: int, shard_count: int, shard_index: int, test_groups: list[TestGroup] | None = None,
+) -> range:
+    """
+    The indices of the tests judged by a shard: equal ranges of tests, cut at the group boundaries if the tests are
+    grouped (a failed test skips the rest of its group => a group is never split across shards)
+    """
+    cuts = list(range(test_count + 1))
+    if test_groups:
+        cuts = sorted({c for c in itertools.accumulate((g.count for g in test_groups), initial=0) if c < test_count})
+        cuts.append(test_count)
+
+    def boundary(k: int) -> int:
+        return cuts[bisect.bisect_left(cuts, test_count * k // shard_count)]
+    return range(boundary(shard_index), boundary(shard_index + 1))
@@ -1,30 +1,39 @@
 import gzip
 import itertools
+import os
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from copy import copy
 from pathlib import Path
 
-from cryptography.fernet import Fernet
-
 from coderunners.checkers import Checker
-from coderunners.compilers import Compiler, TxtCompiler
-from coderunners.executors import Executor
+from coderunners.compilers import Compiler, TxtCompiler, predict_build_profile
+from coderunners.daemons import stop_daemons
+from coderunners.executors import Executor, JvmExecutor, ProcessExecutor
 from coderunners.linters import Linter
-from coderunners.process import Process
-from coderunners.scoring import Scorer
+from coderunners.process import Process, cancelled
+from coderunners.runtimes import RuntimeProfile
+from coderunners.scoring import aggregate, score_results, shard_range
 from coderunners.util import save_code
-from models import RunResult, Status, SubmissionRequest, SubmissionResult, TestCase
+from models import CheckerArtifact, RunResult, Status, SubmissionRequest, SubmissionResult, TestCase
 
 
 class EqualityChecker(SubmissionRequest):
     ROOT: Path = Path('/tmp/')
 
     @staticmethod
-    def compile(code_paths: list[Path], language: str) -> tuple[Executor | None, RunResult]:
+    def compile(
+        code_paths: list[Path], language: str, sanitizer: str = 'always', type_check: bool = True, jit: bool = False,
+        runtime_overrides: dict[str, str] | None = None, build_profile: str = 'optimized',
+    ) -> tuple[Executor | None, RunResult]:
         """ Compiles and returns (executable path | None, compilation result) """
-        compiler = Compiler.from_language(language=language)
+        compiler = Compiler.from_language(
+            language=language, sanitizer=sanitizer, type_check=type_check, jit=jit, build_profile=build_profile,
+        )
         executor, compilation = compiler.compile(submission_paths=code_paths)
         if compilation.status == Status.OK and not compilation.errors:
+            if isinstance(executor, ProcessExecutor):
+                executor.runtime = RuntimeProfile.from_language(language, overrides=runtime_overrides)
             return executor, compilation
 
         # Compile error
@@ -38,24 +47,8 @@ class EqualityChecker(SubmissionRequest):
         compilation.score = 0
         return None, compilation
 
-    # flake8: noqa: C901
-    def check(self) -> SubmissionResult:
-        Process('rm -rf /tmp/*', timeout=5, memory_limit_mb=512).run()  # Avoid having no space left on device issues
-        code_paths = save_code(save_dir=self.ROOT, code=self.code)
-        start_time = time.time()
-
-        executor, compile_result = self.compile(code_paths, self.language)
-        if executor is None:
-            return SubmissionResult(overall=compile_result, compile_result=compile_result)
-
-        # Lint the code
-        lint_result = None
-        if self.lint:
-            linter = Linter.from_language(language=self.language)
-            lint_result = linter.lint(code_paths)
-            if lint_result.status != Status.OK:
-                return SubmissionResult(overall=lint_result, compile_result=compile_result, linting_result=lint_result)
-
+    def load_tests(self) -> None:
+        """ Adds the tests of the problem (EFS) to the tests of the request """
         problem_file = Path(f'/mnt/efs/{self.problem}.gz.fer')
         if self.problem:
             print(problem_file, 'exists:', problem_file.exists())
@@ -63,6 +56,7 @@ class EqualityChecker(SubmissionRequest):
             # Compress:   (1) json.dumps   (2) .encode('utf-8')   (3) gzip.compress()   (4) encrypt
             # Decompress: (1) decrypt      (2) gzip.decompress()  (3) .decode('utf-8')  (4) json.loads()
             print('getting test cases from the storage: ', problem_file)
+            from cryptography.fernet import Fernet      # Only the problems are encrypted => lazy (cold start)
             fernet = Fernet(self.encryption_key.encode())
             with open(problem_file, 'rb') as f:
                 data = fernet.decrypt(f.read())
@@ -81,16 +75,111 @@ class EqualityChecker(SubmissionRequest):
             print(f'txt => Reducing the number of test cases from {len(self.test_cases)} to 1...')
             self.test_cases = self.test_cases[:1]
 
+    @staticmethod
+    def can_compile_concurrently(language: str, other_language: str) -> bool:
+        """ The compilers of the same language share their build directories (e.g., /tmp/rust_build) """
+        return type(Compiler.from_language(language)) is not type(Compiler.from_language(other_language))
+
+    def compile_submission(self, code_paths: list[Path], tests: Future) -> tuple[Executor | None, RunResult, str]:
+        """ Compiles the submission and returns (executor | None, compilation result, build profile) """
+        # Minimize the compile + run time: the optimizer only pays off for a heavy test workload
+        build_profile = self.build_profile
+        if build_profile == 'auto' and not Compiler.has_build_profiles(self.language):
+            build_profile = 'optimized'
+        if build_profile == 'auto':
+            tests.result()      # The prediction needs the tests
+            build_profile = predict_build_profile(self.test_cases, self.time_limit)
+            print('Predicted build profile:', build_profile)
+
+        executor, compile_result = self.compile(
+            code_paths, self.language,
+            sanitizer=self.sanitizer, type_check=self.type_check, jit=self.jit,
+            runtime_overrides=self.runtime_overrides, build_profile=build_profile,
+        )
+        return executor, compile_result, build_profile
+
+    def compile_checker(self) -> tuple[Executor | None, RunResult]:
+        checker_code_paths = save_code(save_dir=self.ROOT, code=self.checker_code)
+        return self.compile(checker_code_paths, self.checker_language)
+
+    def load_checker(self) -> Executor | None:
+        """ Restores the checker compiled at sync time (see sync/checker.py) if the problem has one """
+        checker_file = Path(f'/mnt/efs/{self.problem}.checker.fer')
+        if not self.problem or not checker_file.exists():
+            return None
+
+        print('getting the checker from the storage: ', checker_file)
+        from cryptography.fernet import Fernet
+        fernet = Fernet(self.encryption_key.encode())
+        data = gzip.decompress(fernet.decrypt(checker_file.read_bytes())).decode('utf-8')
+        artifact = CheckerArtifact.from_json(data)
+        for path, content in artifact.files.items():
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(content)
+            path.chmod(0o755)
+            os.utime(path, (0, 0))  # The sources had the same mtime when the bytecode was compiled
+        print('Restored the checker:', artifact.language, artifact.command)
+        return ProcessExecutor(command=artifact.command)
+
+    @staticmethod
+    def abandon(pool: ThreadPoolExecutor) -> None:
+        """
+        Stops the prologue stages that still run: their processes are killed and the stages are joined, so that
+        nothing keeps running (or writing to /tmp) into the next invocation of the container
+        """
+        cancelled.set()
+        try:
+            pool.shutdown(wait=True, cancel_futures=True)
+        finally:
+            cancelled.clear()
+
+    # flake8: noqa: C901
+    def check(self) -> SubmissionResult:
+        Process(f'rm -rf {self.ROOT}/*', timeout=5, memory_limit_mb=512).run()  # Avoid no space left on device issues
+        code_paths = save_code(save_dir=self.ROOT, code=self.code)
+        start_time = time.time()
+
+        # The prologue stages are independent => load the tests, compile the submission and the checker, and lint
+        # concurrently. The results are joined in the order of the sequential checks (the first failure is returned)
+        custom_checker = self.comparison_mode == 'custom' and bool(self.checker_code and self.checker_language)
+        # The pool is not used as a context manager: leaving the block would wait for the stages that still run
+        # (e.g., clang-tidy) => a compile or lint failure kills their processes first (see abandon())
+        pool = ThreadPoolExecutor(max_workers=3)
+        tests = pool.submit(self.load_tests)
+        checker_compilation, stored_checker = None, None
+        if custom_checker and self.can_compile_concurrently(self.language, self.checker_language):
+            checker_compilation = pool.submit(self.compile_checker)
+        if self.comparison_mode == 'custom' and not custom_checker:
+            stored_checker = pool.submit(self.load_checker)
+        linting = pool.submit(Linter.from_language(language=self.language).lint, code_paths) if self.lint else None
+
+        executor, compile_result, build_profile = self.compile_submission(code_paths, tests)
+        if executor is None:
+            self.abandon(pool)
+            return SubmissionResult(overall=compile_result, compile_result=compile_result)
+
+        # Lint the code
+        lint_result = linting.result() if linting else None
+        if lint_result and lint_result.status != Status.OK:
+            self.abandon(pool)
+            return SubmissionResult(overall=lint_result, compile_result=compile_result, linting_result=lint_result)
+        tests.result()
+        pool.shutdown(wait=False)   # The checker stages are joined below
+
         # Prepare the checker
         checker_executor = None
-        if self.comparison_mode == 'custom':
-            if not self.checker_code or not self.checker_language:
+        if self.comparison_mode == 'custom' and not custom_checker:
+            checker_executor = stored_checker.result() if stored_checker else None
+            if checker_executor is None:
                 fail = RunResult(status=Status.COMPILATION_ERROR, memory=0, time=0, score=0, return_code=1)
-                fail.message = 'You should provide `checker_code` or `checker_language` for custom checkers'
+                fail.message = 'You should provide `checker_code` or `checker_language` for custom checkers ' \
+                               '(or a checker in the tests zip of the problem)'
                 return SubmissionResult(overall=fail, compile_result=fail)
-
-            checker_code_paths = save_code(save_dir=self.ROOT, code=self.checker_code)
-            checker_executor, checker_compile_result = self.compile(checker_code_paths, self.checker_language)
+        elif self.comparison_mode == 'custom':
+            checker_executor, checker_compile_result = (
+                checker_compilation.result() if checker_compilation else self.compile_checker()
+            )
             if checker_executor is None:
                 checker_compile_result.message = 'Checker compilation failed'
                 return SubmissionResult(overall=checker_compile_result, compile_result=checker_compile_result)
@@ -100,9 +189,23 @@ class EqualityChecker(SubmissionRequest):
             float_precision=self.float_precision, delimiter=self.delimiter, executor=checker_executor,
         )
 
-        # Process all tests
+        # Everything is compiled => no compile daemon stays reachable from the submitted code (restarted by the app)
+        stop_daemons()
+
+        # The CDS training runs the submission once (the limits of a test) => within the 5 minutes of the judge,
+        # and only if all the tests still fit in what remains (it only speeds up their startup)
+        if isinstance(executor, JvmExecutor) and executor.training_archive is not None \
+                and time.time() - start_time + (len(self.test_cases) + 1) * self.time_limit <= 5 * 60:
+            executor.create_app_archive(time_limit=self.time_limit, memory_limit_mb=self.memory_limit)
+
+        # Process all tests (or the range of the shard => the bouncer merges and scores the shards)
+        shard = range(len(self.test_cases))
+        if self.shard_index is not None:
+            shard = shard_range(len(self.test_cases), self.shard_count, self.shard_index, self.test_groups)
+            print(f'Shard {self.shard_index}/{self.shard_count}: tests {shard.start}..{shard.stop}')
         test_results: list[RunResult] = []
-        tests_iter = iter(enumerate(self.test_cases))
+        diagnosed = False
+        tests_iter = ((i, self.test_cases[i]) for i in shard)
         for i, test in tests_iter:
             print(f'Running test {i}', end='...')
             r = executor.run(
@@ -110,6 +213,23 @@ class EqualityChecker(SubmissionRequest):
                 time_limit=self.time_limit, memory_limit_mb=self.memory_limit, output_limit_mb=self.output_limit,
             )
 
+            # The prediction was wrong => judge this and the remaining tests with the optimized build
+            if r.status == Status.TLE and build_profile == 'fast' and self.build_profile == 'auto':
+                print('TLE with the fast build => recompiling with optimizations and rerunning the test')
+                build_profile = 'optimized'
+                optimized, _ = self.compile(
+                    code_paths, self.language,
+                    sanitizer=self.sanitizer, type_check=self.type_check, jit=self.jit,
+                    runtime_overrides=self.runtime_overrides, build_profile=build_profile,
+                )
+                if optimized is not None:
+                    executor = optimized
+                    r = executor.run(
+                        test=test,
+                        time_limit=self.time_limit, memory_limit_mb=self.memory_limit,
+                        output_limit_mb=self.output_limit,
+                    )
+
             (r.status, r.score, r.message) = checker.check(
                 inputs=test.input, output=r.outputs or '', target=test.target,
                 code=self.code,
@@ -118,6 +238,18 @@ class EqualityChecker(SubmissionRequest):
             ) if r.status == Status.OK else (r.status, 0, r.message)
             print(f'Test {i} res: {r.status} => score {r.score}')
 
+            # Explain a crash or a wrong answer with an instrumented run (e.g., a sanitizer report) if the executor
+            # supports it: once per submission, and only if the slower run (3x the limits) fits in the 5 minutes
+            if r.status in (Status.RUNTIME_ERROR, Status.WA) and not diagnosed \
+                    and time.time() - start_time + 3 * self.time_limit + r.time <= 5 * 60:
+                diagnosed = True
+                report = executor.diagnose(
+                    test=test,
+                    time_limit=self.time_limit, memory_limit_mb=self.memory_limit, output_limit_mb=self.output_limit,
+                )
+                if report:
+                    r.message = f'{r.message}\n{report}' if r.message else report
+
             # Clean up
             executor.cleanup(test)
 
@@ -176,7 +308,7 @@ class EqualityChecker(SubmissionRequest):
                 elif self.stop_on_first_fail:
                     test_results += [
                         RunResult(status=Status.SKIPPED, memory=0, time=0, return_code=0)
-                    ] * (len(self.test_cases) - i - 1)
+                    ] * (shard.stop - i - 1)
                     break
 
             # Stop if `start_time` + estimated time for the next test is greater than 5 minutes
@@ -184,28 +316,17 @@ class EqualityChecker(SubmissionRequest):
                 print('Cannot run the next test as it will exceed the 5 minutes limit => stopping...')
                 test_results += [
                     RunResult(status=Status.SKIPPED, memory=0, time=0, return_code=0)
-                ] * (len(self.test_cases) - i - 1)
+                ] * (shard.stop - i - 1)
                 break
 
         print('test_results:', test_results)
-        assert len(test_results) == len(self.test_cases)
-
-        # Scoring
-        scorer = Scorer.from_request(self.test_groups)
-        total, per_test = scorer.score(test_results)
-        print('Total score:', total, 'Score per test:', per_test)
-        for r, score in zip(test_results, per_test):
-            r.score = score
-
-        # Aggregate all the results across test cases
-        first_failed = next((i for i, x in enumerate(test_results) if x.status != Status.OK), None)
-        overall = RunResult(
-            status=Status.OK if first_failed is None else test_results[first_failed].status,
-            memory=max(t.memory for t in test_results),
-            time=max(t.time for t in test_results),
-            return_code=0 if first_failed is None else test_results[first_failed].return_code,
-            score=total,
-        )
+        assert len(test_results) == len(shard)
+
+        # Scoring + aggregate all the results across test cases
+        if self.shard_index is None:
+            overall = score_results(test_results, self.test_groups)
+        else:   # The raw scores of the checker, the merged shards are scored as a single run
+            overall = aggregate(test_results, score=0)
 
         res = SubmissionResult(
             overall=overall, compile_result=compile_result, linting_result=lint_result, test_results=test_results
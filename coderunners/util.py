@@ -1,7 +1,14 @@
+import os
+import re
+import shutil
+from collections.abc import Callable
 from pathlib import Path
+from zipfile import BadZipFile, ZipFile
 
 from models import CodeTree
 
+SANITIZER_REPORT = re.compile(r'^==\d+==ERROR: \w*Sanitizer', re.MULTILINE)
+
 
 def is_float(value: str) -> bool:
     if len(value) > 100:
@@ -31,3 +38,44 @@ def save_code(save_dir: Path, code: CodeTree) -> list[Path]:
             raise TypeError(f'Unsupported type for content {type(content)}')
 
     return saved_paths
+
+
+def extract_sanitizer_report(errors: str | None, max_len: int = 4000) -> str | None:
+    """ Returns the first sanitizer report (AddressSanitizer, LeakSanitizer, ...) found in stderr """
+    match = SANITIZER_REPORT.search(errors or '')
+    if match is None:
+        return None
+    return errors[match.start():][:max_len].strip()
+
+
+def jar_main_class(jar_path: Path) -> str | None:
+    """ Returns the `Main-Class` declared in the manifest of a jar (None if there isn't one) """
+    try:
+        with ZipFile(jar_path) as jar:
+            manifest = jar.read('META-INF/MANIFEST.MF').decode('utf-8')
+    except (OSError, KeyError, BadZipFile):
+        return None
+
+    # Long manifest lines are wrapped => continuation lines start with a single space
+    manifest = manifest.replace('\r\n', '\n').replace('\n ', '')
+    for line in manifest.splitlines():
+        if line.startswith('Main-Class:'):
+            return line.removeprefix('Main-Class:').strip() or None
+    return None
+
+
+def overlay_tree(template_dir: Path, target_dir: Path, copy_file: Callable[[Path], bool] = lambda path: False) -> None:
+    """
+    Creates a writable layer over a read-only template directory: the directory structure is recreated in
+    `target_dir` and the files are symlinked (or copied if `copy_file(relative_path)` is True, for the files that
+    tools open for writing). New files are then written to `target_dir` while the template stays untouched.
+    """
+    for root, _, files in os.walk(template_dir):
+        relative_dir = Path(root).relative_to(template_dir)
+        (target_dir / relative_dir).mkdir(parents=True, exist_ok=True)
+        for name in files:
+            source, destination = Path(root) / name, target_dir / relative_dir / name
+            if copy_file(relative_dir / name):
+                shutil.copy2(source, destination)
+            else:
+                destination.symlink_to(source)
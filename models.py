@@ -1,5 +1,7 @@
 import base64
 import gzip
+import json
+import re
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Literal
@@ -45,6 +47,54 @@ class Status(Enum):
     SKIPPED = 'Skipped'
 
 
+# Envelopes of the lambda payloads between the bouncer and the coderunners: `serializer+compressor`, most compact first.
+# Lambda payloads have to be JSON => the binary body is base64-encoded: {"envelope": codec, "data": base64}
+# (`json` => the plain JSON payloads without an envelope)
+ENVELOPE_CODECS = ('msgpack+zstd', 'json+zstd')
+
+
+def envelope_codec(codec: str):
+    """ Returns (encode, decode) functions for bytes, raises ImportError if the codec is not installed """
+    serializer, _, compressor = codec.partition('+')
+    if serializer == 'msgpack':
+        import msgpack
+        dumps, loads = msgpack.packb, msgpack.unpackb
+    elif serializer == 'json':
+        dumps, loads = lambda data: json.dumps(data, separators=(',', ':')).encode('utf-8'), json.loads
+    else:
+        raise ValueError(f'Unknown envelope codec: {codec}')
+
+    if compressor == 'zstd':
+        from compression import zstd    # Python 3.14+
+        return lambda data: zstd.compress(dumps(data), level=1), lambda data: loads(zstd.decompress(data))
+    if compressor:
+        raise ValueError(f'Unknown envelope codec: {codec}')
+    return dumps, loads
+
+
+def envelope_codec_available(codec: str) -> bool:
+    try:
+        envelope_codec(codec)
+        return True
+    except (ImportError, ValueError):
+        return False
+
+
+def preferred_envelope_codec() -> str:
+    """ The most compact codec installed (plain JSON otherwise) """
+    return next((codec for codec in ENVELOPE_CODECS if envelope_codec_available(codec)), 'json')
+
+
+def encode_envelope(data: dict, codec: str) -> dict:
+    encode, _ = envelope_codec(codec)
+    return {'envelope': codec, 'data': base64.b64encode(encode(data)).decode('ascii')}
+
+
+def decode_envelope(payload: dict) -> dict:
+    _, decode = envelope_codec(payload['envelope'])
+    return decode(base64.b64decode(payload['data']))
+
+
 @dataclass
 class TestCase(DataClassJsonCamelMixIn):
     input: str
@@ -94,6 +144,15 @@ class SubmissionRequest(DataClassJsonCamelMixIn):
     return_outputs: bool = False
     stop_on_first_fail: bool = True
     lint: bool = False
+    sanitizer: str = 'always'       # always | diagnostics (C++: judge a plain build, explain failures with ASAN)
+    type_check: bool = True         # TypeScript: False => transpile only (faster, type errors are not reported)
+    jit: bool = False               # Ruby/PHP: enable the runtime JIT (YJIT, opcache JIT)
+    runtime_overrides: dict[str, str] | None = None  # Per-problem runtime tuning: env vars + `options` (flags)
+    build_profile: str = 'optimized'    # optimized | fast | auto: optimizer level of compiled code (auto => from tests)
+    shard_count: int = 1            # > 1 => the bouncer judges ranges of the tests in parallel coderunners (merged)
+    shard_index: int | None = None  # Set by the bouncer: the range of the tests judged by this coderunner
+    bypass_cache: bool = False      # True => judged again even if an identical submission was judged before
+    priority: str = 'practice'      # contest | exam | practice: admission to the coderunners (see bouncer/admission.py)
 
     # Checker parameters
     comparison_mode: str = 'whole'    # whole | token | custom
@@ -103,6 +162,7 @@ class SubmissionRequest(DataClassJsonCamelMixIn):
     checker_language: str | None = None
 
     callback_url: str | None = None  # Where to send the results when they're ready
+    job_id: str | None = None        # Set by the bouncer for asynchronous judges (see bouncer/jobs.py)
     encryption_key: str | None = None
 
     def __post_init__(self):
@@ -113,8 +173,13 @@ class SubmissionRequest(DataClassJsonCamelMixIn):
         if self.test_cases is None:
             self.test_cases = []
 
-        if self.comparison_mode == 'custom':
-            assert self.checker_code is not None and self.checker_language is not None
+        assert 1 <= self.shard_count <= 64
+        assert self.priority in ('contest', 'exam', 'practice')
+        # Put in front of a shell command line by the coderunners (see coderunners/runtimes.py)
+        assert all(name == 'options' or re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', name)
+                   for name in self.runtime_overrides or {})
+        if self.comparison_mode == 'custom':    # The checker of a problem can also be compiled at sync time
+            assert (self.checker_code is not None and self.checker_language is not None) or self.problem is not None
 
 
 @dataclass
@@ -141,6 +206,17 @@ class SubmissionResult(DataClassJsonCamelMixIn):
     linting_result: RunResult | None = None
     test_results: list[RunResult] | None = None
 
+    def omit_outputs(self, message: str) -> None:
+        """ Keeps the verdicts and drops the outputs of the tests (when the results are too large to be returned) """
+        for r in self.test_results or []:
+            r.outputs, r.errors, r.output_files, r.output_assets = None, None, None, None
+            r.message = message
+
+
+@dataclass
+class BatchRequest(DataClassJsonCamelMixIn):
+    submissions: list[SubmissionRequest]    # Judged concurrently, the callback of each is sent as soon as it's ready
+
 
 @dataclass
 class SyncRequest(DataClassJsonCamelMixIn):
@@ -149,6 +225,17 @@ class SyncRequest(DataClassJsonCamelMixIn):
     encryption_key: str
 
 
+@dataclass
+class CheckerArtifact(DataClassJsonCamelMixIn):
+    """ A checker compiled once at sync time and stored next to the tests of the problem """
+    language: str
+    command: str                                # Runs the checker from the restored files
+    files: dict[str, bytes] = field(            # mapping absolute path (sources + build outputs) -> binary content
+        metadata=config(encoder=encode_assets, decoder=decode_assets),
+        default_factory=dict,
+    )
+
+
 @dataclass
 class TestGenRequest(DataClassJsonCamelMixIn):
     code: CodeTree                              # Mapping from filename.extension -> content
@@ -0,0 +1,63 @@
+import gzip
+import os
+import shutil
+from pathlib import Path
+from zipfile import ZipFile
+
+from cryptography.fernet import Fernet
+
+from coderunners.util import save_code
+from models import CheckerArtifact, CodeTree, Status
+
+CHECKER_LANGUAGES = {'.py': 'python', '.c': 'c', '.cpp': 'c++', '.cc': 'c++'}
+
+
+def zip2checker(zip_path: Path) -> tuple[CodeTree, str] | None:
+    """ Finds `checker.py` / `checker.cpp` / ... in the problem zip => (code, language) or None without a checker """
+    with ZipFile(zip_path, 'r') as zip_ref:
+        names = [name for name in zip_ref.namelist() if Path(name).stem == 'checker']
+        names = sorted([name for name in names if Path(name).suffix in CHECKER_LANGUAGES],
+                       key=lambda name: (name.count('/'), name))     # The closest one to the root
+        if not names:
+            return None
+        print('Checker:', names[0])
+        path = Path(names[0])
+        return {path.name: zip_ref.read(names[0]).decode('utf-8')}, CHECKER_LANGUAGES[path.suffix]
+
+
+def compile_checker(code: CodeTree, language: str, root: Path = Path('/tmp/')) -> CheckerArtifact:
+    """
+    Compiles the checker in an empty `root` (the coderunners save and build the checker there as well)
+    and collects everything the build left there => the runner restores the files at the same paths
+    """
+    for path in root.iterdir():
+        if path.is_dir() and not path.is_symlink():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+
+    code_paths = save_code(save_dir=root, code=code)
+    for path in code_paths:     # A fixed mtime => the restored sources match the bytecode of the interpreted checkers
+        os.utime(path, (0, 0))
+
+    # Imported here => the problems without a checker do not load the compilers of all the languages (cold start)
+    from coderunners.compilers import Compiler, CppCompiler
+
+    # A plain C++ build: ASAN is not available in the images of the other languages,
+    # and neither is libstdc++ (e.g., the Python or the Java images) => the C++ runtime is linked statically
+    compiler = Compiler.from_language(language=language, sanitizer='diagnostics')
+    if isinstance(compiler, CppCompiler):
+        compiler.static_runtime = True
+    executor, compile_res = compiler.compile(code_paths)
+    print('Checker compile res', compile_res)
+    if compile_res.status != Status.OK:
+        raise ValueError(f'Checker compilation failed: {compile_res.errors or compile_res.outputs}')
+
+    files = {str(path): path.read_bytes() for path in sorted(root.rglob('*')) if path.is_file()}
+    print('Checker artifact:', executor.command, list(files.keys()))
+    return CheckerArtifact(language=language, command=executor.command, files=files)
+
+
+def encrypt_checker(artifact: CheckerArtifact, encryption_key: str) -> bytes:
+    # Same as the tests: (1) json   (2) .encode('utf-8')   (3) gzip.compress()   (4) encrypt
+    return Fernet(encryption_key).encrypt(gzip.compress(artifact.to_json().encode('utf-8')))
@@ -29,14 +29,17 @@ class SummaryTable:
             'message': message,
         })
 
-    def write(self, problem_id: str, tests: list[TestCase]) -> None:
-        response = self.table.put_item(Item={
+    def write(self, problem_id: str, tests: list[TestCase], digest: str | None = None) -> None:
+        item = {
             'id': problem_id,
             'count': len(tests),
             'tests': [t.to_dict() for t in tests],
             'status': 'completed',
             'message': '',
-        })
+        }
+        if digest:      # The version of the tests => keys the results cached by the bouncer (bouncer/cache.py)
+            item['digest'] = digest
+        response = self.table.put_item(Item=item)
         if response['ResponseMetadata']['HTTPStatusCode'] not in range(200, 300):
             self.log_error(problem_id, 'Could not summarize the tests')
             raise SummaryWriteError('Could not summarize the tests', response)
@@ -3,6 +3,7 @@ from pathlib import Path
 import boto3
 
 from models import SyncRequest
+from sync.checker import compile_checker, encrypt_checker, zip2checker
 from sync.summary import truncate
 from sync.sync import encrypt_tests, zip2tests
 
@@ -18,6 +19,7 @@ def handler(event, context):
     bucket, key, encryption_key = request.bucket, request.key, request.encryption_key
     problem = key.split('.')[0]
     problem_file = Path(f'/mnt/efs/{problem}.gz.fer')
+    checker_file = Path(f'/mnt/efs/{problem}.checker.fer')
     zip_path = Path('/tmp/') / f'{problem}.zip'
     print('problem_file', problem_file, 'zip:', zip_path)
 
@@ -25,12 +27,22 @@ def handler(event, context):
     print('download size:', zip_path.stat().st_size)
 
     tests = zip2tests(zip_path)
+    checker = zip2checker(zip_path)
     tests_truncated = truncate(tests, max_len=100)
     tests = encrypt_tests(tests, encryption_key=encryption_key)
+    zip_path.unlink(missing_ok=True)
+
+    # Compile the checker once for all the submissions (the coderunners restore the build from EFS)
+    # before writing anything => a checker that does not compile keeps the previous version of the problem
+    checker = encrypt_checker(compile_checker(*checker), encryption_key=encryption_key) if checker else None
 
     problem_file.write_bytes(tests)
     print(f'{problem_file} size on EFS:', problem_file.stat().st_size)
-    zip_path.unlink(missing_ok=True)
+    if checker is None:
+        checker_file.unlink(missing_ok=True)
+    else:
+        checker_file.write_bytes(checker)
+        print(f'{checker_file} size on EFS:', checker_file.stat().st_size)
 
     return {
         'status_code': 200,
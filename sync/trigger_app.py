@@ -17,6 +17,7 @@ def handler(event, context):
 
     bucket = event['Records'][0]['s3']['bucket']['name']
     key = event['Records'][0]['s3']['object']['key']  # bucket/some-folder/problem.zip
+    digest = event['Records'][0]['s3']['object'].get('eTag')   # Changes with the content of the uploaded zip
     problem = key.split('.')[0]
     print('bucket:', bucket, 'key:', key, 'problem:', problem)
 
@@ -38,5 +39,5 @@ def handler(event, context):
 
     tests = TestCase.schema().load(res['tests_truncated'], many=True)
     print('tests:', tests)
-    SummaryTable(dynamodb).write(problem, tests)
+    SummaryTable(dynamodb).write(problem, tests, digest=digest)
     print('Wrote to a summary table')
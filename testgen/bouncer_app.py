@@ -1,3 +1,4 @@
+import base64
 import json
 import os
 import uuid
@@ -11,7 +12,6 @@ from sync.summary import SummaryTable
 aws_lambda = boto3.client('lambda', config=Config(retries={'max_attempts': 0}, read_timeout=360, connect_timeout=360))
 sts = boto3.client('sts')
 dynamodb = boto3.resource('dynamodb')
-s3 = boto3.client('s3')
 
 UPLOAD_ROLE_ARN = os.getenv('UPLOAD_ROLE_ARN')
 TESTS_BUCKET = os.getenv('TESTS_BUCKET')
@@ -46,7 +46,9 @@ def handler(event, context):
     """
     print('Event:', type(event), event)
     print('Context:', context)
-    request = TestGenRequest.from_json(event['body'])
+    # The API has binary media types (compressed responses of the judge) => the bodies can be base64-encoded
+    body = base64.b64decode(event['body']).decode('utf-8') if event.get('isBase64Encoded') else event['body']
+    request = TestGenRequest.from_json(body)
     print('All the params:', request)
 
     # Start + Assume upload role
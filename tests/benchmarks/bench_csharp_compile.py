@@ -0,0 +1,75 @@
+"""
+Compile time of a C# submission: `dotnet build` of the template project (MSBuild evaluation + build node startup)
+against calling csc.dll directly with the arguments baked into the image (CSharpCompiler.compile_with_csc).
+The direct compile should stay well under a second for a single file => exits with 1 above the `--budget`.
+
+Runs the real compilers => run it inside the C# image (it writes to /tmp):
+    python -m tests.benchmarks.bench_csharp_compile [--runs 5] [--classes 1] [--budget 1000]
+"""
+import argparse
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from coderunners.compilers import CSharpCompiler
+from coderunners.process import Process
+from coderunners.util import save_code
+from models import Status
+
+
+def generate_submission(nb_classes: int) -> dict[str, str]:
+    classes = ''.join(
+        f'static class Helper{i}\n{{\n'
+        f'    public static long Apply(long x) => Enumerable.Range(1, {i % 10 + 1}).Select(v => v * x).Sum() + {i};\n'
+        f'}}\n'
+        for i in range(nb_classes)
+    )
+    calls = ' + '.join(f'Helper{i}.Apply(x)' for i in range(nb_classes))
+    main = f'var x = long.Parse(Console.ReadLine() ?? "1");\nConsole.WriteLine({calls});\n'
+    return {'Program.cs': main + classes}
+
+
+def timed(compile_submission, paths: list[Path], runs: int) -> float:
+    """ The fastest of the runs in ms (checks that the program was built and runs) """
+    durations = []
+    for _ in range(runs):
+        shutil.rmtree(CSharpCompiler.dll_path.parent, ignore_errors=True)
+        start = time.perf_counter()
+        executor, res = compile_submission(paths)
+        durations.append((time.perf_counter() - start) * 1000)
+        if res.status != Status.OK:
+            raise RuntimeError(f'Compilation failed: {res.errors or res.outputs}')
+    run = Process(executor.command, timeout=10, memory_limit_mb=512).run('7')
+    print(f'    output: {(run.outputs or "").strip()} ({run.status})')
+    return min(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--classes', type=int, default=1, help='Classes in the submission (1 => a typical one)')
+    parser.add_argument('--budget', type=float, default=1000, help='ms for the direct csc compile')
+    args = parser.parse_args()
+
+    compiler = CSharpCompiler(language_standard='c#')
+    if not compiler.dotnet.exists():
+        print(f'{compiler.dotnet} not found => run it inside the C# image')
+        return
+
+    paths = save_code(save_dir=Path('/tmp/'), code=generate_submission(args.classes))
+    print(f'Submission with {args.classes} classes, the fastest of {args.runs} compiles')
+    msbuild = timed(compiler.compile_with_msbuild, paths, args.runs)
+    print(f'dotnet build:   {msbuild:7.1f} ms')
+    if not compiler.csc.exists():
+        print(f'{compiler.csc} not found => the image has no direct csc compile')
+        return
+    csc = timed(compiler.compile_with_csc, paths, args.runs)
+    print(f'csc (direct):   {csc:7.1f} ms  ({msbuild / csc:.1f}x faster, budget {args.budget:.0f} ms)')
+    if csc > args.budget:
+        print('Over budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Payload size and encode/decode time of the lambda payloads between the bouncer and the coderunners:
+the plain JSON of before (the result was a JSON string inside the JSON payload) against the envelopes of models.py.
+
+Pure python => runs anywhere (the codecs that are not installed are skipped):
+    python -m tests.benchmarks.bench_envelopes [--runs 20]
+"""
+import argparse
+import json
+import os
+import random
+import string
+import time
+
+from models import (ENVELOPE_CODECS, RunResult, Status, SubmissionRequest, SubmissionResult, TestCase,
+                    decode_envelope, encode_envelope, envelope_codec_available)
+
+
+def workloads() -> dict[str, SubmissionRequest | SubmissionResult]:
+    random.seed(42)
+    numbers = lambda n: ' '.join(str(random.randint(-10 ** 9, 10 ** 9)) for _ in range(n))  # noqa: E731
+    code = {'main.py': 'import sys\nprint(sum(map(int, sys.stdin.read().split())))\n' * 20}
+
+    inline_tests = SubmissionRequest(code=code, language='python', test_cases=[
+        TestCase(input=numbers(1000), target=str(i)) for i in range(200)
+    ])
+    asset_tests = SubmissionRequest(code=code, language='python', test_cases=[
+        TestCase(input='', target='', input_assets={
+            'image.bin': os.urandom(100_000),                       # Already compressed data
+            'table.csv': '\n'.join(f'{i},{numbers(5)}' for i in range(5_000)).encode(),
+        }) for _ in range(4)
+    ])
+    run = RunResult(status=Status.OK, memory=12.5, time=0.31, return_code=0)
+    outputs = SubmissionResult(overall=run, compile_result=run, test_results=[
+        RunResult(status=Status.OK, memory=12.5, time=0.31, return_code=0, outputs=numbers(2000),
+                  errors=''.join(random.choices(string.ascii_letters, k=200)))
+        for _ in range(50)
+    ])
+    return {'200 inline tests': inline_tests, 'tests with assets': asset_tests, 'result with outputs': outputs}
+
+
+def measure(runs: int, encode, decode) -> tuple[int, float, float]:
+    """ (payload bytes, encode ms, decode ms) """
+    start = time.perf_counter()
+    for _ in range(runs):
+        payload = encode()
+    encode_ms = (time.perf_counter() - start) / runs * 1000
+    start = time.perf_counter()
+    for _ in range(runs):
+        decode(payload)
+    decode_ms = (time.perf_counter() - start) / runs * 1000
+    return len(payload), encode_ms, decode_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    for name, data in workloads().items():
+        cls = type(data)
+        print(f'{name}:')
+        # Before: requests were sent as `to_json()`, results were returned as a JSON string => json.loads + from_json
+        size, encode_ms, decode_ms = measure(
+            args.runs,
+            lambda: json.dumps(data.to_json()) if cls is SubmissionResult else data.to_json(),
+            lambda payload: cls.from_json(json.loads(payload)) if cls is SubmissionResult else cls.from_json(payload),
+        )
+        print(f'  {"plain json":14} {size / 1024:9.1f} KB  encode {encode_ms:7.1f} ms  decode {decode_ms:7.1f} ms')
+
+        for codec in ENVELOPE_CODECS:
+            if not envelope_codec_available(codec):
+                print(f'  {codec:14} not installed => skipping')
+                continue
+            size, encode_ms, decode_ms = measure(
+                args.runs,
+                lambda: json.dumps(encode_envelope(data.to_dict(encode_json=True), codec)),
+                lambda payload: cls.from_dict(decode_envelope(json.loads(payload))),
+            )
+            print(f'  {codec:14} {size / 1024:9.1f} KB  encode {encode_ms:7.1f} ms  decode {decode_ms:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
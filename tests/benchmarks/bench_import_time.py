@@ -0,0 +1,89 @@
+"""
+Cold import time of the modules of the lambda handlers (`python -X importtime`) against a budget for each of them.
+The import of the handler module is a part of every cold start => a heavy import added at the top of a module
+(a new language, a new dependency) shows up here before it shows up in the latencies of the judge.
+
+Each import runs in a fresh interpreter, the fastest of the runs is kept (the others are slowed down by the machine).
+Exits with 1 if a handler exceeds its budget or cannot be imported:
+    python -m tests.benchmarks.bench_import_time [--runs 5] [--top 10] [--scale 1.0]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Module of the handler => budget in ms (about twice the time on a laptop, the images run the same imports)
+BUDGETS = {
+    'coderunners.app': 250,
+    'bouncer.app': 400,
+    'sync.trigger_app': 700,
+    'sync.sync_app': 600,
+    'testgen.bouncer_app': 600,
+    'testgen.generator_app': 450,
+}
+
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| *(\S+)$')
+
+
+def import_times(module: str) -> dict[str, tuple[float, float]]:
+    """ {module: (self ms, cumulative ms)} of everything imported by `import module` in a fresh interpreter """
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [str(ROOT), os.getenv('PYTHONPATH')]))}
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')       # The boto3 clients are created at import
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                         cwd=ROOT, env=env, capture_output=True, text=True)
+    if res.returncode != 0:
+        raise RuntimeError(f'Could not import {module}: {res.stderr.strip().splitlines()[-1]}')
+
+    times = {}
+    for line in res.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, name = match.groups()
+            times[name] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    return times
+
+
+def cold_import(module: str, runs: int) -> tuple[float, dict[str, tuple[float, float]]]:
+    """ (the fastest cumulative ms of the module, the times of that run) """
+    fastest = min((import_times(module) for _ in range(runs)), key=lambda times: times[module][1])
+    return fastest[module][1], fastest
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='Modules with the largest self time to show per handler')
+    parser.add_argument('--scale', type=float, default=1., help='Multiplies the budgets (slower machines)')
+    parser.add_argument('modules', nargs='*', default=list(BUDGETS))
+    args = parser.parse_args()
+
+    over_budget, failed = [], []
+    for module in args.modules:
+        budget = BUDGETS.get(module, min(BUDGETS.values())) * args.scale
+        try:
+            total, times = cold_import(module, runs=args.runs)
+        except RuntimeError as e:
+            print(f'{module}: {e}')
+            failed.append(module)
+            continue
+
+        print(f'{module:24} {total:7.1f} ms  (budget {budget:.0f} ms)  {"OK" if total <= budget else "OVER BUDGET"}')
+        for name, (self_ms, cumulative_ms) in sorted(times.items(), key=lambda item: -item[1][0])[:args.top]:
+            print(f'    {name:40} self {self_ms:6.1f} ms  cumulative {cumulative_ms:7.1f} ms')
+        if total > budget:
+            over_budget.append(module)
+
+    if over_budget:
+        print('Over budget:', ', '.join(over_budget))
+    if failed:
+        print('Failed to import:', ', '.join(failed))
+    if over_budget or failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
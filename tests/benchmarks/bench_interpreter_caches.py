@@ -0,0 +1,91 @@
+"""
+Per-test run time of the interpreted runtimes with the compile-time artifacts (PHP opcache file cache, Ruby ISeq
+binaries, luac chunks, R byte-code) against re-interpreting the source, and with the runtime JITs (YJIT, PHP JIT).
+
+Runs the real compilers/executors => run it inside the image of each runtime (it writes to /tmp):
+    python -m tests.benchmarks.bench_interpreter_caches [--runs 20] [--functions 2000] [--languages php ruby lua r]
+Runtimes that are not installed are skipped.
+"""
+import argparse
+import shutil
+import time
+from pathlib import Path
+
+from coderunners.compilers import Compiler
+from coderunners.process import Process
+from coderunners.util import save_code
+from models import Status, TestCase
+
+
+def php(n: int) -> tuple[str, str]:
+    functions = ''.join(f'function f{i}($x) {{ return array_sum(array_map(fn($v) => $v * $x + {i}, [1, 2, 3])); }}\n'
+                        for i in range(n))
+    return 'main.php', f'<?php\n{functions}$x = (int) trim(fgets(STDIN));\necho f{n - 1}($x), "\\n";\n'
+
+
+def ruby(n: int) -> tuple[str, str]:
+    functions = ''.join(f'def f{i}(x)\n  [1, 2, 3].map {{ |v| v * x + {i} }}.sum\nend\n' for i in range(n))
+    return 'main.rb', f'{functions}x = gets.to_i\nputs f{n - 1}(x)\n'
+
+
+def lua(n: int) -> tuple[str, str]:
+    functions = ''.join(f'function f{i}(x)\n  local s = 0\n'
+                        f'  for _, v in ipairs({{1, 2, 3}}) do s = s + v * x + {i} end\n'
+                        f'  return s\nend\n' for i in range(n))
+    return 'main.lua', f'{functions}local x = io.read("n")\nprint(f{n - 1}(x))\n'
+
+
+def r(n: int) -> tuple[str, str]:
+    functions = ''.join(f'f{i} <- function(x) sum(sapply(c(1, 2, 3), function(v) v * x + {i}))\n' for i in range(n))
+    return 'main.R', f'{functions}x <- as.integer(readLines(file("stdin"), n = 1))\ncat(f{n - 1}(x), "\\n")\n'
+
+
+# language -> (program generator, interpreter binary, command that runs the plain source as before the caches)
+RUNTIMES = {
+    'php': (php, 'php', 'php /tmp/main.php'),
+    'ruby': (ruby, '/usr/bin/ruby3.4', '/usr/bin/ruby3.4 /tmp/main.rb'),
+    'lua': (lua, 'lua', 'lua /tmp/main.lua'),
+    'r': (r, '/usr/bin/Rscript', '/usr/bin/Rscript --vanilla /tmp/main.R'),
+}
+
+
+def timed(command: str, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        res = Process(command, timeout=10, memory_limit_mb=512).run('7\n')
+        assert res.status == Status.OK, res
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--functions', type=int, default=2000)
+    parser.add_argument('--languages', nargs='+', default=list(RUNTIMES.keys()), choices=RUNTIMES.keys())
+    args = parser.parse_args()
+
+    for language in args.languages:
+        generate, interpreter, source_command = RUNTIMES[language]
+        if shutil.which(interpreter) is None:
+            print(f'{language}: {interpreter} not found => skipping')
+            continue
+
+        filename, code = generate(args.functions)
+        print(f'{language}: {filename} with {args.functions} functions, {args.runs} runs per measurement')
+        for jit in ((False, True) if language in {'php', 'ruby'} else (False,)):
+            code_paths = save_code(save_dir=Path('/tmp/'), code={filename: code})
+            executor, compile_res = Compiler.from_language(language=language, jit=jit).compile(code_paths)
+            assert compile_res.status == Status.OK, compile_res
+            if not jit:
+                print(f'  source:               {timed(source_command, args.runs):7.1f} ms/test')
+            test = TestCase(input='7\n', target='')
+            start = time.perf_counter()
+            for _ in range(args.runs):
+                res = executor.run(test, time_limit=10, memory_limit_mb=512, output_limit_mb=1)
+                assert res.status == Status.OK, res
+            elapsed = (time.perf_counter() - start) / args.runs * 1000
+            print(f'  compiled{" + JIT" if jit else "      "}:      {elapsed:7.1f} ms/test')
+
+
+if __name__ == '__main__':
+    main()
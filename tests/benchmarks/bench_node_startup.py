@@ -0,0 +1,68 @@
+"""
+Per-test startup of the JS/TS executors: a cold `node` launch vs. a launch reusing the V8 compile cache
+(NODE_COMPILE_CACHE) populated by the first test, and a type-checked vs. transpile-only TypeScript build.
+
+Usage: python -m tests.benchmarks.bench_node_startup [--runs 20] [--functions 2000] [--tsc path/to/tsc]
+Requires node >= 22.1 on the PATH (the `js`/`ts` images ship node 24).
+"""
+import argparse
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+
+def generate_submission(nb_functions: int) -> str:
+    functions = ''.join(
+        f'function f{i}(x) {{\n'
+        f'    const values = [...Array({i % 50 + 1}).keys()].map(v => v * x).filter(v => v % 3 === 0);\n'
+        f'    return values.reduce((a, b) => a + b, 0);\n'
+        f'}}\n'
+        for i in range(nb_functions)
+    )
+    calls = ' + '.join(f'f{i}(x)' for i in range(0, nb_functions, max(nb_functions // 100, 1)))
+    return functions + f'const x = Number(require("fs").readFileSync(0, "utf8")) || 1;\nconsole.log({calls});\n'
+
+
+def timed(command: str, runs: int, env: str = '', program_input: str = '7') -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        subprocess.run(f'{env} {command}', shell=True, input=program_input, capture_output=True, text=True, check=True)
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--functions', type=int, default=2000)
+    parser.add_argument('--tsc', type=Path, default=Path('/var/task/typescript_runner/node_modules/.bin/tsc'))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        main_path = root / 'index.js'
+        main_path.write_text(generate_submission(args.functions))
+        cache_dir = root / 'node_compile_cache'
+
+        print(f'Submission: {main_path.stat().st_size / 1024:.0f}KB, {args.runs} runs per measurement')
+        print(f'node (cold):                  {timed(f"node {main_path}", args.runs):7.1f} ms/test')
+        timed(f'node {main_path}', runs=1, env=f'NODE_COMPILE_CACHE={cache_dir}')      # The first test fills the cache
+        cached = timed(f'node {main_path}', args.runs, env=f'NODE_COMPILE_CACHE={cache_dir}')
+        print(f'node (NODE_COMPILE_CACHE):    {cached:7.1f} ms/test')
+
+        if not args.tsc.exists():
+            print(f'{args.tsc} not found => skipping the TypeScript build')
+            return
+        ts_path = main_path.with_suffix('.ts')
+        ts_path.write_text('declare function require(name: string): any;\n' + main_path.read_text()
+                           .replace('function f', 'function f').replace('(x) {', '(x: number): number {'))
+        for mode, flags in (('type-checked', ''), ('transpile-only', '--noCheck')):
+            out_dir = root / 'out'
+            shutil.rmtree(out_dir, ignore_errors=True)
+            build = timed(f'{args.tsc} {ts_path} --outDir {out_dir} --target ESNext --noEmitOnError {flags}', runs=3)
+            print(f'tsc ({mode}):{" " * (16 - len(mode))}{build:7.1f} ms/build')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+GC-heavy reference programs (many short-lived allocations on top of a large live set) run with and without the
+runtime profile of their language (coderunners/runtimes.py): time, peak memory and the verdict at a memory limit.
+
+Runs the real compilers/executors => run it inside the image of each runtime (it writes to /tmp):
+    python -m tests.benchmarks.bench_runtime_profiles [--runs 5] [--memory-limit 256] [--languages java go js ...]
+Runtimes that are not installed are skipped.
+"""
+import argparse
+import shutil
+import time
+from pathlib import Path
+
+from coderunners.compilers import Compiler
+from coderunners.runtimes import RuntimeProfile
+from coderunners.util import save_code
+from models import TestCase
+
+# Keeps ~1M small objects alive while allocating ~20M temporary ones
+PROGRAMS = {
+    'java': ('java', {'Main.java': '''
+import java.util.*;
+public class Main {
+    public static void main(String[] args) {
+        List<int[]> live = new ArrayList<>();
+        long sum = 0;
+        for (int i = 0; i < 20_000_000; i++) {
+            int[] item = new int[]{i, i + 1};
+            if (i % 20 == 0) live.add(item);
+            sum += item[1];
+        }
+        System.out.println(sum + " " + live.size());
+    }
+}
+'''}),
+    'go': ('go', {'main.go': '''
+package main
+
+import "fmt"
+
+type item struct{ a, b int }
+
+func main() {
+    live := []*item{}
+    sum := 0
+    for i := 0; i < 20000000; i++ {
+        it := &item{i, i + 1}
+        if i%20 == 0 {
+            live = append(live, it)
+        }
+        sum += it.b
+    }
+    fmt.Println(sum, len(live))
+}
+'''}),
+    'js': ('node', {'index.js': '''
+const live = [];
+let sum = 0;
+for (let i = 0; i < 20000000; i++) {
+    const item = {a: i, b: i + 1};
+    if (i % 20 === 0) live.push(item);
+    sum += item.b;
+}
+console.log(sum, live.length);
+'''}),
+    'c#': ('/var/dotnet/dotnet', {'main.cs': '''
+using System;
+using System.Collections.Generic;
+
+class Item { public long A, B; }
+
+public class Program {
+    public static void Main() {
+        var live = new List<Item>();
+        long sum = 0;
+        for (int i = 0; i < 20_000_000; i++) {
+            var item = new Item { A = i, B = i + 1 };
+            if (i % 20 == 0) live.Add(item);
+            sum += item.B;
+        }
+        Console.WriteLine($"{sum} {live.Count}");
+    }
+}
+'''}),
+    'haskell': ('ghc', {'Main.hs': '''
+import qualified Data.Map.Strict as M
+import Data.List (foldl')
+
+main :: IO ()
+main = do
+    let live = foldl' (\\m i -> if i `mod` 20 == 0 then M.insert i (i + 1) m else m) M.empty [0 .. 20000000 :: Int]
+    print (M.size live, M.foldl' (+) 0 live)
+'''}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--memory-limit', type=int, default=256)
+    parser.add_argument('--languages', nargs='+', default=list(PROGRAMS.keys()), choices=PROGRAMS.keys())
+    args = parser.parse_args()
+
+    for language in args.languages:
+        binary, code = PROGRAMS[language]
+        if shutil.which(binary) is None:
+            print(f'{language}: {binary} not found => skipping')
+            continue
+
+        code_paths = save_code(save_dir=Path('/tmp/'), code=code)
+        executor, compile_res = Compiler.from_language(language=language).compile(code_paths)
+        print(f'{language}: compile {compile_res.status}, memory limit {args.memory_limit}MB, {args.runs} runs')
+        for name, runtime in (('default', None), ('profile', RuntimeProfile.from_language(language))):
+            executor.runtime = runtime
+            times, memory, statuses = [], 0., set()
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                res = executor.run(TestCase(input='', target=''), time_limit=20,
+                                   memory_limit_mb=args.memory_limit, output_limit_mb=1)
+                times.append(time.perf_counter() - start)
+                memory = max(memory, res.memory)
+                statuses.add(res.status.name)
+            average_ms = sum(times) / len(times) * 1000
+            print(f'  {name:8} {average_ms:8.1f} ms  {memory:7.1f} MB  {"/".join(sorted(statuses))}')
+
+
+if __name__ == '__main__':
+    main()
@@ -119,3 +119,50 @@ class TestCpp:
         assert res.overall.status == Status.OK
         assert res.test_results is not None and len(res.test_results) == 1 and res.test_results[0].status == Status.OK
         assert res.test_results[0].outputs.strip() == '2'
+
+    def test_sanitizer_diagnostics(self):
+        """ The plain build is judged, and the sanitizer report explains the failure """
+        test_cases = [TestCase(input='', target='hello')]
+        request = SubmissionRequest(test_cases=test_cases, language='c++', sanitizer='diagnostics', code={
+            'main.cpp': dedent('''
+                #include <iostream>
+
+                int main() {
+                    int* a = new int[10];
+                    for (int i = 0; i <= 10; ++i)
+                        a[i] = i;
+                    std::cout << a[10];
+                    delete[] a;
+                    return 0;
+                }
+            ''').strip(),
+        })
+        res = CodeRunner.from_language(language=request.language).invoke(lambda_client, request=request)
+        print(res)
+        assert res.compile_result.status == Status.OK
+        assert res.overall.status != Status.OK
+        assert res.test_results is not None and len(res.test_results) == 1
+        assert 'AddressSanitizer: heap-buffer-overflow' in res.test_results[0].message
+
+    def test_sanitizer_diagnostics_once(self):
+        """ Only the first crash or wrong answer is diagnosed (the instrumented runs are slow) """
+        test_cases = [TestCase(input='', target='hello')] * 3
+        request = SubmissionRequest(test_cases=test_cases, language='c++', sanitizer='diagnostics', code={
+            'main.cpp': dedent('''
+                #include <iostream>
+
+                int main() {
+                    int* a = new int[10];
+                    for (int i = 0; i <= 10; ++i)
+                        a[i] = i;
+                    std::cout << a[10];
+                    delete[] a;
+                    return 0;
+                }
+            ''').strip(),
+        }, stop_on_first_fail=False)
+        res = CodeRunner.from_language(language=request.language).invoke(lambda_client, request=request)
+        print(res)
+        assert res.test_results is not None and len(res.test_results) == 3
+        assert 'AddressSanitizer' in res.test_results[0].message
+        assert all('AddressSanitizer' not in (r.message or '') for r in res.test_results[1:])
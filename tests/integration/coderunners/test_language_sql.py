@@ -151,3 +151,29 @@ class TestSQLSubmissions:
         assert res.overall.score == 0
         assert len(res.test_results) == 1
         assert res.test_results[0].status == Status.RUNTIME_ERROR
+
+    def test_tests_are_isolated(self):
+        """ Tables created by one test should not leak into the next one """
+        test_cases = [
+            TestCase(
+                input='CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT NOT NULL);',
+                target=dedent('''
+                    COUNT(*)
+                    1
+                ''').strip(),
+                input_files={'users': 'id,name\n1,John'}),
+            TestCase(
+                input='',
+                target=dedent('''
+                    COUNT(*)
+                    0
+                ''').strip()),
+        ]
+        request = SubmissionRequest(test_cases=test_cases, return_outputs=True, language='SQL', code={
+            'main.sql': "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='users';",
+        }, comparison_mode='token')
+        res = CodeRunner.from_language(language=request.language).invoke(lambda_client, request=request)
+        print(res)
+        assert res.overall.status == Status.OK
+        assert len(res.test_results) == 2
+        assert all(t.status == Status.OK for t in res.test_results)
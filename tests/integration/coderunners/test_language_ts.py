@@ -38,6 +38,16 @@ class TestTypescript:
         assert res.overall.status == Status.COMPILATION_ERROR
         assert res.compile_result.status == Status.COMPILATION_ERROR
 
+    def test_transpile_only(self):
+        test_cases = [TestCase(input='', target='Hello World!')]
+        request = SubmissionRequest(test_cases=test_cases, language='ts', type_check=False, code={
+            'index.ts': 'const value: number = "Hello World!";\nconsole.log(value);',
+        })
+        res = CodeRunner.from_language(language=request.language).invoke(lambda_client, request=request)
+        print(res)
+        assert res.overall.status == Status.OK
+        assert res.compile_result.status == Status.OK
+
     def test_input_output_echo(self):
         test_cases = [TestCase(input='Hello World!', target='Hello World!')]
         request = SubmissionRequest(test_cases=test_cases, language='ts', code={
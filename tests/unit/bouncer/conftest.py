@@ -0,0 +1,4 @@
+import os
+
+# bouncer.services creates its boto3 clients on import (no calls are made in unit tests)
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
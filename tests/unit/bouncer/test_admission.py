@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from bouncer import admission as admission_module
+from bouncer.admission import Admission, AdmissionTimeout, InMemorySlotStore
+
+
+def run_in_thread(target, *args) -> threading.Thread:
+    thread = threading.Thread(target=target, args=args)
+    thread.start()
+    return thread
+
+
+class TestAdmission:
+    def test_priority_order(self):
+        admission = Admission(InMemorySlotStore(), budgets={'CodeRunnerRust': 1})
+        order, release = [], threading.Event()
+
+        def judge(priority: str, hold: threading.Event | None = None):
+            with admission.slot('CodeRunnerRust', priority=priority):
+                order.append(priority)
+                if hold:
+                    hold.wait()
+
+        first = run_in_thread(judge, 'practice', release)
+        time.sleep(0.05)
+        practice = run_in_thread(judge, 'practice')
+        time.sleep(0.05)
+        contest = run_in_thread(judge, 'contest')      # Arrives later, admitted first
+        time.sleep(0.05)
+        release.set()
+        for thread in (first, practice, contest):
+            thread.join(timeout=5)
+        assert order == ['practice', 'contest', 'practice']
+
+    def test_shares_and_deadlines(self, monkeypatch):
+        monkeypatch.setitem(admission_module.DEADLINES, 'practice', 0.2)
+        admission = Admission(InMemorySlotStore(), budgets={'CodeRunnerJava': 10})
+        assert admission.limit('CodeRunnerJava', 'practice') == 6 and admission.limit('CodeRunnerJava', 'contest') == 10
+
+        slots = [admission.slot('CodeRunnerJava', priority='practice') for _ in range(6)]
+        for slot in slots:
+            slot.__enter__()
+        with pytest.raises(AdmissionTimeout):
+            with admission.slot('CodeRunnerJava', priority='practice'):
+                pass
+        with admission.slot('CodeRunnerJava', priority='contest'):     # Room left for the contests
+            pass
+        for slot in slots:
+            slot.__exit__(None, None, None)
+
+    def test_contest_latency_under_practice_load(self):
+        admission = Admission(InMemorySlotStore(), budgets={'CodeRunnerCpp': 10})
+        waits, lock = [], threading.Lock()
+
+        def judge(priority: str, duration: float):
+            start = time.perf_counter()
+            with admission.slot('CodeRunnerCpp', priority=priority):
+                if priority == 'contest':
+                    with lock:
+                        waits.append(time.perf_counter() - start)
+                time.sleep(duration)
+
+        threads = [run_in_thread(judge, 'practice', 0.3) for _ in range(60)]    # A burst of practice submissions
+        time.sleep(0.05)
+        for _ in range(20):
+            threads.append(run_in_thread(judge, 'contest', 0.05))
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join(timeout=10)
+        assert len(waits) == 20 and max(waits) < 0.25
+
+    def test_explicit_deadline(self, monkeypatch):
+        monkeypatch.setitem(admission_module.DEADLINES, 'practice', 0.05)
+        admission = Admission(InMemorySlotStore(), budgets={'CodeRunnerGo': 1})
+        release = threading.Event()
+
+        def hold():
+            with admission.slot('CodeRunnerGo'):
+                release.wait()
+
+        first = run_in_thread(hold)
+        time.sleep(0.05)
+        threading.Timer(0.2, release.set).start()
+        start = time.perf_counter()
+        with admission.slot('CodeRunnerGo', deadline=time.time() + 5):    # Waits past the deadline of practice
+            assert 0.1 < time.perf_counter() - start < 1
+        first.join(timeout=5)
+
+    def test_store_is_called_without_the_lock(self):
+        class SlowStore(InMemorySlotStore):
+            def acquire(self, name: str, lease: str, limit: int, expires_at: float) -> bool:
+                if name == 'CodeRunnerRust':
+                    time.sleep(0.5)             # A slow conditional update in DynamoDB
+                return super().acquire(name, lease, limit=limit, expires_at=expires_at)
+
+        admission = Admission(SlowStore(), budgets={})
+
+        def judge_rust():
+            with admission.slot('CodeRunnerRust'):
+                pass
+
+        rust = run_in_thread(judge_rust)
+        time.sleep(0.05)
+        start = time.perf_counter()
+        with admission.slot('CodeRunnerPython'):     # Not blocked by the request to the store of another coderunner
+            assert time.perf_counter() - start < 0.2
+        rust.join(timeout=5)
+        assert admission.slots.leases['CodeRunnerRust'] == {}
@@ -0,0 +1,147 @@
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+from bouncer import admission as admission_module
+from bouncer import services
+from bouncer.admission import Admission, InMemorySlotStore
+from bouncer.callbacks import SQLiteOutbox
+from bouncer.jobs import SQLiteResultStore
+from models import BatchRequest, RunResult, Status, SubmissionRequest, SubmissionResult, TestCase
+
+
+class FakeCodeRunners:
+    """ Each invocation takes `duration` seconds, the first `throttled` ones are rejected by Lambda """
+
+    def __init__(self, duration: float, throttled: int = 0):
+        self.duration = duration
+        self.throttled = throttled
+        self.lock = threading.Lock()
+        self.running, self.max_running = {}, {}
+
+    def invoke(self, coderunner, request: SubmissionRequest) -> SubmissionResult:
+        with self.lock:
+            if self.throttled > 0:
+                self.throttled -= 1
+                raise ClientError({'Error': {'Code': 'TooManyRequestsException', 'Message': 'Rate exceeded'}}, 'Invoke')
+            self.running[coderunner.name] = self.running.get(coderunner.name, 0) + 1
+            self.max_running[coderunner.name] = max(self.max_running.get(coderunner.name, 0),
+                                                    self.running[coderunner.name])
+        time.sleep(self.duration)
+        with self.lock:
+            self.running[coderunner.name] -= 1
+        run = RunResult(status=Status.OK, memory=1, time=self.duration, return_code=0, message=request.id)
+        return SubmissionResult(overall=run, compile_result=run)
+
+
+class FakeLambda:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.events = []
+
+    def invoke(self, FunctionName, InvocationType, Payload):
+        if self.fail:
+            raise ClientError({'Error': {'Code': 'RequestEntityTooLargeException', 'Message': 'Too large'}}, 'Invoke')
+        assert InvocationType == 'Event' and len(Payload) <= services.MAX_EVENT_BYTES + 1000
+        self.events.append(BatchRequest.from_json(Payload))
+
+
+class TestBatch:
+    def test_concurrent_and_ordered(self, monkeypatch):
+        fake = FakeCodeRunners(duration=0.2)
+        monkeypatch.setattr(services.CodeRunner, 'invoke', lambda runner, _, request: fake.invoke(runner, request))
+        monkeypatch.setattr(services, 'MAX_PER_CODERUNNER', 20)
+        requests = [SubmissionRequest(id=str(i), code={'main.py': ''}, language='python' if i % 2 else 'c++17')
+                    for i in range(100)]
+
+        start = time.perf_counter()
+        results = services.check_batch(requests, outbox=SQLiteOutbox())
+        assert time.perf_counter() - start < 0.2 * 100 / 4       # 100 x 0.2s sequentially
+        assert [res.overall.message for res in results] == [str(i) for i in range(100)]
+        assert fake.max_running == {'CodeRunnerPython': 20, 'CodeRunnerCpp': 20}
+
+    def test_throttled_and_unsupported(self, monkeypatch):
+        fake = FakeCodeRunners(duration=0, throttled=2)
+        monkeypatch.setattr(services.CodeRunner, 'invoke', lambda runner, _, request: fake.invoke(runner, request))
+        monkeypatch.setattr(services.time, 'sleep', lambda _: None)
+        requests = [SubmissionRequest(id='ok', code={'main.py': ''}, language='python'),
+                    SubmissionRequest(id='unknown', code={'main.x': ''}, language='brainfuck')]
+
+        ok, unknown = services.check_batch(requests, outbox=SQLiteOutbox())
+        assert ok.overall.status == Status.OK and fake.throttled == 0
+        assert unknown.overall.status == Status.SKIPPED
+
+    def test_queues_until_the_deadline_of_the_batch(self, monkeypatch):
+        fake = FakeCodeRunners(duration=0.05)
+        monkeypatch.setattr(services.CodeRunner, 'invoke', lambda runner, _, request: fake.invoke(runner, request))
+        monkeypatch.setattr(services, 'admission', Admission(InMemorySlotStore(), budgets={'CodeRunnerPython': 5}))
+        monkeypatch.setitem(admission_module.DEADLINES, 'practice', 0.1)
+        requests = [SubmissionRequest(id=str(i), code={'main.py': ''}, language='python') for i in range(30)]
+
+        results = services.check_batch(requests, outbox=SQLiteOutbox(), deadline=time.time() + 10)
+        assert all(res.overall.status == Status.OK for res in results)     # 30 x 0.05s on 3 slots > 0.1s
+        assert fake.max_running == {'CodeRunnerPython': 3}
+
+    def test_shards_are_capped_by_the_share_of_the_class(self, monkeypatch):
+        fake = FakeCodeRunners(duration=0.05)
+        monkeypatch.setattr(services.CodeRunner, 'invoke', lambda runner, _, request: fake.invoke(runner, request))
+        monkeypatch.setattr(services, 'admission', Admission(InMemorySlotStore(), budgets={'CodeRunnerPython': 10}))
+        shards = []
+        monkeypatch.setattr(services, 'merge_shards', lambda request, results: shards.extend(results) or results[0])
+        request = SubmissionRequest(id='sharded', code={'main.py': ''}, language='python', shard_count=64)
+
+        services.check_sharded(services.CodeRunner.from_language('python'), request=request)
+        assert len(shards) == 6 and fake.max_running == {'CodeRunnerPython': 6}
+        assert request.shard_count == 64
+
+    def test_submit_batch(self, monkeypatch):
+        aws_lambda = FakeLambda()
+        monkeypatch.setattr(services, 'lambda_client', lambda: aws_lambda)
+        monkeypatch.setattr(services, 'MAX_EVENT_BYTES', 1000)
+        store = SQLiteResultStore()
+        requests = [SubmissionRequest(id=str(i), code={'main.py': 'print(1)' * 50}, language='python')
+                    for i in range(10)]
+
+        jobs = services.submit_batch(requests, store=store)
+        assert len(jobs) == 10 and all(store.get(job.id).status == 'pending' for job in jobs)
+        assert len(aws_lambda.events) > 1      # Split into the parts that fit in asynchronous invocations
+        submissions = [r for event in aws_lambda.events for r in event.submissions]
+        assert [(r.id, r.job_id) for r in submissions] == [(str(i), job.id) for i, job in enumerate(jobs)]
+
+        # The worker stores the result of each job
+        fake = FakeCodeRunners(duration=0)
+        monkeypatch.setattr(services.CodeRunner, 'invoke', lambda runner, _, request: fake.invoke(runner, request))
+        services.check_batch(submissions, outbox=SQLiteOutbox(), store=store)
+        assert [store.get(job.id).result.overall.message for job in jobs] == [str(i) for i in range(10)]
+
+    def test_submit_batch_dispatch_failure(self, monkeypatch):
+        monkeypatch.setattr(services, 'lambda_client', lambda: FakeLambda(fail=True))
+        store = SQLiteResultStore()
+        job, = services.submit_batch([SubmissionRequest(code={'main.py': ''}, language='python')], store=store)
+        assert store.get(job.id).status == 'done' and store.get(job.id).result.overall.status == Status.SKIPPED
+
+    def test_submit_job_is_judged_by_the_worker(self, monkeypatch):
+        aws_lambda = FakeLambda()
+        monkeypatch.setattr(services, 'lambda_client', lambda: aws_lambda)
+        store = SQLiteResultStore()
+        job = services.submit_job(SubmissionRequest(id='async', code={'main.py': ''}, language='python'), store=store)
+        assert store.get(job.id).status == 'pending'
+        [event] = aws_lambda.events     # Admitted by the worker within the budgets (not a direct coderunner event)
+        assert [(r.id, r.job_id) for r in event.submissions] == [('async', job.id)]
+
+    def test_too_large_for_an_asynchronous_invocation(self, monkeypatch):
+        aws_lambda = FakeLambda()
+        monkeypatch.setattr(services, 'lambda_client', lambda: aws_lambda)
+        monkeypatch.setattr(services, 'MAX_EVENT_BYTES', 1000)
+        store = SQLiteResultStore()
+        small = SubmissionRequest(code={'main.py': 'print(1)'}, language='python')
+        large = SubmissionRequest(code={'main.py': 'print(1)'}, language='python',
+                                  test_cases=[TestCase(input='1' * 2000, target='1')])
+
+        with pytest.raises(ValueError, match='POST /check'):
+            services.submit_batch([small, large], store=store)
+        with pytest.raises(ValueError, match='POST /check'):
+            services.submit_job(large, store=store)
+        assert aws_lambda.events == []
@@ -0,0 +1,60 @@
+from bouncer import services
+from bouncer.cache import SQLiteResultCache
+from bouncer.callbacks import SQLiteOutbox
+from models import RunResult, Status, SubmissionRequest, SubmissionResult
+
+
+def make_request(**kwargs) -> SubmissionRequest:
+    return SubmissionRequest(code={'main.py': 'print(input())'}, language='python', problem='a-plus-b', **kwargs)
+
+
+class TestResultCache:
+    def test_key(self):
+        cache = SQLiteResultCache(problem_digests={'a-plus-b': 'v1'})
+        key = cache.key(make_request())
+        assert key == cache.key(make_request(id='other', callback_url='https://example.com', bypass_cache=True))
+        assert key != cache.key(make_request(time_limit=2))
+        assert key != cache.key(make_request(comparison_mode='token'))
+        assert key != SQLiteResultCache(problem_digests={'a-plus-b': 'v2'}).key(make_request())
+        assert SQLiteResultCache().key(make_request()) is None      # Unknown version of the tests
+
+    def test_new_judge_version_misses_the_cache(self, monkeypatch):
+        cache = SQLiteResultCache(problem_digests={'a-plus-b': 'v1'})
+        run = RunResult(status=Status.OK, memory=1, time=0.1, return_code=0)
+        cache.put(cache.key(make_request()), SubmissionResult(overall=run, compile_result=run))
+        assert cache.get(cache.key(make_request())) is not None
+
+        monkeypatch.setattr(SQLiteResultCache, 'JUDGE_VERSION', 'redeployed')     # e.g., a compiler upgrade
+        assert cache.get(cache.key(make_request())) is None
+
+    def test_identical_submissions_are_judged_once(self, monkeypatch):
+        calls = []
+
+        def invoke(coderunner, request, deadline=None):
+            calls.append(request)
+            status = Status.WA if request.time_limit == 1 else Status.OK
+            run = RunResult(status=status, memory=1, time=0.1, return_code=0)
+            return SubmissionResult(overall=run, compile_result=run)
+        monkeypatch.setattr(services, 'invoke', invoke)
+        cache, outbox = SQLiteResultCache(problem_digests={'a-plus-b': 'v1'}), SQLiteOutbox()
+
+        first = services.check_equality(make_request(), outbox=outbox, cache=cache)
+        assert services.check_equality(make_request(), outbox=outbox, cache=cache) == first
+        assert len(calls) == 1
+        services.check_equality(make_request(bypass_cache=True), outbox=outbox, cache=cache)
+        services.check_equality(make_request(time_limit=1), outbox=outbox, cache=cache)
+        services.check_equality(make_request(time_limit=1), outbox=outbox, cache=cache)   # WA is cached as well
+        assert len(calls) == 3
+
+    def test_failures_are_not_cached(self, monkeypatch):
+        calls = []
+
+        def invoke(coderunner, request, deadline=None):
+            calls.append(request)
+            raise RuntimeError('The coderunner failed')
+        monkeypatch.setattr(services, 'invoke', invoke)
+        cache, outbox = SQLiteResultCache(problem_digests={'a-plus-b': 'v1'}), SQLiteOutbox()
+
+        for _ in range(2):
+            assert services.check_equality(make_request(), outbox=outbox, cache=cache).overall.status == Status.SKIPPED
+        assert len(calls) == 2
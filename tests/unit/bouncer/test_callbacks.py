@@ -0,0 +1,119 @@
+import os
+import time
+
+import requests
+
+from bouncer import callbacks
+from bouncer.callbacks import DynamoDBOutbox, SQLiteOutbox, dispatch, drain
+from bouncer.jobs import ResultStore
+from models import RunResult, Status, SubmissionResult
+
+
+class FakeSession:
+    def __init__(self, status_codes: list[int | None]):
+        self.status_codes = status_codes
+        self.calls, self.headers = [], []
+
+    def post(self, url, json, headers, timeout):
+        self.calls.append((url, timeout))
+        self.headers.append(headers)
+        status_code = self.status_codes.pop(0)
+        if status_code is None:
+            raise requests.ConnectTimeout('timed out')
+        response = requests.Response()
+        response.status_code = status_code
+        return response
+
+
+class FakeTable:
+    """ Scans return pages of a single item (DynamoDB filters each page of at most 1MB) """
+    def __init__(self, items: list[dict]):
+        self.items = items
+
+    def scan(self, FilterExpression, ExpressionAttributeValues, ExclusiveStartKey=None):
+        assert FilterExpression == 'next_attempt_at <= :now'
+        start = ExclusiveStartKey['id'] if ExclusiveStartKey else 0
+        item = self.items[start]
+        now = ExpressionAttributeValues[':now']
+        page = {'Items': [item] if item['next_attempt_at'] <= now else []}
+        if start + 1 < len(self.items):
+            page['LastEvaluatedKey'] = {'id': start + 1}
+        return page
+
+
+def make_result() -> SubmissionResult:
+    run = RunResult(status=Status.OK, memory=1, time=0.1, return_code=0)
+    return SubmissionResult(overall=run, compile_result=run, test_results=[run])
+
+
+class TestCallbacks:
+    def test_delivered_right_away(self, monkeypatch):
+        session = FakeSession([200])
+        monkeypatch.setattr(callbacks, 'session', session)
+        outbox = SQLiteOutbox()
+
+        assert dispatch('https://example.com/cb', make_result(), outbox=outbox)
+        assert session.calls == [('https://example.com/cb', callbacks.TIMEOUT)]
+        assert outbox.due(now=time.time() + 10 ** 6, limit=10) == []
+
+    def test_failed_callback_is_retried_from_the_outbox(self, monkeypatch):
+        session = FakeSession([None, 503, 200])
+        monkeypatch.setattr(callbacks, 'session', session)
+        outbox = SQLiteOutbox()
+
+        assert not dispatch('https://example.com/cb', make_result(), outbox=outbox)
+        assert len(session.calls) == 1                      # No retries within the judge
+        assert drain(outbox) == 0                           # Not due yet
+
+        [delivery] = outbox.due(now=time.time() + 10 ** 6, limit=10)
+        assert delivery.attempts == 1 and delivery.result == make_result()
+        monkeypatch.setattr(time, 'time', lambda: delivery.next_attempt_at + 1)
+        assert drain(outbox) == 0                           # 503 => rescheduled with a longer delay
+        [delivery] = outbox.due(now=delivery.next_attempt_at + 10 ** 6, limit=10)
+        assert delivery.attempts == 2
+
+        monkeypatch.setattr(time, 'time', lambda: delivery.next_attempt_at + 1)
+        assert drain(outbox) == 1
+        assert outbox.due(now=delivery.next_attempt_at + 10 ** 6, limit=10) == []
+
+    def test_gives_up_after_max_attempts(self, monkeypatch):
+        monkeypatch.setattr(callbacks, 'session', FakeSession([None] * callbacks.MAX_ATTEMPTS))
+        outbox = SQLiteOutbox()
+        dispatch('https://example.com/cb', make_result(), outbox=outbox)
+        start = time.time()
+        for attempt in range(1, callbacks.MAX_ATTEMPTS):
+            monkeypatch.setattr(time, 'time', lambda: start + 2 * attempt * callbacks.MAX_DELAY)
+            drain(outbox)
+        assert outbox.due(now=start + 10 ** 6, limit=10) == []
+
+    def test_dynamodb_due_goes_through_the_pages(self):
+        class Binary:
+            value = ResultStore.encode_result(make_result())
+        now = int(time.time())
+        outbox = DynamoDBOutbox.__new__(DynamoDBOutbox)
+        outbox.table = FakeTable([
+            {'id': str(i), 'url': 'https://example.com/cb', 'result': Binary, 'attempts': 1,
+             'next_attempt_at': now + 60 if i < 5 else now - 60} for i in range(10)
+        ])
+        assert [d.id for d in outbox.due(now=now, limit=3)] == ['5', '6', '7']
+        assert [d.id for d in outbox.due(now=now, limit=100)] == ['5', '6', '7', '8', '9']
+
+    def test_large_results_are_retried_whole_or_marked_as_truncated(self, monkeypatch):
+        session = FakeSession([None, None, 200, 200])
+        monkeypatch.setattr(callbacks, 'session', session)
+        outbox = SQLiteOutbox()
+        result = make_result()
+        result.test_results[0].outputs = 'x' * 200_000      # Compressed far below the limit
+        dispatch('https://example.com/cb', result, outbox=outbox)
+        [delivery] = outbox.due(now=time.time() + 10 ** 6, limit=10)
+        assert delivery.result == result and not delivery.truncated
+
+        monkeypatch.setattr(ResultStore, 'MAX_RESULT_BYTES', 100)
+        result.test_results[0].outputs = os.urandom(1000).hex()
+        dispatch('https://example.com/cb', result, outbox=outbox)
+        [_, delivery] = sorted(outbox.due(now=time.time() + 10 ** 6, limit=10), key=lambda d: d.truncated)
+        assert delivery.truncated and delivery.result.test_results is None
+        now = time.time() + 10 ** 6
+        monkeypatch.setattr(time, 'time', lambda: now)
+        assert drain(outbox) == 2
+        assert sorted(session.headers[2:], key=bool) == [None, {callbacks.TRUNCATED_HEADER: 'true'}]
@@ -0,0 +1,27 @@
+import json
+
+import pytest
+
+from bouncer import coderunners
+from bouncer.coderunners import CodeRunner
+from models import SubmissionRequest, decode_envelope, preferred_envelope_codec
+
+
+class TestEnvelopeChoice:
+    def test_plain_json_by_default(self, monkeypatch):
+        monkeypatch.setattr(coderunners, 'ENVELOPE_MIN_BYTES', 1000)
+        small = SubmissionRequest(code={'main.py': 'print(1)'}, language='python')
+        assert CodeRunner.encode_request(small) == small.to_json()
+
+        if preferred_envelope_codec() == 'json':
+            pytest.skip('No envelope codec is installed')
+        large = SubmissionRequest(code={'main.py': 'print(1)\n' * 200}, language='python')
+        payload = json.loads(CodeRunner.encode_request(large))
+        assert payload['envelope'] == preferred_envelope_codec()
+        assert SubmissionRequest.from_dict(decode_envelope(payload)) == large
+
+    def test_forced_codec(self, monkeypatch):
+        monkeypatch.setattr(coderunners, 'ENVELOPE_CODEC', 'json')
+        monkeypatch.setattr(coderunners, 'ENVELOPE_MIN_BYTES', 0)
+        request = SubmissionRequest(code={'main.py': 'print(1)\n' * 200}, language='python')
+        assert CodeRunner.encode_request(request) == request.to_json()
@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from boto3.dynamodb.types import Binary
+
+from bouncer.admission import DynamoDBSlotStore
+from bouncer.dynamodb import Table
+
+
+class FakeClient:
+    """ Keeps the items in the wire format of the low-level client """
+    class exceptions:
+        class ConditionalCheckFailedException(Exception):
+            pass
+
+    def __init__(self):
+        self.items, self.calls = {}, []
+        self.lock = threading.Lock()
+
+    def put_item(self, TableName, Item, ConditionExpression=None):
+        with self.lock:
+            self.calls.append(('put_item', TableName))
+            if ConditionExpression and Item['id']['S'] in self.items:
+                raise self.exceptions.ConditionalCheckFailedException()
+            self.items[Item['id']['S']] = Item
+        return {}
+
+    def get_item(self, TableName, Key):
+        item = self.items.get(Key['id']['S'])
+        return {'Item': item} if item else {}
+
+
+class TestTable:
+    def test_items_are_converted(self):
+        client = FakeClient()
+        table = Table(client, 'judge-jobs')
+        table.put_item(Item={'id': 'job', 'created_at': 17, 'result': b'\x1f\x8b', 'leases': {'a': 1}})
+        assert client.items['job']['created_at'] == {'N': '17'} and client.items['job']['result'] == {'B': b'\x1f\x8b'}
+
+        item = table.get_item(Key={'id': 'job'})['Item']
+        assert item == {'id': 'job', 'created_at': Decimal(17), 'result': Binary(b'\x1f\x8b'), 'leases': {'a': 1}}
+        assert item['result'].value == b'\x1f\x8b'
+        assert 'Item' not in table.get_item(Key={'id': 'missing'})
+
+    def test_slot_store_creates_each_item_once(self):
+        client = FakeClient()
+        slots = DynamoDBSlotStore(client)
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(slots.create, ['CodeRunnerRust'] * 64))
+        slots.create('CodeRunnerRust')
+        assert slots.created == {'CodeRunnerRust'} and len(client.calls) <= 16
@@ -0,0 +1,8 @@
+from tests.benchmarks.bench_import_time import import_times
+
+
+def test_lazy_imports():
+    """ Only the callbacks use it => imported with the first callback """
+    times = import_times('bouncer.app')
+    assert 'bouncer.app' in times
+    assert 'requests' not in times, 'requests is imported at the cold start of bouncer.app'
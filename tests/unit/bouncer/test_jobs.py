@@ -0,0 +1,47 @@
+import os
+import time
+
+from bouncer.jobs import Job, SQLiteResultStore
+from models import RunResult, Status, SubmissionResult
+
+
+def make_result(outputs: str) -> SubmissionResult:
+    run = RunResult(status=Status.OK, memory=1, time=0.1, return_code=0, outputs=outputs)
+    return SubmissionResult(overall=run, compile_result=run, test_results=[run, run])
+
+
+class TestResultStore:
+    def test_sqlite(self):
+        store = SQLiteResultStore()
+        assert store.get('missing') is None
+
+        job = Job(id='job', status='pending', created_at=int(time.time()))
+        store.put(job)
+        assert store.get('job') == job
+
+        job.status, job.result = 'done', make_result(outputs='42')
+        store.put(job)
+        assert store.get('job') == job
+
+    def test_large_results_drop_outputs(self):
+        store = SQLiteResultStore()
+        result = make_result(outputs=os.urandom(10 ** 6).hex())     # Incompressible
+        store.put(Job(id='job', status='done', created_at=int(time.time()), result=result))
+        job = store.get('job')
+        assert job.result.overall.status == Status.OK
+        assert all(r.outputs is None and r.status == Status.OK for r in job.result.test_results)
+
+    def test_large_results_are_trimmed_on_a_copy(self):
+        store = SQLiteResultStore()
+        result = make_result(outputs=os.urandom(10 ** 6).hex())
+        store.put(Job(id='job', status='done', created_at=int(time.time()), result=result))
+        assert result.test_results[0].outputs is not None       # Still returned to the client / the callback
+
+        # The verdicts alone are still too large => only the overall verdict is kept
+        compile_error = RunResult(status=Status.COMPILATION_ERROR, memory=0, time=0, return_code=1,
+                                  errors=os.urandom(10 ** 6).hex())
+        store.put(Job(id='big', status='done', created_at=int(time.time()),
+                      result=SubmissionResult(overall=compile_error, compile_result=compile_error)))
+        job = store.get('big')
+        assert job.result.overall.status == Status.COMPILATION_ERROR and job.result.overall.errors is None
+        assert job.result.test_results is None and 'Omitted' in job.result.compile_result.message
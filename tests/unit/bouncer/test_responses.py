@@ -0,0 +1,62 @@
+import base64
+import gzip
+import json
+
+import pytest
+
+from bouncer.responses import compressors, negotiate_encoding, project, request_body, respond, shape_result
+from models import RunResult, Status, SubmissionResult
+
+
+def make_result() -> dict:
+    ok = RunResult(status=Status.OK, memory=1, time=0.1, return_code=0, outputs='3', errors='')
+    wa = RunResult(status=Status.WA, memory=2, time=0.2, return_code=0, outputs='4', errors='oops')
+    return SubmissionResult(overall=wa, compile_result=ok, test_results=[ok, wa]).to_dict(encode_json=True)
+
+
+class TestResponses:
+    def test_negotiate_encoding(self):
+        assert negotiate_encoding(None) is None
+        assert negotiate_encoding('identity') is None
+        assert negotiate_encoding('gzip, deflate') == 'gzip'
+        assert negotiate_encoding('gzip;q=1.0, br;q=0') == 'gzip'
+        assert negotiate_encoding('*;q=0') is None
+        if 'br' in compressors():
+            assert negotiate_encoding('gzip, deflate, br') == 'br'
+            assert negotiate_encoding('br;q=0.5, gzip;q=0.8') == 'gzip'
+
+    def test_projection(self):
+        fields = 'overall.status,overall.score,testResults.status,testResults.time'
+        result = shape_result(make_result(), {'fields': fields})
+        assert result == {
+            'overall': {'status': 'Wrong answer', 'score': 0},
+            'testResults': [{'status': 'Solved', 'time': 0.1}, {'status': 'Wrong answer', 'time': 0.2}],
+        }
+        assert project({'a': 1}, ['missing.field']) == {}
+
+    def test_outputs_of_failed_tests(self):
+        result = shape_result(make_result(), {'outputs': 'failed'})
+        assert 'outputs' not in result['testResults'][0]
+        assert result['testResults'][1]['outputs'] == '4' and result['testResults'][1]['errors'] == 'oops'
+
+    @pytest.mark.parametrize('encoding', ['gzip', 'br'])
+    def test_compressed_response(self, encoding):
+        if encoding not in compressors():
+            pytest.skip(f'{encoding} is not installed')
+        body = {'results': [make_result()] * 20}
+        response = respond({'headers': {'Accept-Encoding': encoding}}, 200, body)
+        assert response['isBase64Encoded'] and response['headers']['Content-Encoding'] == encoding
+
+        data = base64.b64decode(response['body'])
+        if encoding == 'br':
+            import brotli
+            data = brotli.decompress(data)
+        else:
+            data = gzip.decompress(data)
+        assert json.loads(data) == body
+
+    def test_small_or_plain_response(self):
+        response = respond({'headers': {'accept-encoding': 'gzip'}}, 404, {'error': 'missing'})
+        assert 'isBase64Encoded' not in response and json.loads(response['body']) == {'error': 'missing'}
+        event = {'body': base64.b64encode(b'{"a": 1}').decode(), 'isBase64Encoded': True}
+        assert request_body(event) == '{"a": 1}'
@@ -0,0 +1,37 @@
+from bouncer.services import merge_shards
+from models import RunResult, Status, SubmissionRequest, SubmissionResult, TestGroup
+
+
+def run(status: Status, score: float = 100) -> RunResult:
+    return RunResult(status=status, memory=1, time=0.5, return_code=0 if status == Status.OK else 1, score=score)
+
+
+def shard(*test_results: RunResult) -> SubmissionResult:
+    compiled = RunResult(status=Status.OK, memory=1, time=1, return_code=0)
+    return SubmissionResult(overall=compiled, compile_result=compiled, test_results=list(test_results))
+
+
+class TestMergeShards:
+    def test_stop_on_first_fail(self):
+        request = SubmissionRequest(code={'main.py': ''}, language='python', shard_count=2)
+        res = merge_shards(request, [shard(run(Status.OK), run(Status.WA, 0)), shard(run(Status.OK), run(Status.OK))])
+        assert [r.status for r in res.test_results] == [Status.OK, Status.WA, Status.SKIPPED, Status.SKIPPED]
+        assert res.overall.status == Status.WA and res.overall.score == 25
+        assert [r.score for r in res.test_results] == [25, 0, 0, 0]
+
+    def test_groups_are_scored_as_a_single_run(self):
+        request = SubmissionRequest(code={'main.py': ''}, language='python', shard_count=2, test_groups=[
+            TestGroup(points=40, points_per_test=0, count=2), TestGroup(points=60, points_per_test=0, count=2),
+        ])
+        res = merge_shards(request, [
+            shard(run(Status.WA, 0), run(Status.SKIPPED, 0)),   # The first group fully fails
+            shard(run(Status.OK), run(Status.OK)),
+        ])
+        assert [r.status for r in res.test_results] == [Status.WA, Status.SKIPPED, Status.OK, Status.OK]
+        assert res.overall.status == Status.WA and res.overall.score == 60
+
+    def test_compilation_error(self):
+        request = SubmissionRequest(code={'main.py': ''}, language='python', shard_count=2)
+        failed = RunResult(status=Status.COMPILATION_ERROR, memory=0, time=0, return_code=1)
+        res = merge_shards(request, [SubmissionResult(overall=failed, compile_result=failed)] * 2)
+        assert res.overall.status == Status.COMPILATION_ERROR and res.test_results is None
@@ -0,0 +1,21 @@
+import pytest
+
+from coderunners.compilers import Compiler, CppCompiler, predict_build_profile
+from models import TestCase
+
+
+class TestBuildProfile:
+    def test_predict_build_profile(self):
+        few_small = [TestCase(input='1 2', target='3')] * 3
+        assert predict_build_profile(few_small, time_limit=1) == 'fast'
+        assert predict_build_profile(few_small, time_limit=10) == 'optimized'
+        assert predict_build_profile([TestCase(input='1' * 2 * 1024 * 1024, target='')], time_limit=1) == 'optimized'
+        assert predict_build_profile([TestCase(input='', target='')] * 200, time_limit=1) == 'optimized'
+
+    def test_from_language(self):
+        compiler = Compiler.from_language('c++17', build_profile='fast')
+        assert isinstance(compiler, CppCompiler) and compiler.build_profile == 'fast'
+        assert Compiler.has_build_profiles('rust')
+        assert not Compiler.has_build_profiles('python')
+        with pytest.raises(ValueError):
+            Compiler.from_language('c++17', build_profile='auto')
@@ -0,0 +1,78 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from coderunners import daemons
+from coderunners.daemons import CompileDaemon
+from models import Status
+
+# Mimics coderunners/jvm/CompileServer.java: echoes the arguments, `fail` exits with 1, `sleep` never responds
+FAKE_SERVER = '''
+import sys, time
+for line in sys.stdin.buffer:
+    tool, *args = line.rstrip(b'\\n').split(b'\\0')
+    if tool == b'sleep':
+        time.sleep(60)
+    output = b' '.join(args)
+    sys.stdout.buffer.write(b'%d %d\\n' % (tool == b'fail', len(output)) + output)
+    sys.stdout.buffer.flush()
+'''
+
+
+def fake_daemon() -> CompileDaemon:
+    daemon = CompileDaemon(classpath=[Path('/nonexistent')])
+    daemon.p = subprocess.Popen([sys.executable, '-c', FAKE_SERVER], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    return daemon
+
+
+class TestCompileDaemon:
+    def test_requests_reuse_the_process(self):
+        daemon = fake_daemon()
+        pid = daemon.p.pid
+        res = daemon.run('javac', '-d', '/tmp/classes', 'Main.java', timeout=5)
+        assert res.status == Status.OK and res.outputs == '-d /tmp/classes Main.java' and res.errors is None
+
+        res = daemon.run('fail', 'błąd', 'kompilacji', timeout=5)
+        assert res.status == Status.RUNTIME_ERROR and res.return_code == 1 and res.errors == 'błąd kompilacji'
+
+        res = daemon.run('javac', 'Main\n.java', timeout=5)
+        assert res.status == Status.RUNTIME_ERROR and res.return_code == -1
+        assert daemon.p.pid == pid
+        assert daemon.available is False
+        daemon.stop()
+
+    def test_timeout_stops_the_daemon(self):
+        daemon = fake_daemon()
+        res = daemon.run('sleep', timeout=0.5)
+        assert res.status == Status.TLE
+        assert daemon.p is None
+
+    def test_stopped_while_the_submission_runs(self, monkeypatch):
+        daemon = fake_daemon()
+        started = []
+        monkeypatch.setattr(daemon, 'start', lambda: started.append(daemon))
+        monkeypatch.setattr(daemons, 'DAEMONS', [daemon, CompileDaemon(classpath=[Path('/nonexistent')])])
+        process = daemon.p
+
+        daemons.stop_daemons()
+        assert daemon.p is None and process.poll() is not None     # Killed before any submitted code runs
+        daemons.restart_daemons()
+        daemons.restart_daemons()
+        assert started == [daemon]      # Only the daemons that were running, once
+
+    def test_memory_limits(self, monkeypatch):
+        commands, popen_true = [], subprocess.Popen
+
+        def popen(command, **kwargs):
+            commands.append((command, kwargs))
+            return popen_true(['true'])
+
+        monkeypatch.setattr(daemons.subprocess, 'Popen', popen)
+        daemon = CompileDaemon(classpath=[Path('/nonexistent')], memory_limit_mb=1024)
+        daemon.start()
+        monkeypatch.undo()
+        daemon.stop()
+
+        (command, kwargs), = commands
+        assert '-Xmx768m' in command and '-XX:+ExitOnOutOfMemoryError' in command
+        assert kwargs['preexec_fn'] is not None
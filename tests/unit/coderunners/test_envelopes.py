@@ -0,0 +1,31 @@
+import json
+import os
+
+import pytest
+
+from models import (ENVELOPE_CODECS, RunResult, Status, SubmissionRequest, SubmissionResult, TestCase,
+                    decode_envelope, encode_envelope, envelope_codec_available)
+
+
+@pytest.mark.parametrize('codec', ENVELOPE_CODECS)
+class TestEnvelopes:
+    @pytest.fixture(autouse=True)
+    def skip_unavailable(self, codec):
+        if not envelope_codec_available(codec):
+            pytest.skip(f'{codec} is not installed')
+
+    def test_request(self, codec):
+        test = TestCase(input='1 2', target='3', input_assets={'a.bin': os.urandom(64)})
+        request = SubmissionRequest(code={'main.py': 'print(sum(map(int, input().split())))'}, language='python',
+                                    test_cases=[test])
+        payload = encode_envelope(request.to_dict(encode_json=True), codec)
+        assert payload['envelope'] == codec
+        assert json.loads(json.dumps(payload)) == payload     # Lambda payloads have to be JSON
+        assert SubmissionRequest.from_dict(decode_envelope(payload)) == request
+
+    def test_result(self, codec):
+        run = RunResult(status=Status.WA, memory=1.5, time=0.1, return_code=0, outputs='4' * 10_000)
+        result = SubmissionResult(overall=run, compile_result=run, test_results=[run] * 10)
+        payload = encode_envelope(result.to_dict(encode_json=True), codec)
+        assert SubmissionResult.from_dict(decode_envelope(payload)) == result
+        assert len(payload['data']) < len(result.to_json()) / 10
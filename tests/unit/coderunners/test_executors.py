@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from coderunners import executors
+from coderunners.executors import JvmExecutor
+from coderunners.runtimes import JvmRuntime
+from models import RunResult, Status
+
+
+class TestJvmExecutor:
+    def test_training_run_uses_the_limits_of_a_test(self, monkeypatch, tmp_path: Path):
+        runs = []
+
+        class FakeProcess:
+            def __init__(self, command: str, timeout: float, memory_limit_mb: int, cwd: Path):
+                runs.append((command, timeout, memory_limit_mb))
+
+            def run(self) -> RunResult:
+                return RunResult(status=Status.OK, memory=0, time=0, return_code=0)
+
+        monkeypatch.setattr(executors, 'Process', FakeProcess)
+        executor = JvmExecutor(classpath=[tmp_path / 'Main.jar'], main_class='Main', runtime=JvmRuntime(),
+                               training_archive=tmp_path / 'Main.jsa')
+        executor.create_app_archive(time_limit=2, memory_limit_mb=256)
+
+        (command, timeout, memory_limit_mb), = runs
+        assert (timeout, memory_limit_mb) == (2, 256)
+        assert command.startswith('java -Xmx192m ') and f'-XX:ArchiveClassesAtExit={tmp_path / "Main.jsa"}' in command
+        assert executor.app_archive is None         # The fake run did not dump the archive
@@ -0,0 +1,8 @@
+from tests.benchmarks.bench_import_time import import_times
+
+
+def test_lazy_imports():
+    """ Only the tests of the problems are encrypted => imported when loading them """
+    times = import_times('coderunners.app')
+    assert 'coderunners.app' in times
+    assert 'cryptography' not in times, 'cryptography is imported at the cold start of coderunners.app'
@@ -0,0 +1,23 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from coderunners.linters import CppLinter
+from models import RunResult, Status
+
+
+class TestCppLinter:
+    def test_cache(self):
+        with TemporaryDirectory() as root:
+            path = Path(root) / 'main.cpp'
+            path.write_text('int main() { return 0; }\n')
+            linter = CppLinter(language_standard='c++')
+
+            key = linter.cache_key([path])
+            assert key != CppLinter(language_standard='c++17').cache_key([path])
+            cached = RunResult(status=Status.LINTING_ERROR, memory=0, time=0, return_code=1, outputs='cached')
+            CppLinter.cache[key] = cached
+            assert linter.lint([path]) == cached    # Served without running clang-tidy/clang-format
+
+            path.write_text('int main() { return 1; }\n')
+            assert linter.cache_key([path]) != key
+            CppLinter.cache.pop(key)
@@ -0,0 +1,37 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+from coderunners.process import Process, cancelled
+from models import Status
+
+
+class TestProcess:
+    def test_concurrent_processes(self):
+        """ Closing a process that finished early must not kill the processes of the ones that are still running """
+        slow = Process('sleep 1 && echo slow', timeout=5, memory_limit_mb=128)
+        fast = Process('echo fast', timeout=5, memory_limit_mb=128)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            slow_res = pool.submit(slow.run)
+            fast_res = pool.submit(fast.run)
+
+        assert fast_res.result().outputs == 'fast\n'
+        assert slow_res.result().status == Status.OK
+        assert slow_res.result().outputs == 'slow\n'
+
+    def test_leftover_processes_are_killed(self):
+        res = Process('(sleep 31 &) && echo done', timeout=5, memory_limit_mb=128).run()
+        assert res.status == Status.OK
+        assert not any(p.info['cmdline'] == ['sleep', '31'] for p in psutil.process_iter(['cmdline']))
+
+    def test_cancelled_processes_are_killed(self):
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            res = pool.submit(Process('sleep 32', timeout=60, memory_limit_mb=128).run)
+            time.sleep(0.2)
+            cancelled.set()
+            try:
+                assert res.result(timeout=5).status != Status.OK
+            finally:
+                cancelled.clear()
+        assert not any(p.info['cmdline'] == ['sleep', '32'] for p in psutil.process_iter(['cmdline']))
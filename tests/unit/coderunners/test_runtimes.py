@@ -0,0 +1,48 @@
+import pytest
+
+from coderunners.runtimes import GhcRuntime, GoRuntime, JvmRuntime, NodeRuntime, RuntimeProfile
+
+
+class TestRuntimeProfile:
+    def test_from_language(self):
+        assert isinstance(RuntimeProfile.from_language('Java'), JvmRuntime)
+        assert isinstance(RuntimeProfile.from_language('kotlin'), JvmRuntime)
+        assert isinstance(RuntimeProfile.from_language('go'), GoRuntime)
+        assert isinstance(RuntimeProfile.from_language('ts'), NodeRuntime)
+        assert RuntimeProfile.from_language('c++17') is None
+
+    def test_launch_command(self):
+        command = JvmRuntime().launch_command('java -Xshare:auto -cp /tmp/Main.jar Main', memory_limit_mb=512)
+        assert command.startswith('java -Xmx384m -XX:+UseSerialGC ')
+        assert "'-XX:OnOutOfMemoryError=kill -9 %p'" in command
+        assert command.endswith(' -Xshare:auto -cp /tmp/Main.jar Main')
+
+        command = GoRuntime().launch_command('/tmp/go_build/main', memory_limit_mb=256)
+        assert command == 'GOMEMLIMIT=230MiB GOGC=200 /tmp/go_build/main'
+
+        command = NodeRuntime().launch_command('node /tmp/main.js', memory_limit_mb=1024)
+        assert command == 'NODE_OPTIONS=--max-old-space-size=896 node /tmp/main.js'
+        command = NodeRuntime().launch_command('node /tmp/main.js', memory_limit_mb=128)
+        assert command == "NODE_OPTIONS='--max-old-space-size=96 --max-semi-space-size=8' node /tmp/main.js"
+
+        command = GhcRuntime().launch_command('/tmp/haskell_build/main', memory_limit_mb=512)
+        assert command == '/tmp/haskell_build/main +RTS -M512m -H128m -A16m -RTS'
+
+    def test_overrides(self):
+        command = GoRuntime(overrides={'GOGC': 'off'}).launch_command('/tmp/main', memory_limit_mb=100)
+        assert command == 'GOMEMLIMIT=90MiB GOGC=off /tmp/main'
+
+        runtime = JvmRuntime(overrides={'options': '-Xmx1g -Xss1g', 'TZ': 'UTC'})
+        command = runtime.launch_command('java -jar main.jar', memory_limit_mb=256)
+        assert command == 'TZ=UTC java -Xmx1g -Xss1g -jar main.jar'
+
+    def test_options_after_the_environment_variables(self):
+        runtime = NodeRuntime(overrides={'options': '--stack-size=65500'})
+        command = runtime.launch_command('NODE_COMPILE_CACHE=/tmp/node_compile_cache node /tmp/main.js', 512)
+        assert command == 'NODE_OPTIONS=--max-old-space-size=384 ' \
+                          'NODE_COMPILE_CACHE=/tmp/node_compile_cache node --stack-size=65500 /tmp/main.js'
+
+    def test_invalid_overrides(self):
+        with pytest.raises(ValueError):
+            GoRuntime(overrides={'GOGC=1; rm -rf /tmp; X': 'off'})
+        assert RuntimeProfile.from_language('c++17', overrides={'GOGC': 'off'}) is None
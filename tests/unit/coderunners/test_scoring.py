@@ -44,3 +44,18 @@ class TestScoring:
         test_results[0].status = models.Status.WA
         scorer = scoring.SubtaskScorer(test_groups)
         assert scorer.score(test_results) == (80, [0, 20, 15, 15, 15, 15])
+
+    def test_shard_ranges(self):
+        shards = [scoring.shard_range(10, 3, i) for i in range(3)]
+        assert shards == [range(0, 3), range(3, 6), range(6, 10)]
+        assert [scoring.shard_range(2, 3, i) for i in range(3)] == [range(0, 0), range(0, 1), range(1, 2)]
+
+    def test_shard_ranges_keep_groups_whole(self):
+        test_groups = [
+            models.TestGroup(points=10, points_per_test=0, count=1),
+            models.TestGroup(points=30, points_per_test=0, count=5),
+            models.TestGroup(points=60, points_per_test=0, count=4),
+        ]
+        shards = [scoring.shard_range(10, 3, i, test_groups) for i in range(3)]
+        assert shards == [range(0, 6), range(6, 6), range(6, 10)]
+        assert [scoring.shard_range(10, 1, 0, test_groups)] == [range(0, 10)]
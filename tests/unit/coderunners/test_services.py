@@ -0,0 +1,29 @@
+from pathlib import Path
+
+import psutil
+
+from coderunners import services
+from coderunners.process import Process
+from coderunners.services import EqualityChecker
+from models import RunResult, Status, TestCase
+
+
+class TestEqualityChecker:
+    def test_compile_error_stops_the_other_stages(self, monkeypatch, tmp_path: Path):
+        class SlowLinter:
+            def lint(self, submission_paths: list[Path]) -> RunResult:
+                return Process('sleep 33', timeout=60, memory_limit_mb=128).run()
+
+        def compile_error(self, code_paths, tests):
+            Process('sleep 0.2', timeout=5, memory_limit_mb=128).run()      # The linter is running by then
+            return None, RunResult(status=Status.COMPILATION_ERROR, memory=0, time=0, return_code=1), 'optimized'
+
+        monkeypatch.setattr(EqualityChecker, 'ROOT', tmp_path)
+        monkeypatch.setattr(EqualityChecker, 'compile_submission', compile_error)
+        monkeypatch.setattr(services.Linter, 'from_language', lambda language: SlowLinter())
+        checker = EqualityChecker(code={'main.py': 'print(1)'}, language='python', lint=True,
+                                  test_cases=[TestCase(input='', target='1')])
+
+        res = checker.check()
+        assert res.overall.status == Status.COMPILATION_ERROR
+        assert not any(p.info['cmdline'] == ['sleep', '33'] for p in psutil.process_iter(['cmdline']))
@@ -1,5 +1,6 @@
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from zipfile import ZipFile
 
 import pytest
 
@@ -64,3 +65,46 @@ class TestUtil:
                 save_dir = Path(save_dir)
                 # noinspection PyTypeChecker
                 util.save_code(save_dir, code)
+
+    def test_extract_sanitizer_report(self):
+        errors = (
+            'some program output\n'
+            '=================================================================\n'
+            '==42==ERROR: AddressSanitizer: heap-buffer-overflow on address 0x602000000038\n'
+            'WRITE of size 4 at 0x602000000038 thread T0\n'
+            'SUMMARY: AddressSanitizer: heap-buffer-overflow in main\n'
+        )
+        report = util.extract_sanitizer_report(errors)
+        assert report.startswith('==42==ERROR: AddressSanitizer: heap-buffer-overflow')
+        assert report.endswith('SUMMARY: AddressSanitizer: heap-buffer-overflow in main')
+        assert util.extract_sanitizer_report(errors, max_len=10) == '==42==ERRO'
+
+        assert util.extract_sanitizer_report(None) is None
+        assert util.extract_sanitizer_report('Segmentation fault (core dumped)') is None
+
+    def test_jar_main_class(self):
+        with TemporaryDirectory() as tmp:
+            jar_path = Path(tmp) / 'main.jar'
+            with ZipFile(jar_path, 'w') as jar:
+                jar.writestr('META-INF/MANIFEST.MF', 'Manifest-Version: 1.0\r\nMain-Class: com.example.very.long.pa\r\n'
+                                                     ' ckage.MainKt\r\nCreated-By: test\r\n')
+            assert util.jar_main_class(jar_path) == 'com.example.very.long.package.MainKt'
+
+            with ZipFile(jar_path, 'w') as jar:
+                jar.writestr('META-INF/MANIFEST.MF', 'Manifest-Version: 1.0\r\n')
+            assert util.jar_main_class(jar_path) is None
+            assert util.jar_main_class(Path(tmp) / 'missing.jar') is None
+
+    def test_overlay_tree(self):
+        with TemporaryDirectory() as tmp:
+            template, target = Path(tmp) / 'template', Path(tmp) / 'target'
+            (template / 'ab').mkdir(parents=True)
+            (template / 'ab' / 'entry-d').write_text('data')
+            (template / 'README').write_text('readme')
+
+            util.overlay_tree(template, target, copy_file=lambda path: len(path.parts) == 1)
+            assert (target / 'ab' / 'entry-d').is_symlink() and (target / 'ab' / 'entry-d').read_text() == 'data'
+            assert not (target / 'README').is_symlink() and (target / 'README').read_text() == 'readme'
+
+            (target / 'ab' / 'new-d').write_text('new')
+            assert not (template / 'ab' / 'new-d').exists()
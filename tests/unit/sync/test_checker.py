@@ -0,0 +1,57 @@
+import gzip
+import shutil
+import subprocess
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from zipfile import ZipFile
+
+import pytest
+from cryptography.fernet import Fernet
+
+from models import CheckerArtifact
+from sync.checker import compile_checker, encrypt_checker, zip2checker
+
+
+class TestChecker:
+    def test_zip2checker(self):
+        with TemporaryDirectory() as tests_dir:
+            zip_path = Path(tests_dir) / 'problem.zip'
+            with ZipFile(zip_path, 'w') as zip_ref:
+                zip_ref.writestr('tests/00.in.txt', '1 2')
+                zip_ref.writestr('tests/00.out.txt', '3')
+                zip_ref.writestr('tests/checker.txt', 'not a checker')
+                zip_ref.writestr('checker.py', 'print("checker")')
+            assert zip2checker(zip_path) == ({'checker.py': 'print("checker")'}, 'python')
+
+            with ZipFile(zip_path, 'w') as zip_ref:
+                zip_ref.writestr('00.in.txt', '1 2')
+                zip_ref.writestr('00.out.txt', '3')
+            assert zip2checker(zip_path) is None
+
+    def test_encrypt_checker(self):
+        key = Fernet.generate_key().decode()
+        artifact = CheckerArtifact(language='c++', command='/tmp/checker.o', files={'/tmp/checker.o': b'\x7fELF\x00'})
+        encrypted = encrypt_checker(artifact, encryption_key=key)
+        assert b'ELF' not in encrypted
+
+        restored = CheckerArtifact.from_json(gzip.decompress(Fernet(key).decrypt(encrypted)).decode('utf-8'))
+        assert restored == artifact
+
+    @pytest.mark.skipif(shutil.which('g++') is None, reason='g++ is not installed')
+    def test_compile_checker(self):
+        code = {'checker.cpp': '#include <iostream>\nint main() { std::cout << "ok" << std::endl; return 0; }\n'}
+        with TemporaryDirectory() as root:
+            (Path(root) / 'leftover.txt').write_text('removed before the build')
+            artifact = compile_checker(code, language='c++', root=Path(root))
+            assert artifact.language == 'c++'
+            assert artifact.command == f'{root}/checker.o'
+            assert set(artifact.files) == {f'{root}/checker.cpp', f'{root}/checker.o'}
+
+            # The coderunner images of the other languages do not have libstdc++
+            libraries = subprocess.run(['ldd', artifact.command], capture_output=True, text=True).stdout
+            assert 'libstdc++' not in libraries and 'libgcc_s' not in libraries
+            assert subprocess.run([artifact.command], capture_output=True, text=True).stdout == 'ok\n'
+
+    def test_compile_checker_error(self):
+        with TemporaryDirectory() as root, pytest.raises(ValueError, match='Checker compilation failed'):
+            compile_checker({'checker.cpp': 'int main() { return }'}, language='c++', root=Path(root))
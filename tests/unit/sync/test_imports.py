@@ -0,0 +1,8 @@
+from tests.benchmarks.bench_import_time import import_times
+
+
+def test_lazy_imports():
+    """ Only the problems with a checker compile it => imported then """
+    times = import_times('sync.sync_app')
+    assert 'sync.sync_app' in times
+    assert 'coderunners.compilers' not in times, 'coderunners.compilers is imported at the cold start of sync.sync_app'